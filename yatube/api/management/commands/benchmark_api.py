@@ -0,0 +1,78 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request cost of JSON API endpoints '
+        'with the HTML views they replace (caches disabled).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+
+    def pairs(self):
+        post = Post.objects.select_related('author', 'group').first()
+        if post is None:
+            return []
+        pairs = [
+            ('index', reverse('posts:index'), reverse('api:post_list')),
+            (
+                'profile',
+                reverse('posts:profile', args=[post.author.username]),
+                reverse('api:profile_post_list', args=[post.author.username]),
+            ),
+            (
+                'post_detail',
+                reverse('posts:post_detail', args=[post.pk]),
+                reverse('api:post_detail', args=[post.pk]),
+            ),
+        ]
+        group = Group.objects.filter(posts__isnull=False).first()
+        if group is not None:
+            pairs.append(
+                (
+                    'group_posts',
+                    reverse('posts:group_list', args=[group.slug]),
+                    reverse('api:group_post_list', args=[group.slug]),
+                )
+            )
+        return pairs
+
+    def measure(self, client, url, count):
+        client.get(url)
+        elapsed = 0
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                cache.clear()
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed += time.perf_counter() - started
+        return (
+            elapsed / count * 1000,
+            len(queries) / count,
+            len(response.content),
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        client = Client()
+        self.stdout.write(
+            f'{"page":<12} {"kind":<5} {"ms/req":>8} '
+            f'{"queries":>8} {"bytes":>8}'
+        )
+        with override_settings(DEBUG=False):
+            for name, html_url, api_url in self.pairs():
+                for kind, url in (('html', html_url), ('api', api_url)):
+                    ms, queries, size = self.measure(client, url, count)
+                    self.stdout.write(
+                        f'{name:<12} {kind:<5} {ms:>8.2f} '
+                        f'{queries:>8.1f} {size:>8}'
+                    )
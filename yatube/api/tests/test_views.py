@@ -0,0 +1,118 @@
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        for i in range(13):
+            cls.post = Post.objects.create(
+                author=cls.auth_user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.auth_user, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_post_list_cursor_pagination(self):
+        """Курсор ведёт на следующую страницу без повторов."""
+        address = reverse('api:post_list')
+        first = self.guest_client.get(address).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(first['results'][0]['text'], self.post.text)
+        second = self.guest_client.get(
+            address, {'cursor': first['next']}
+        ).json()
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 13)
+
+    def test_feeds_filtered_by_group_and_author(self):
+        """Ленты группы и автора отдают посты в JSON."""
+        addresses = [
+            reverse('api:group_post_list', kwargs={'slug': self.group.slug}),
+            reverse(
+                'api:profile_post_list',
+                kwargs={'username': self.auth_user.username},
+            ),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address, {'limit': 20})
+                results = response.json()['results']
+                self.assertEqual(len(results), 13)
+                self.assertEqual(results[0]['author'], 'auth')
+                self.assertEqual(results[0]['group'], self.group.slug)
+
+    def test_field_selection(self):
+        """Параметр fields ограничивает набор полей."""
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,text'}
+        )
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'text'}
+        )
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_post_detail_with_comments(self):
+        """Детальная информация о посте содержит комментарии."""
+        response = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        data = response.json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments'][0]['text'], self.comment.text)
+
+    def test_not_found(self):
+        """Несуществующие объекты отдают 404 в JSON."""
+        addresses = [
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+            reverse('api:group_post_list', kwargs={'slug': 'unknown'}),
+            reverse('api:profile_post_list', kwargs={'username': 'nobody'}),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+    def test_response_cached_until_posts_change(self):
+        """Ответ кэшируется и сбрасывается при новом посте."""
+        address = reverse('api:post_list')
+        self.guest_client.get(address)
+        with self.assertNumQueries(0):
+            self.guest_client.get(address)
+        Post.objects.create(author=self.auth_user, text='Новый пост')
+        response = self.guest_client.get(address)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
+
+    def test_benchmark_command(self):
+        """Команда сравнивает стоимость API и HTML-страниц."""
+        out = StringIO()
+        call_command('benchmark_api', requests=1, stdout=out)
+        self.assertIn('post_detail  api', out.getvalue())
@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.post_list, name='post_list'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.group_post_list,
+        name='group_post_list',
+    ),
+    path(
+        'profiles/<str:username>/posts/',
+        views.profile_post_list,
+        name='profile_post_list',
+    ),
+]
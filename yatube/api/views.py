@@ -0,0 +1,216 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+from functools import wraps
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from posts.cache import cache_feed_page
+from posts.models import Comment, Group, User
+from posts.sharding import on_shard, post_shard, posts_on, shard_querysets
+
+# Public field name -> lookup in Post.objects.values().
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author_id',
+    'group': 'group_id',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'author': 'author_id',
+    'text': 'text',
+    'created': 'created',
+}
+# Users and groups stay on the primary database, rows of the shards
+# carry their ids: field -> (model, name field).
+NAMES = {
+    'author': (User, 'username'),
+    'group': (Group, 'slug'),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def api_view(key_prefix):
+    """Read-only JSON endpoint with a signal-invalidated response cache."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return JsonResponse(view_func(request, *args, **kwargs))
+            except ApiError as error:
+                return JsonResponse(
+                    {'detail': error.detail}, status=error.status
+                )
+
+        return require_GET(
+            cache_feed_page(key_prefix, settings.API_CACHE_TIMEOUT)(wrapper)
+        )
+
+    return decorator
+
+
+def selected_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(POST_FIELDS)
+    fields = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def encode_cursor(pub_date, pk):
+    raw = json.dumps([pub_date.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        pub_date, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (ValueError, TypeError):
+        raise ApiError('Invalid cursor')
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('Invalid limit')
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def with_names(rows, fields, lookups):
+    """Swap ids in the rows for names, one query per name field."""
+    for name in fields:
+        if name not in NAMES:
+            continue
+        model, field = NAMES[name]
+        lookup = lookups[name]
+        ids = {row[lookup] for row in rows if row[lookup] is not None}
+        names = dict(model.objects.filter(pk__in=ids).values_list('pk', field))
+        for row in rows:
+            row[lookup] = names.get(row[lookup])
+    return rows
+
+
+def serialize(row, fields, lookups):
+    item = {name: row[lookups[name]] for name in fields}
+    if item.get('image') is not None:
+        item['image'] = (
+            default_storage.url(item['image']) if item['image'] else None
+        )
+    return item
+
+
+def row_key(row):
+    return row['pub_date'], row['pk']
+
+
+def post_page(request, querysets):
+    """Serialize one keyset page of posts ordered by -pub_date, -pk.
+
+    Every shard returns its first limit + 1 rows after the cursor and
+    the sorted rows are merged. Rows come from values(), so no Post
+    instances are created.
+    """
+    fields = selected_fields(request)
+    limit = page_limit(request)
+    cursor = request.GET.get('cursor')
+    after = Q()
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        after = Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+    lookups = {name: POST_FIELDS[name] for name in fields}
+    merged = heapq.merge(
+        *(
+            queryset.filter(after)
+            .order_by('-pub_date', '-pk')
+            .values('pk', 'pub_date', *lookups.values())[: limit + 1]
+            for queryset in querysets
+        ),
+        key=row_key,
+        reverse=True,
+    )
+    rows = with_names(list(islice(merged, limit + 1)), fields, lookups)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['pub_date'], rows[-1]['pk'])
+    return {
+        'next': next_cursor,
+        'results': [serialize(row, fields, lookups) for row in rows],
+    }
+
+
+def existing_pk(queryset):
+    pk = queryset.values_list('pk', flat=True).first()
+    if pk is None:
+        raise ApiError('Not found.', status=404)
+    return pk
+
+
+@api_view('api_posts')
+def post_list(request):
+    return post_page(request, shard_querysets())
+
+
+@api_view('api_group_posts')
+def group_post_list(request, slug):
+    group_id = existing_pk(Group.objects.filter(slug=slug))
+    return post_page(request, shard_querysets(group_id=group_id))
+
+
+@api_view('api_profile_posts')
+def profile_post_list(request, username):
+    author_id = existing_pk(User.objects.filter(username=username))
+    return post_page(request, shard_querysets([author_id]))
+
+
+@api_view('api_post_detail')
+def post_detail(request, post_id):
+    fields = selected_fields(request)
+    lookups = {name: POST_FIELDS[name] for name in fields}
+    alias = post_shard(post_id)
+    row = (
+        posts_on(alias)
+        .published()
+        .filter(pk=post_id)
+        .values(*lookups.values())
+        .first()
+    )
+    if row is None:
+        raise ApiError('Not found.', status=404)
+    comments = with_names(
+        list(
+            on_shard(Comment, alias)
+            .filter(post_id=post_id)
+            .values(*COMMENT_FIELDS.values())
+        ),
+        COMMENT_FIELDS,
+        COMMENT_FIELDS,
+    )
+    return {
+        **serialize(with_names([row], fields, lookups)[0], fields, lookups),
+        'comments': [
+            serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+            for comment in comments
+        ],
+    }
@@ -0,0 +1,8 @@
+from posts.notifications import unread_count
+
+
+def notifications(request):
+    """Добавляет число непрочитанных уведомлений из кэша."""
+    if not request.user.is_authenticated:
+        return {}
+    return {'unread_notifications': unread_count(request.user)}
@@ -0,0 +1,56 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+_state = threading.local()
+
+
+def pin_primary():
+    """Send the rest of the current request to the primary database."""
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+
+
+class PrimaryReplicaRouter:
+    """Reads go to a random replica, writes go to `default`.
+
+    After the first write (or inside a transaction) reads of the same
+    request stay on the primary, so the request sees its own changes.
+    """
+
+    primary = 'default'
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or is_pinned()
+            or connections[self.primary].in_atomic_block
+        ):
+            return self.primary
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        pin_primary()
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.primary
@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into replica files '
+        'with the online backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'replicas',
+            nargs='*',
+            help='replica aliases, all DATABASE_REPLICAS by default',
+        )
+        parser.add_argument(
+            '--loop',
+            type=float,
+            default=None,
+            help='repeat every N seconds',
+        )
+
+    def replica_path(self, alias):
+        if alias not in settings.DATABASES:
+            raise CommandError(f'Unknown database alias: {alias}')
+        config = settings.DATABASES[alias]
+        if config['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError(f'{alias} is not an SQLite database')
+        return config['NAME']
+
+    def replicate(self, paths):
+        primary = connections['default']
+        primary.ensure_connection()
+        for alias, path in paths.items():
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: {path}')
+
+    def handle(self, *args, **options):
+        aliases = options['replicas'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('No replicas configured')
+        paths = {alias: self.replica_path(alias) for alias in aliases}
+        while True:
+            self.replicate(paths)
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
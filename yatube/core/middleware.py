@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+
+from . import db_router
+
+STICKY_COOKIE = 'primary_until'
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client on the primary database for a few seconds after
+    it wrote something, until replicas catch up."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_router.reset()
+        try:
+            sticky_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            sticky_until = 0
+        if sticky_until > time.time():
+            db_router.pin_primary()
+        try:
+            response = self.get_response(request)
+            if db_router.wrote() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    STICKY_COOKIE,
+                    str(time.time() + settings.REPLICA_LAG_SECONDS),
+                    max_age=settings.REPLICA_LAG_SECONDS,
+                    httponly=True,
+                )
+            return response
+        finally:
+            db_router.reset()
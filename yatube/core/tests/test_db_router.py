@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+)
+from posts.models import Post
+
+from core import db_router
+from core.db_router import PrimaryReplicaRouter
+from core.middleware import STICKY_COOKIE, ReadYourWritesMiddleware
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_LAG_SECONDS=10)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        db_router.reset()
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(db_router.reset)
+
+    def test_reads_go_to_replica(self):
+        """Чтение без предшествующей записи идёт в реплику."""
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_writes_go_to_primary_and_pin(self):
+        """После записи чтения запроса остаются на основной базе."""
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertTrue(db_router.wrote())
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        """Без настроенных реплик чтение идёт в основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_migrations_only_on_primary(self):
+        """Миграции применяются только к основной базе."""
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    def middleware_response(self, request, write=False):
+        def get_response(request):
+            if write:
+                self.router.db_for_write(Post)
+            return HttpResponse(self.router.db_for_read(Post))
+
+        return ReadYourWritesMiddleware(get_response)(request)
+
+    def test_middleware_sets_sticky_cookie_after_write(self):
+        """После записи клиент получает cookie привязки к основной базе."""
+        request = RequestFactory().post('/')
+        response = self.middleware_response(request, write=True)
+        self.assertEqual(response.content, b'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertFalse(db_router.is_pinned())
+
+    def test_middleware_reads_from_primary_while_cookie_is_fresh(self):
+        """Пока cookie свежая, чтения клиента идут в основную базу."""
+        factory = RequestFactory()
+        request = factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = str(time.time() + 5)
+        self.assertEqual(
+            self.middleware_response(request).content, b'default'
+        )
+        request = factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = str(time.time() - 5)
+        response = self.middleware_response(request)
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class ReplicateDbCommandTests(TransactionTestCase):
+    def test_replica_receives_copy_of_primary(self):
+        """Команда replicate_db копирует основную базу в файл реплики."""
+        user = User.objects.create_user(username='auth')
+        Post.objects.create(author=user, text='Тестовый пост')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'replica.sqlite3')
+            replica = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': path,
+            }
+            with mock.patch.dict(settings.DATABASES, {'replica': replica}):
+                call_command('replicate_db', 'replica', stdout=StringIO())
+            connection = sqlite3.connect(path)
+            try:
+                texts = connection.execute(
+                    'SELECT text FROM posts_post'
+                ).fetchall()
+            finally:
+                connection.close()
+        self.assertEqual(texts, [('Тестовый пост',)])
+
+    def test_unknown_alias_is_rejected(self):
+        """Неизвестный псевдоним базы приводит к ошибке команды."""
+        with self.assertRaises(CommandError):
+            call_command('replicate_db', 'missing', stdout=StringIO())
@@ -1,6 +1,24 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Comment, Follow, Group, Post
+from .deletion import schedule_deletion
+from .models import Comment, DeletionTask, Follow, Group, Post
+
+User = get_user_model()
+
+
+def schedule_deletion_action(modeladmin, request, queryset):
+    for obj in queryset:
+        schedule_deletion(obj)
+    modeladmin.message_user(
+        request,
+        f'Поставлено в очередь на удаление: {len(queryset)}. '
+        'Данные удалит команда process_deletions.',
+    )
+
+
+schedule_deletion_action.short_description = 'Удалить по частям (в фоне)'
 
 
 @admin.register(Post)
@@ -24,7 +42,11 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-admin.site.register(Group)
+@admin.register(Group)
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+    actions = (schedule_deletion_action,)
 
 
 @admin.register(Comment)
@@ -39,3 +61,25 @@ class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
     list_filter = ('user', 'author')
     search_fields = ('user', 'author')
+
+
+@admin.register(DeletionTask)
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'label', 'created', 'finished', 'deleted_rows')
+    list_filter = ('kind', 'finished')
+    readonly_fields = (
+        'kind',
+        'object_id',
+        'label',
+        'created',
+        'finished',
+        'deleted_rows',
+    )
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class YatubeUserAdmin(UserAdmin):
+    actions = (schedule_deletion_action,)
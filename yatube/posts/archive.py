@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .sharding import DEFAULT_SHARD, on_shard, shard_aliases
+from .tags import forget_posts
+
+POST_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'updated',
+    'author_id',
+    'group_id',
+    'views',
+    'likes_count',
+    'text_html',
+    'html_version',
+)
+COMMENT_FIELDS = (
+    'id',
+    'post_id',
+    'author_id',
+    'text',
+    'created',
+    'path',
+    'text_html',
+    'html_version',
+)
+
+
+def archive_batch(cutoff, batch_size, alias=DEFAULT_SHARD):
+    """Move one batch of posts of a shard older than cutoff with their
+    comments into the archive tables of the primary database.
+    Returns number of moved posts."""
+    with transaction.atomic(), transaction.atomic(using=alias):
+        posts = list(
+            on_shard(Post, alias)
+            .published()
+            .filter(pub_date__lt=cutoff)
+            .order_by('pk')
+            .values(*POST_FIELDS, 'image')[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post['id'] for post in posts]
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**post) for post in posts
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(**comment)
+            for comment in on_shard(Comment, alias)
+            .filter(post_id__in=ids)
+            .values(*COMMENT_FIELDS)
+        )
+        on_shard(Comment, alias).filter(post_id__in=ids).delete()
+        # Likes go with the posts: archived posts cannot be liked,
+        # and their likes_count above keeps the number.
+        on_shard(Post, alias).filter(pk__in=ids).delete()
+        # Tag feeds and mentions cover hot posts only.
+        forget_posts(ids)
+    return len(ids)
+
+
+def archive_posts(days=None, batch_size=None):
+    """Archive posts published more than `days` days ago in batches."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+    moved = 0
+    for alias in shard_aliases():
+        while True:
+            count = archive_batch(cutoff, batch_size, alias)
+            moved += count
+            if count < batch_size:
+                break
+    return moved
+
+
+class ArchiveChain:
+    """Hot posts followed by archived ones, as one list for Paginator.
+
+    Archived posts are always older than the hot ones, so the order
+    by -pub_date is kept across the border.
+    """
+
+    ordered = True
+
+    def __init__(self, hot, archived):
+        self.parts = (hot, archived)
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [part.count() for part in self.parts]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        items = []
+        for part, count in zip(self.parts, self.counts()):
+            if stop is not None and stop <= 0:
+                break
+            if start < count:
+                end = count if stop is None else min(stop, count)
+                items.extend(part[start:end])
+            start = max(start - count, 0)
+            if stop is not None:
+                stop -= count
+        return items
@@ -0,0 +1,42 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+FEED_VERSION_KEY = 'feed_version'
+
+
+def get_feed_version():
+    """Return current version of cached feed pages."""
+    return cache.get_or_set(
+        FEED_VERSION_KEY, lambda: int(time.time() * 1000), None
+    )
+
+
+def invalidate_feeds():
+    """Make every cached feed page stale by bumping the version."""
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        get_feed_version()
+
+
+def cache_feed_page(key_prefix, timeout=None):
+    """Work like cache_page, but drop pages when feed content changes."""
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            cached_view = cache_page(
+                timeout,
+                key_prefix=f'{key_prefix}.{get_feed_version()}',
+            )(view_func)
+            return cached_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
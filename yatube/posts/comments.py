@@ -0,0 +1,170 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import Min
+
+from .models import Comment
+from .sharding import on_shard, shards_for_posts
+
+# A path is a chain of fixed-width base 36 segments, one per level.
+# Root segments count down from the top, so the newest thread sorts
+# first, replies count up and follow their parent in written order.
+# Segments are numbered inside a post, so paths survive a shard move
+# that gives comments new ids.
+STEP = 4
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+SEGMENTS = len(DIGITS) ** STEP
+# Sorts after every digit: path < x < path + END is the subtree.
+END = '~'
+PATH_RE = re.compile(rf'(?:[0-9a-z]{{{STEP}}})+')
+
+
+def encode(number):
+    if not 0 <= number < SEGMENTS:
+        raise ValueError('Too many comments in the thread')
+    segment = ''
+    for _ in range(STEP):
+        number, digit = divmod(number, len(DIGITS))
+        segment = DIGITS[digit] + segment
+    return segment
+
+
+def decode(segment):
+    return int(segment, len(DIGITS))
+
+
+def depth(path):
+    """0 for a thread root, 1 for a reply to it and so on."""
+    return len(path) // STEP - 1
+
+
+def parse_path(value):
+    """Path from a query string, None if it is not one."""
+    if value and len(value) <= 255 and PATH_RE.fullmatch(value):
+        return value
+    return None
+
+
+def root_path(comments):
+    """Path of a new thread among the comments of one post.
+
+    The newest thread has the smallest path, so one index lookup
+    finds the segment to count down from.
+    """
+    first = comments.order_by('path').values_list('path', flat=True).first()
+    if not first:
+        return encode(SEGMENTS - 1)
+    return encode(decode(first[:STEP]) - 1)
+
+
+def reply_path(comments, parent):
+    """Path of a new last reply to the parent.
+
+    Replies deeper than COMMENT_MAX_DEPTH go to the deepest allowed
+    ancestor, so the thread stays readable.
+    """
+    base = parent.path[:STEP * settings.COMMENT_MAX_DEPTH]
+    last = (
+        comments.filter(path__gt=base, path__lt=base + END)
+        .order_by('-path')
+        .values_list('path', flat=True)
+        .first()
+    )
+    if last is None:
+        return base + encode(0)
+    return base + encode(decode(last[len(base):len(base) + STEP]) + 1)
+
+
+def next_path(comments, parent=None):
+    if parent is None:
+        return root_path(comments)
+    return reply_path(comments, parent)
+
+
+def save_comment(comment, parent=None, attempts=3):
+    """Save a new comment at the end of its place in the thread.
+
+    Comments written at the same moment may take the same path,
+    the unique index rejects one of them and it tries the next path.
+    """
+    using = router.db_for_write(Comment, instance=comment)
+    comments = Comment.objects.using(using).filter(post_id=comment.post_id)
+    for attempt in range(attempts):
+        comment.path = next_path(comments, parent)
+        try:
+            with transaction.atomic(using=using):
+                comment.save(using=using)
+            return comment
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+
+
+def assign_root_paths(comments):
+    """Paths of new threads for comments saved with bulk_create,
+    oldest first, with one query per shard of their posts."""
+    by_post = defaultdict(list)
+    for comment in sorted(comments, key=lambda comment: comment.created):
+        by_post[comment.post_id].append(comment)
+    first = {}
+    for alias, post_ids in shards_for_posts(by_post).items():
+        first.update(
+            on_shard(Comment, alias)
+            .filter(post_id__in=post_ids)
+            .order_by()
+            .values('post_id')
+            .annotate(first=Min('path'))
+            .values_list('post_id', 'first')
+        )
+    for post_id, thread_roots in by_post.items():
+        number = SEGMENTS
+        if first.get(post_id):
+            number = decode(first[post_id][:STEP])
+        for comment in thread_roots:
+            number -= 1
+            comment.path = encode(number)
+    return comments
+
+
+class CommentPage:
+    """One keyset page of comments in display order. The next page
+    starts after the path of the last comment instead of an OFFSET."""
+
+    def __init__(self, comments, next_cursor):
+        self.comments = comments
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.comments)
+
+    def __len__(self):
+        return len(self.comments)
+
+    def __getitem__(self, index):
+        return self.comments[index]
+
+
+def comment_page(comments, thread=None, after=None, limit=None):
+    """Comments of a post: threads newest first, replies under their
+    parent in written order.
+
+    `thread` narrows the page to one thread and `after` is the path
+    the page starts after. Both are ranges of the (post, path) index,
+    so any page of any thread is read with one query. Every comment
+    gets `depth` relative to the shown thread.
+    """
+    limit = limit or settings.COMMENTS_PER_PAGE
+    if thread is not None:
+        comments = comments.filter(path__gte=thread, path__lt=thread + END)
+    if after is not None:
+        comments = comments.filter(path__gt=after)
+    rows = list(
+        comments.prefetch_related('author').order_by('path')[:limit + 1]
+    )
+    top = depth(thread) if thread else 0
+    for row in rows:
+        row.depth = depth(row.path) - top
+    next_cursor = rows[limit - 1].path if len(rows) > limit else None
+    return CommentPage(rows[:limit], next_cursor)
@@ -0,0 +1,187 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Exists, Max, OuterRef, Sum
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .models import Follow, Group, Like, Post, User
+from .recommendations import recommended_authors
+from .sharding import (
+    is_sharded,
+    on_shard,
+    post_queryset,
+    post_shard,
+    post_stats,
+)
+
+
+def viewer_key(request):
+    """Pages differ per logged-in user: header and csrf token in forms."""
+    if not request.user.is_authenticated:
+        return 'anonymous'
+    return f'{request.user.pk}:{request.META.get("CSRF_COOKIE", "")}'
+
+
+def conditional_page(state_func, per_user=True):
+    """Answer 304 Not Modified when the state of the page is unchanged.
+
+    state_func returns a dict that changes with the page, or None
+    if the page does not exist. Only an ETag of the dict is sent:
+    deleting a post does not move the latest `updated`, so a
+    Last-Modified date would let If-Modified-Since get a stale 304.
+    Pages that look the same for everyone pass per_user=False.
+    """
+
+    def etag_func(request, *args, **kwargs):
+        state = state_func(request, *args, **kwargs)
+        if state is None:
+            return None
+        viewer = viewer_key(request) if per_user else 'anonymous'
+        raw = repr((viewer, sorted(state.items())))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+        if per_user:
+            conditional_view = vary_on_cookie(conditional_view)
+        return wraps(view_func)(conditional_view)
+
+    return decorator
+
+
+def index_state(request):
+    return post_stats()
+
+
+def group_state(request, slug):
+    groups = Group.objects.filter(slug=slug)
+    if is_sharded():
+        state = groups.values('pk', 'title', 'description').first()
+        return state and dict(state, **post_stats(group_id=state['pk']))
+    return (
+        groups.annotate(
+            last_modified=Max('posts__updated'),
+            count=Count('posts'),
+            likes_total=Sum('posts__likes_count'),
+        )
+        .values(
+            'title', 'description', 'last_modified', 'count', 'likes_total'
+        )
+        .first()
+    )
+
+
+def author_values(authors, *fields):
+    """Author fields with the stats of their posts. Sharded posts
+    can not be joined to users, so they are counted in the shard."""
+    if is_sharded():
+        state = authors.values('pk', *fields).first()
+        return state and dict(state, **post_stats(author_ids=[state['pk']]))
+    return (
+        authors.annotate(
+            last_modified=Max('posts__updated'),
+            count=Count('posts'),
+            likes_total=Sum('posts__likes_count'),
+        )
+        .values(*fields, 'last_modified', 'count', 'likes_total')
+        .first()
+    )
+
+
+def author_state(request, username):
+    return author_values(
+        User.objects.filter(username=username), 'first_name', 'last_name'
+    )
+
+
+def profile_state(request, username):
+    following = Follow.objects.filter(
+        user_id=request.user.pk, author=OuterRef('pk')
+    )
+    state = author_values(
+        User.objects.filter(username=username).annotate(
+            is_following=Exists(following)
+        ),
+        'first_name',
+        'last_name',
+        'is_following',
+    )
+    if state and request.user.get_username() == username:
+        state['recommended'] = tuple(
+            author['username'] for author in recommended_authors(request.user)
+        )
+    return state
+
+
+def sharded_post_state(post_id):
+    posts = post_queryset(post_id)
+    state = (
+        posts.filter(pk=post_id)
+        .order_by()
+        .annotate(
+            last_comment=Max('comments__created'),
+            comments_count=Count('comments'),
+        )
+        .values(
+            'updated',
+            'views',
+            'likes_count',
+            'last_comment',
+            'comments_count',
+            'author_id',
+            'group_id',
+        )
+        .first()
+    )
+    if state is not None:
+        state['author_posts'] = posts.filter(
+            author_id=state.pop('author_id')
+        ).count()
+        state['group__title'] = (
+            Group.objects.filter(pk=state.pop('group_id'))
+            .values_list('title', flat=True)
+            .first()
+        )
+    return state
+
+
+def post_state(request, post_id):
+    if is_sharded():
+        state = sharded_post_state(post_id)
+    else:
+        state = (
+            Post.objects.filter(pk=post_id)
+            .order_by()
+            .annotate(
+                last_comment=Max('comments__created'),
+                comments_count=Count('comments'),
+            )
+            .values(
+                'updated',
+                'views',
+                'likes_count',
+                'last_comment',
+                'comments_count',
+                'author_id',
+                'group__title',
+            )
+            .first()
+        )
+        # Counted apart: joining the author's posts to the comments
+        # would multiply the rows.
+        if state is not None:
+            state['author_posts'] = Post.objects.filter(
+                author_id=state.pop('author_id')
+            ).count()
+    if state is not None:
+        state['last_modified'] = max(
+            filter(None, (state.pop('updated'), state.pop('last_comment')))
+        )
+        state['liked'] = (
+            request.user.is_authenticated
+            and on_shard(Like, post_shard(post_id))
+            .filter(user=request.user, post_id=post_id)
+            .exists()
+        )
+    return state
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Post
+from .sharding import shards_for_posts
+from .utils import chunks
+
+logger = logging.getLogger(__name__)
+
+
+def write_views(counts, batch_size=None):
+    """Add view counts to posts with one UPDATE ... CASE per batch.
+
+    Views do not touch `updated`, so they do not invalidate feeds.
+    Returns number of executed statements.
+    """
+    batch_size = batch_size or settings.VIEW_COUNTER_BATCH_SIZE
+    statements = 0
+    for alias, post_ids in shards_for_posts(sorted(counts)).items():
+        for batch in chunks(post_ids, batch_size):
+            increment = Case(
+                *(When(pk=pk, then=Value(counts[pk])) for pk in batch),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            Post.objects.using(alias).filter(pk__in=batch).update(
+                views=F('views') + increment
+            )
+            statements += 1
+    return statements
+
+
+class ViewCounter:
+    """Post views collected in memory and written in batches.
+
+    The buffer is flushed by the request that finds it older than
+    VIEW_COUNTER_FLUSH_INTERVAL or larger than VIEW_COUNTER_MAX_PENDING,
+    and on shutdown of the WSGI process. A crashed process loses
+    at most that much.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.pending = 0
+        self.flushed = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, post_id):
+        with self.lock:
+            self.counts[post_id] += 1
+            self.pending += 1
+            due = (
+                self.pending >= settings.VIEW_COUNTER_MAX_PENDING
+                or time.monotonic() - self.last_flush
+                >= settings.VIEW_COUNTER_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def take(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.pending = 0
+            self.last_flush = time.monotonic()
+        return counts
+
+    def restore(self, counts):
+        with self.lock:
+            self.counts.update(counts)
+            self.pending += sum(counts.values())
+
+    def flush(self):
+        """Write buffered views, returns number of written views.
+        On a database error the views go back into the buffer."""
+        counts = self.take()
+        if not counts:
+            return 0
+        try:
+            write_views(counts)
+        except Exception:
+            self.restore(counts)
+            logger.exception('Failed to flush %s post views', self.pending)
+            return 0
+        views = sum(counts.values())
+        with self.lock:
+            self.flushed += views
+        logger.info(
+            'Flushed %s views of %s posts, %s pending',
+            views,
+            len(counts),
+            self.pending,
+        )
+        return views
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'pending_views': self.pending,
+                'pending_posts': len(self.counts),
+                'flushed_views': self.flushed,
+                'seconds_since_flush': round(
+                    time.monotonic() - self.last_flush, 1
+                ),
+            }
+
+
+view_counter = ViewCounter()
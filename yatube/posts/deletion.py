@@ -0,0 +1,251 @@
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_image
+
+from .models import (
+    ArchivedComment,
+    ArchivedPost,
+    Comment,
+    DeletionTask,
+    Follow,
+    Group,
+    Like,
+    Notification,
+    NotificationEvent,
+    NotificationState,
+    Post,
+    PostRevision,
+    Recommendation,
+    User,
+)
+from .notifications import add_unread, unread_cache_key
+from .sharding import on_shard, posts_on, shard_aliases
+from .tags import forget_posts
+
+COMMENT_MODELS = {
+    Post: Comment,
+    ArchivedPost: ArchivedComment,
+}
+
+
+def schedule_deletion(obj):
+    """Queue a user or a group for deletion by `process_deletions`.
+
+    A user is deactivated at once, so they can't log in
+    while their content is being removed.
+    """
+    if isinstance(obj, Group):
+        kind, label = DeletionTask.GROUP, obj.slug
+    else:
+        kind, label = DeletionTask.USER, obj.username
+        User.objects.filter(pk=obj.pk).update(is_active=False)
+    task, _ = DeletionTask.objects.get_or_create(
+        kind=kind, object_id=obj.pk, defaults={'label': label}
+    )
+    return task
+
+
+def delete_batch(queryset, batch_size, using=None):
+    """Delete up to batch_size rows of queryset in one transaction.
+
+    `using` is the shard of sharded rows.
+    Returns number of selected rows and number of all deleted rows,
+    cascades included.
+    """
+    with transaction.atomic(using=using):
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0, 0
+        deleted, _ = (
+            queryset.model.objects.using(using).filter(pk__in=ids).delete()
+        )
+    return len(ids), deleted
+
+
+def delete_posts_batch(queryset, batch_size, using=None):
+    """Delete a batch of posts (hot or archived) with their
+    comments and images."""
+    with transaction.atomic(using=using):
+        posts = list(queryset.values_list('pk', 'image')[:batch_size])
+        ids = [pk for pk, _ in posts]
+        if not ids:
+            return 0, 0
+        comment_model = COMMENT_MODELS[queryset.model]
+        comments, _ = (
+            comment_model.objects.using(using)
+            .filter(post_id__in=ids)
+            .delete()
+        )
+        revisions, _ = PostRevision.objects.filter(post_id__in=ids).delete()
+        indexed = forget_posts(ids)
+        deleted, _ = (
+            queryset.model.objects.using(using).filter(pk__in=ids).delete()
+        )
+        images = [image for _, image in posts if image]
+        transaction.on_commit(lambda: [delete_image(name) for name in images])
+    return len(ids), comments + revisions + indexed + deleted
+
+
+def delete_likes_batch(queryset, batch_size, using):
+    """Delete a batch of likes and take them off the counters of their
+    posts with one UPDATE per number of removed likes."""
+    with transaction.atomic(using=using):
+        likes = list(queryset.values_list('pk', 'post_id')[:batch_size])
+        if not likes:
+            return 0, 0
+        counts = Counter(post_id for _, post_id in likes)
+        by_count = defaultdict(list)
+        for post_id, count in counts.items():
+            by_count[count].append(post_id)
+        for count, post_ids in by_count.items():
+            Post.objects.using(using).filter(pk__in=post_ids).update(
+                likes_count=F('likes_count') - count
+            )
+        deleted, _ = (
+            Like.objects.using(using)
+            .filter(pk__in=[pk for pk, _ in likes])
+            .delete()
+        )
+    return len(likes), deleted
+
+
+def delete_notifications_batch(queryset, batch_size):
+    """Delete a batch of notifications and take the unread ones off
+    the counters of their recipients."""
+    with transaction.atomic():
+        rows = list(queryset.values_list('pk', 'user_id')[:batch_size])
+        if not rows:
+            return 0, 0
+        last_read = dict(
+            NotificationState.objects.filter(
+                user_id__in={user_id for _, user_id in rows}
+            ).values_list('user_id', 'last_read')
+        )
+        unread = Counter(
+            user_id
+            for pk, user_id in rows
+            if pk > last_read.get(user_id, 0)
+        )
+        add_unread({user_id: -count for user_id, count in unread.items()})
+        deleted, _ = Notification.objects.filter(
+            pk__in=[pk for pk, _ in rows]
+        ).delete()
+        keys = [unread_cache_key(user_id) for user_id in unread]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    return len(rows), deleted
+
+
+def ungroup_posts_batch(queryset, batch_size, using=None):
+    with transaction.atomic(using=using):
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        queryset.model.objects.using(using).filter(pk__in=ids).update(
+            group=None
+        )
+    return len(ids), 0
+
+
+def user_steps(user_id, batch_size):
+    """Steps removing everything that cascades from the user.
+
+    Every step works on what is left in the database, so an interrupted
+    task simply continues from where it stopped. Comments and likes
+    of the user may be in any shard, their posts are looked for
+    in every shard too, as a move may have left copies behind.
+    """
+    for alias in shard_aliases():
+        yield lambda alias=alias: delete_batch(
+            on_shard(Comment, alias).filter(author_id=user_id),
+            batch_size,
+            alias,
+        )
+        yield lambda alias=alias: delete_likes_batch(
+            on_shard(Like, alias).filter(user_id=user_id), batch_size, alias
+        )
+    yield lambda: delete_batch(
+        Follow.objects.filter(user_id=user_id), batch_size
+    )
+    yield lambda: delete_batch(
+        Follow.objects.filter(author_id=user_id), batch_size
+    )
+    yield lambda: delete_batch(
+        Recommendation.objects.filter(user_id=user_id), batch_size
+    )
+    yield lambda: delete_batch(
+        Recommendation.objects.filter(author_id=user_id), batch_size
+    )
+    yield lambda: delete_batch(
+        Notification.objects.filter(user_id=user_id), batch_size
+    )
+    yield lambda: delete_notifications_batch(
+        Notification.objects.filter(actor_id=user_id), batch_size
+    )
+    yield lambda: delete_batch(
+        NotificationEvent.objects.filter(actor_id=user_id), batch_size
+    )
+    for alias in shard_aliases():
+        yield lambda alias=alias: delete_posts_batch(
+            posts_on(alias).filter(author_id=user_id), batch_size, alias
+        )
+    yield lambda: delete_batch(
+        ArchivedComment.objects.filter(author_id=user_id), batch_size
+    )
+    yield lambda: delete_posts_batch(
+        ArchivedPost.objects.filter(author_id=user_id), batch_size
+    )
+    yield lambda: delete_batch(User.objects.filter(pk=user_id), batch_size)
+
+
+def group_steps(group_id, batch_size):
+    for alias in shard_aliases():
+        yield lambda alias=alias: ungroup_posts_batch(
+            posts_on(alias).filter(group_id=group_id), batch_size, alias
+        )
+    yield lambda: ungroup_posts_batch(
+        ArchivedPost.objects.filter(group_id=group_id), batch_size
+    )
+    yield lambda: delete_batch(Group.objects.filter(pk=group_id), batch_size)
+
+
+STEPS = {
+    DeletionTask.USER: user_steps,
+    DeletionTask.GROUP: group_steps,
+}
+
+
+def process_task(task, batch_size=None, pause=None, max_batches=None):
+    """Run batches of the task until it is done or max_batches is hit.
+
+    Returns True when the task is finished.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    pause = settings.DELETION_PAUSE if pause is None else pause
+    batches = 0
+    for step in STEPS[task.kind](task.object_id, batch_size):
+        while True:
+            if max_batches is not None and batches >= max_batches:
+                return False
+            selected, deleted = step()
+            batches += 1
+            if deleted:
+                DeletionTask.objects.filter(pk=task.pk).update(
+                    deleted_rows=F('deleted_rows') + deleted
+                )
+            if selected < batch_size:
+                break
+            time.sleep(pause)
+    DeletionTask.objects.filter(pk=task.pk).update(finished=timezone.now())
+    return True
+
+
+def process_pending(**options):
+    """Process every unfinished task, oldest first."""
+    finished = 0
+    for task in DeletionTask.objects.filter(finished__isnull=True):
+        finished += process_task(task, **options)
+    return finished
@@ -0,0 +1,154 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DigestRun, DigestState, Follow, User
+from .sharding import shard_querysets
+
+logger = logging.getLogger(__name__)
+
+SUBJECT = 'Новые записи ваших авторов на Yatube'
+
+
+def subscribers(after, batch_size):
+    """Next batch of active users with an email who follow somebody."""
+    return list(
+        User.objects.filter(
+            pk__gt=after, is_active=True, follower__isnull=False
+        )
+        .exclude(email='')
+        .distinct()
+        .order_by('pk')
+        .only('pk', 'username', 'email')[:batch_size]
+    )
+
+
+def new_posts(users, period_end):
+    """Map user id -> new posts of followed authors, newest first.
+
+    Follows of the batch are read with one query, posts with one query
+    per shard for all followed authors at once, then split by user
+    according to the time of their previous digest. Authors come from
+    the primary with one more query, shards have no users table.
+    """
+    default_since = period_end - timedelta(days=settings.DIGEST_PERIOD_DAYS)
+    sent_until = dict(
+        DigestState.objects.filter(user__in=users).values_list(
+            'user_id', 'sent_until'
+        )
+    )
+    since = {
+        user.pk: sent_until.get(user.pk, default_since) for user in users
+    }
+    readers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        user__in=users
+    ).values_list('user_id', 'author_id'):
+        readers[author_id].append(user_id)
+    posts = defaultdict(list)
+    if not readers:
+        return posts
+    authors = User.objects.in_bulk(list(readers))
+    querysets = shard_querysets(
+        list(readers),
+        pub_date__gt=min(since.values()),
+        pub_date__lte=period_end,
+    )
+    for queryset in querysets:
+        rows = queryset.order_by('-pub_date').values(
+            'pk', 'text', 'pub_date', 'author_id'
+        )
+        for row in rows:
+            row['author'] = authors.get(row['author_id'])
+            for user_id in readers[row['author_id']]:
+                if row['pub_date'] > since[user_id]:
+                    posts[user_id].append(row)
+    for user_posts in posts.values():
+        user_posts.sort(key=lambda row: row['pub_date'], reverse=True)
+    return posts
+
+
+def digest_message(template, user, posts):
+    limit = settings.DIGEST_MAX_POSTS
+    for row in posts[:limit]:
+        row['url'] = settings.DIGEST_BASE_URL + reverse(
+            'posts:post_detail', kwargs={'post_id': row['pk']}
+        )
+    body = template.render(
+        {
+            'user': user,
+            'posts': posts[:limit],
+            'more': max(len(posts) - limit, 0),
+            'follow_url': settings.DIGEST_BASE_URL
+            + reverse('posts:follow_index'),
+        }
+    )
+    return EmailMessage(SUBJECT, body, to=[user.email])
+
+
+def save_checkpoint(run, users):
+    """Remember that the batch got its digest."""
+    with transaction.atomic():
+        DigestState.objects.bulk_create(
+            (
+                DigestState(user_id=user.pk, sent_until=run.period_end)
+                for user in users
+            ),
+            ignore_conflicts=True,
+        )
+        DigestState.objects.filter(user__in=users).update(
+            sent_until=run.period_end
+        )
+        run.last_user_id = users[-1].pk
+        run.save(update_fields=['last_user_id'])
+
+
+def current_run(now=None):
+    """Unfinished run to resume, or a new one."""
+    run = DigestRun.objects.filter(finished__isnull=True).first()
+    if run is None:
+        run = DigestRun.objects.create(period_end=now or timezone.now())
+    return run
+
+
+def send_digest(batch_size=None, now=None):
+    """Send digests to all subscribers, batch by batch.
+
+    Every batch is sent over one SMTP connection and then checkpointed,
+    so an interrupted run continues with the next batch. A batch that
+    was sent but not checkpointed is sent again.
+    Returns number of sent emails.
+    """
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    run = current_run(now)
+    # Compiled once per run, not for every email.
+    template = get_template('posts/email/digest.txt')
+    sent = 0
+    while True:
+        users = subscribers(run.last_user_id, batch_size)
+        if not users:
+            break
+        posts = new_posts(users, run.period_end)
+        messages = [
+            digest_message(template, user, posts[user.pk])
+            for user in users
+            if posts.get(user.pk)
+        ]
+        if messages:
+            with get_connection() as connection:
+                sent += connection.send_messages(messages) or 0
+        save_checkpoint(run, users)
+        logger.info('Digest sent up to user %s', run.last_user_id)
+    run.finished = timezone.now()
+    run.save(update_fields=['finished'])
+    DigestRun.objects.filter(finished__isnull=False).exclude(
+        pk=run.pk
+    ).delete()
+    return sent
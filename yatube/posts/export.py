@@ -0,0 +1,257 @@
+import csv
+import heapq
+import zlib
+from datetime import datetime, time
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+from .sharding import SHARDED_MODELS, is_sharded, on_shard, shard_aliases
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# name: (model, {column: lookup}, date lookup, group lookup, author lookup)
+DATASETS = {
+    'posts': (
+        Post,
+        {
+            'id': 'pk',
+            'text': 'text',
+            'pub_date': 'pub_date',
+            'updated': 'updated',
+            'author': 'author__username',
+            'group': 'group__slug',
+            'image': 'image',
+            'status': 'status',
+            'publish_at': 'publish_at',
+        },
+        'pub_date',
+        'group__slug',
+        'author__username',
+    ),
+    'comments': (
+        Comment,
+        {
+            'id': 'pk',
+            'post': 'post_id',
+            'author': 'author__username',
+            'text': 'text',
+            'created': 'created',
+        },
+        'created',
+        'post__group__slug',
+        'author__username',
+    ),
+    'follows': (
+        Follow,
+        {
+            'id': 'pk',
+            'user': 'user__username',
+            'author': 'author__username',
+        },
+        None,
+        None,
+        'author__username',
+    ),
+    'groups': (
+        Group,
+        {
+            'id': 'pk',
+            'title': 'title',
+            'slug': 'slug',
+            'description': 'description',
+        },
+        None,
+        'slug',
+        None,
+    ),
+}
+
+
+# Users and groups stay on the primary database, shards are read by
+# ids instead: lookup -> (id lookup, model, name field).
+PRIMARY_LOOKUPS = {
+    'author__username': ('author_id', User, 'username'),
+    'group__slug': ('group_id', Group, 'slug'),
+    'post__group__slug': ('post__group_id', Group, 'slug'),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_moment(value, end_of_day=False):
+    """Accept YYYY-MM-DD or an ISO datetime."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'Invalid date: {value}')
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def shard_filters(filters):
+    """Replace filters by name with filters by id of the primary rows."""
+    result = {}
+    for lookup, value in filters.items():
+        if lookup in PRIMARY_LOOKUPS:
+            id_lookup, model, name = PRIMARY_LOOKUPS[lookup]
+            lookup = f'{id_lookup}__in'
+            value = list(
+                model.objects.filter(**{name: value}).values_list(
+                    'pk', flat=True
+                )
+            )
+        result[lookup] = value
+    return result
+
+
+def with_names(rows, lookups):
+    """Swap ids in the rows for names, one query per name column."""
+    rows = [list(row) for row in rows]
+    for index, lookup in enumerate(lookups):
+        if lookup not in PRIMARY_LOOKUPS:
+            continue
+        _, model, name = PRIMARY_LOOKUPS[lookup]
+        ids = {row[index] for row in rows if row[index] is not None}
+        names = dict(
+            model.objects.filter(pk__in=ids).values_list('pk', name)
+        )
+        for row in rows:
+            row[index] = names.get(row[index])
+    return rows
+
+
+def shard_rows(model, lookups, filters):
+    """Rows of every shard merged by id, read in chunks."""
+    filters = shard_filters(filters)
+    id_lookups = [
+        PRIMARY_LOOKUPS[lookup][0] if lookup in PRIMARY_LOOKUPS else lookup
+        for lookup in lookups
+    ]
+    merged = heapq.merge(
+        *(
+            on_shard(model, alias)
+            .filter(**filters)
+            .order_by('pk')
+            .values_list(*id_lookups)
+            .iterator(chunk_size=CHUNK_SIZE)
+            for alias in shard_aliases()
+        )
+    )
+    while True:
+        rows = list(islice(merged, CHUNK_SIZE))
+        if not rows:
+            return
+        yield from with_names(rows, lookups)
+
+
+def export_rows(dataset, since=None, until=None, group=None, author=None):
+    """Column names and an iterator over the rows of the dataset.
+
+    Posts and comments of a sharded site are read from every shard.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown dataset: {dataset}')
+    model, columns, date_field, group_lookup, author_lookup = DATASETS[
+        dataset
+    ]
+    filters = {}
+    if since or until:
+        if date_field is None:
+            raise ExportError(f'{dataset} cannot be filtered by date')
+        if since:
+            filters[f'{date_field}__gte'] = parse_moment(since)
+        if until:
+            filters[f'{date_field}__lte'] = parse_moment(until, True)
+    if group:
+        if group_lookup is None:
+            raise ExportError(f'{dataset} cannot be filtered by group')
+        filters[group_lookup] = group
+    if author:
+        if author_lookup is None:
+            raise ExportError(f'{dataset} cannot be filtered by author')
+        filters[author_lookup] = author
+    lookups = list(columns.values())
+    if model in SHARDED_MODELS and is_sharded():
+        return list(columns), shard_rows(model, lookups, filters)
+    queryset = model.objects.order_by('pk').filter(**filters)
+    return list(columns), queryset.values_list(*lookups).iterator(
+        chunk_size=CHUNK_SIZE
+    )
+
+
+class Echo:
+    """File-like object for csv.writer that returns the written line."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(names, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def csv_lines(names, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def buffered(lines):
+    """Join small lines into chunks of about BUFFER_SIZE bytes."""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(dataset, fmt='ndjson', compress=False, **filters):
+    """Return an iterator over bytes of the export.
+
+    Rows are read with a server-side iterator, so memory use does not
+    depend on the size of the table. Filters are validated before
+    the first chunk is produced.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f'Unknown format: {fmt}')
+    names, rows = export_rows(dataset, **filters)
+    lines = ndjson_lines if fmt == 'ndjson' else csv_lines
+    chunks = buffered(lines(names, rows))
+    return gzipped(chunks) if compress else chunks
+
+
+def export_filename(dataset, fmt, compress=False):
+    return f'{dataset}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .cache import cache_feed_page
+from .conditional import (
+    author_state,
+    conditional_page,
+    group_state,
+    index_state,
+)
+from .models import Group, User
+from .sharding import feed
+
+
+class LatestPostsFeed(Feed):
+    """RSS feed with the latest posts of the site."""
+
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов Yatube'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_posts(self, obj):
+        return feed()
+
+    def items(self, obj):
+        return self.get_posts(obj)[: settings.SYNDICATION_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(settings.SYNDICATION_TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', kwargs={'slug': obj.slug})
+
+    def get_posts(self, obj):
+        return feed(group=obj)
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', kwargs={'username': obj.username})
+
+    def get_posts(self, obj):
+        return feed(author_ids=[obj.pk])
+
+
+class AtomLatestPostsFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class AtomGroupPostsFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AtomAuthorPostsFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def syndication_view(feed, key_prefix, state_func):
+    """Cache generated feed until posts change and answer
+    conditional requests of aggregators."""
+    return cache_feed_page(key_prefix, settings.SYNDICATION_CACHE_TIMEOUT)(
+        conditional_page(state_func, per_user=False)(feed)
+    )
+
+
+latest_rss = syndication_view(LatestPostsFeed(), 'rss', index_state)
+latest_atom = syndication_view(AtomLatestPostsFeed(), 'atom', index_state)
+group_rss = syndication_view(GroupPostsFeed(), 'group_rss', group_state)
+group_atom = syndication_view(
+    AtomGroupPostsFeed(), 'group_atom', group_state
+)
+author_rss = syndication_view(AuthorPostsFeed(), 'author_rss', author_state)
+author_atom = syndication_view(
+    AtomAuthorPostsFeed(), 'author_atom', author_state
+)
@@ -0,0 +1,137 @@
+import re
+
+from django.db import router
+from django.db.models import Q
+
+from .cache import invalidate_feeds
+from .models import Follow, User
+from .notifications import notify_follows
+from .recommendations import forget_recommendations
+
+# Follow field holding the listed people -> field holding the profile.
+DIRECTIONS = {
+    'followers': ('user', 'author'),
+    'following': ('author', 'user'),
+}
+
+
+class FollowPage:
+    """One keyset page of people. The next page starts below the last
+    follow id instead of an OFFSET, so deep pages cost as much as
+    the first one."""
+
+    def __init__(self, people, next_cursor):
+        self.people = people
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.people)
+
+    def __len__(self):
+        return len(self.people)
+
+
+def parse_cursor(value):
+    """Follow id the page starts after, None for the first page."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def follow_page(profile, direction, viewer, cursor=None, limit=10):
+    """Followers or followed authors of the profile, newest first.
+
+    Every person gets `you_follow` and `follows_you` flags relative
+    to the viewer, loaded for the whole page with one query.
+    """
+    person_field, profile_field = DIRECTIONS[direction]
+    follows = Follow.objects.filter(**{profile_field: profile})
+    if cursor is not None:
+        follows = follows.filter(pk__lt=cursor)
+    rows = list(
+        follows.select_related(person_field).order_by('-pk')[:limit + 1]
+    )
+    next_cursor = rows[limit - 1].pk if len(rows) > limit else None
+    people = [getattr(row, person_field) for row in rows[:limit]]
+    mark_mutual(people, viewer)
+    return FollowPage(people, next_cursor)
+
+
+def mark_mutual(people, viewer):
+    you_follow, follows_you = set(), set()
+    if viewer.is_authenticated and people:
+        ids = [person.pk for person in people]
+        pairs = Follow.objects.filter(
+            Q(user=viewer, author_id__in=ids)
+            | Q(author=viewer, user_id__in=ids)
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in pairs:
+            if user_id == viewer.pk:
+                you_follow.add(author_id)
+            if author_id == viewer.pk:
+                follows_you.add(user_id)
+    for person in people:
+        person.you_follow = person.pk in you_follow
+        person.follows_you = person.pk in follows_you
+    return people
+
+
+def split_usernames(values):
+    """Usernames from form values separated by commas or whitespace,
+    in order and without repeats."""
+    names = []
+    for value in values:
+        names.extend(re.split(r'[\s,]+', value.strip()))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def follows_changed(user):
+    """Signals are not sent for bulk statements, so the feed cache and
+    suggestions are refreshed once per batch instead of per row."""
+    invalidate_feeds()
+    forget_recommendations(user.pk)
+
+
+def follow_many(user, usernames):
+    """Follow all existing authors from the list with one INSERT.
+
+    Returns number of new follows.
+    """
+    author_ids = set(
+        User.objects.filter(username__in=usernames)
+        .exclude(pk=user.pk)
+        .values_list('pk', flat=True)
+    )
+    author_ids -= set(
+        Follow.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True)
+    )
+    Follow.objects.bulk_create(
+        (Follow(user=user, author_id=author_id) for author_id in author_ids),
+        ignore_conflicts=True,
+    )
+    if author_ids:
+        notify_follows(user, author_ids)
+        follows_changed(user)
+    return len(author_ids)
+
+
+def unfollow_many(user, usernames):
+    """Unfollow the authors with a single DELETE statement.
+
+    Returns number of removed follows. The rows are deleted without
+    per-row post_delete signals, caches are refreshed once.
+    """
+    follows = Follow.objects.filter(
+        user=user, author__username__in=usernames
+    )
+    # QuerySet.delete() would select the rows and send post_delete for
+    # each of them, as Follow has signal receivers. Nothing references
+    # Follow, so the raw DELETE skips no cascades.
+    deleted = follows._raw_delete(router.db_for_write(Follow))
+    if deleted:
+        follows_changed(user)
+    return deleted
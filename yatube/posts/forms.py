@@ -1,4 +1,5 @@
 from django import forms
+from django.utils import timezone
 
 from .models import Comment, Post
 
@@ -9,6 +10,40 @@ class PostForm(forms.ModelForm):
         fields = ('text', 'group', 'image')
 
 
+class PublishForm(forms.ModelForm):
+    """Draft or scheduled publication, shown next to PostForm."""
+
+    class Meta:
+        model = Post
+        fields = ('status', 'publish_at')
+        widgets = {
+            'publish_at': forms.DateTimeInput(
+                attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'
+            ),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['status'].required = False
+        publish_at = self.fields['publish_at']
+        publish_at.input_formats = [
+            '%Y-%m-%dT%H:%M',
+            *publish_at.input_formats,
+        ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        status = cleaned_data.get('status') or Post.PUBLISHED
+        cleaned_data['status'] = status
+        if status != Post.SCHEDULED:
+            cleaned_data['publish_at'] = None
+        elif not cleaned_data.get('publish_at'):
+            self.add_error('publish_at', 'Укажите время публикации')
+        elif cleaned_data['publish_at'] <= timezone.now():
+            self.add_error('publish_at', 'Время публикации уже прошло')
+        return cleaned_data
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .cache import get_feed_version
+from .models import Group
+from .sharding import shard_querysets
+
+SORTS = ('title', 'activity')
+
+
+def group_stats():
+    """Map group id -> published posts, their authors and the latest
+    publication, with one aggregate query per shard.
+
+    All posts of an author live in one shard, so distinct authors
+    of the shards add up.
+    """
+    stats = {}
+    for posts in shard_querysets(group__isnull=False):
+        rows = (
+            posts.order_by()
+            .values('group_id')
+            .annotate(
+                posts=Count('pk'),
+                authors=Count('author_id', distinct=True),
+                last_post=Max('pub_date'),
+            )
+        )
+        for row in rows:
+            total = stats.setdefault(
+                row['group_id'], {'posts': 0, 'authors': 0, 'last_post': None}
+            )
+            total['posts'] += row['posts']
+            total['authors'] += row['authors']
+            last_post = total['last_post']
+            if last_post is None or row['last_post'] > last_post:
+                total['last_post'] = row['last_post']
+    return stats
+
+
+def groups_directory():
+    """Every group with its counters, read through the cache.
+
+    The entry is keyed by the feed version, so it's dropped together
+    with cached feed pages when posts or groups change.
+    """
+    key = f'groups_directory:{get_feed_version()}'
+    groups = cache.get(key)
+    if groups is None:
+        stats = group_stats()
+        empty = {'posts': 0, 'authors': 0, 'last_post': None}
+        groups = [
+            dict(group, **stats.get(group['pk'], empty))
+            for group in Group.objects.values(
+                'pk', 'slug', 'title', 'description'
+            )
+        ]
+        cache.set(key, groups, settings.GROUPS_CACHE_TIMEOUT)
+    return groups
+
+
+def sorted_groups(groups, sort):
+    """Groups by title, or the most recently active first."""
+    groups = sorted(groups, key=lambda group: group['title'].casefold())
+    if sort == 'activity':
+        groups.sort(
+            key=lambda group: (
+                group['last_post'] is not None,
+                group['last_post'] or 0,
+            ),
+            reverse=True,
+        )
+    return groups
@@ -0,0 +1,151 @@
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Group, PostRevision
+
+
+def pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode())
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode())
+
+
+def make_diff(old, new):
+    """Line diff turning `old` into `new`.
+
+    Operations are [start, stop] ranges of old lines to copy
+    and strings to insert.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_diff(old, ops):
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def with_texts(revisions):
+    """Pairs (revision, text) for consecutive revisions starting
+    with a snapshot."""
+    text = None
+    for revision in revisions:
+        data = unpack(revision.data)
+        text = data if revision.is_snapshot else apply_diff(text, data)
+        yield revision, text
+
+
+def revision_text(post_id, number):
+    """Text of one revision, rebuilt from the nearest snapshot."""
+    revisions = PostRevision.objects.filter(post_id=post_id)
+    start = revisions.filter(is_snapshot=True, number__lte=number).aggregate(
+        start=Max('number')
+    )['start']
+    chain = revisions.filter(number__gte=start, number__lte=number)
+    texts = [text for _, text in with_texts(chain.order_by('number'))]
+    return texts[-1]
+
+
+def version(post):
+    """Fields of a post kept in its history."""
+    return post.text, post.group_id, post.image.name or ''
+
+
+def record_revision(post_id, text, group_id, image):
+    """Store the version of a post as it was before an edit.
+
+    Every POST_REVISION_SNAPSHOT_EVERY-th revision keeps the whole
+    text, the others only a compressed diff against the previous one,
+    so any version is rebuilt from at most that many rows.
+    """
+    with transaction.atomic():
+        last = (
+            PostRevision.objects.filter(post_id=post_id)
+            .order_by('-number')
+            .first()
+        )
+        number = last.number + 1 if last else 1
+        snapshot = (
+            last is None
+            or (number - 1) % settings.POST_REVISION_SNAPSHOT_EVERY == 0
+        )
+        if snapshot:
+            data = pack(text)
+        else:
+            data = pack(make_diff(revision_text(post_id, last.number), text))
+        PostRevision.objects.create(
+            post_id=post_id,
+            number=number,
+            created=timezone.now(),
+            group_id=group_id,
+            image=image,
+            is_snapshot=snapshot,
+            data=data,
+        )
+        prune(post_id)
+
+
+def prune(post_id):
+    """Keep the last POST_REVISIONS_MAX revisions of the post.
+
+    The oldest kept revision becomes a snapshot, so the rest can
+    still be rebuilt after older rows are gone.
+    """
+    revisions = PostRevision.objects.filter(post_id=post_id)
+    numbers = list(
+        revisions.order_by('-number').values_list('number', flat=True)
+    )
+    if len(numbers) <= settings.POST_REVISIONS_MAX:
+        return
+    oldest = numbers[settings.POST_REVISIONS_MAX - 1]
+    first = revisions.get(number=oldest)
+    if not first.is_snapshot:
+        first.data = pack(revision_text(post_id, oldest))
+        first.is_snapshot = True
+        first.save(update_fields=['data', 'is_snapshot'])
+    revisions.filter(number__lt=oldest).delete()
+
+
+def post_history(post_id):
+    """Every stored version of the post, newest first, rebuilt
+    in one pass over the revisions."""
+    revisions = list(
+        with_texts(
+            PostRevision.objects.filter(post_id=post_id).order_by('number')
+        )
+    )
+    groups = Group.objects.in_bulk(
+        {revision.group_id for revision, _ in revisions if revision.group_id}
+    )
+    return [
+        {
+            'number': revision.number,
+            'created': revision.created,
+            'text': text,
+            'group': groups.get(revision.group_id),
+            'image': revision.image,
+        }
+        for revision, text in reversed(revisions)
+    ]
@@ -0,0 +1,320 @@
+import csv
+import gzip
+import io
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_feeds
+from .comments import assign_root_paths
+from .markup import render_text
+from .models import Comment, Group, Post, PostKey, User
+from .sharding import (
+    DEFAULT_SHARD,
+    is_sharded,
+    on_shard,
+    posts_on,
+    register_posts,
+    shard_aliases,
+    shards_for_authors,
+    shards_for_posts,
+)
+from .tags import index_posts
+
+BATCH_SIZE = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    rejected: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        total = self.created + len(self.rejected)
+        return total / self.elapsed if self.elapsed else 0.0
+
+
+def open_rows(path, fmt=None):
+    """Yield rows of NDJSON or CSV file (optionally .gz) as dicts."""
+    name = path[:-3] if path.endswith('.gz') else path
+    fmt = fmt or name.rsplit('.', 1)[-1]
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError(f'Unknown format: {fmt}')
+    opener = gzip.open if path.endswith('.gz') else io.open
+    with opener(path, 'rt', encoding='utf-8', newline='') as source:
+        if fmt == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def preserved_dates(model, *field_names):
+    """Let bulk_create keep dates from the source instead of now().
+
+    Meant for management commands: the fields are shared by the
+    whole process while the block runs.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(item.auto_now, item.auto_now_add) for item in fields]
+    for item in fields:
+        item.auto_now = item.auto_now_add = False
+    try:
+        yield
+    finally:
+        for item, (auto_now, auto_now_add) in zip(fields, saved):
+            item.auto_now, item.auto_now_add = auto_now, auto_now_add
+
+
+def parse_moment(value, default=None):
+    if not value:
+        return default or timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise RowError(f'invalid date {value!r}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def row_id(row):
+    value = row.get('id')
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'invalid id {value!r}')
+
+
+class Importer:
+    model = None
+    date_fields = ()
+
+    def __init__(self):
+        self.users = dict(User.objects.values_list('username', 'pk'))
+
+    def author_id(self, row):
+        author_id = self.users.get(row.get('author'))
+        if author_id is None:
+            raise RowError(f'unknown author {row.get("author")!r}')
+        return author_id
+
+    def text(self, row):
+        text = row.get('text')
+        if not text:
+            raise RowError('empty text')
+        return text
+
+    def build(self, row):
+        raise NotImplementedError
+
+    def existing_ids(self, ids):
+        return set(
+            self.model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+
+    def shards(self, objects):
+        """Map shard alias -> objects of the batch stored there."""
+        return {DEFAULT_SHARD: objects} if objects else {}
+
+    def saved(self, objects):
+        """Called with every stored batch, bulk_create sends no signals."""
+
+    def validate_batch(self, objects):
+        """Drop objects whose id is already taken; return rejections."""
+        ids = [obj.pk for _, obj in objects if obj.pk is not None]
+        taken = self.existing_ids(ids) if ids else set()
+        seen = set()
+        valid, rejected = [], []
+        for row, obj in objects:
+            if obj.pk is not None and (obj.pk in taken or obj.pk in seen):
+                rejected.append((row, f'id {obj.pk} already exists'))
+                continue
+            seen.add(obj.pk)
+            valid.append(obj)
+        return valid, rejected
+
+    def run(self, rows, batch_size=BATCH_SIZE):
+        result = ImportResult()
+        started = time.monotonic()
+        with preserved_dates(self.model, *self.date_fields):
+            for batch in batches(rows, batch_size):
+                objects = []
+                for row in batch:
+                    try:
+                        objects.append((row, self.build(row)))
+                    except RowError as error:
+                        result.rejected.append((row, str(error)))
+                with transaction.atomic():
+                    valid, rejected = self.validate_batch(objects)
+                    for alias, items in self.shards(valid).items():
+                        on_shard(self.model, alias).bulk_create(items)
+                    self.saved(valid)
+                result.created += len(valid)
+                result.rejected.extend(rejected)
+        if result.created:
+            invalidate_feeds()
+        result.elapsed = time.monotonic() - started
+        return result
+
+
+class PostImporter(Importer):
+    model = Post
+    date_fields = ('pub_date', 'updated')
+
+    def __init__(self):
+        super().__init__()
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+
+    def group_id(self, row):
+        slug = row.get('group')
+        if not slug:
+            return None
+        group_id = self.groups.get(slug)
+        if group_id is None:
+            raise RowError(f'unknown group {slug!r}')
+        return group_id
+
+    def status(self, row):
+        status = row.get('status') or Post.PUBLISHED
+        if status not in dict(Post.STATUS_CHOICES):
+            raise RowError(f'invalid status {status!r}')
+        return status
+
+    def publish_at(self, row, status):
+        value = row.get('publish_at')
+        if status == Post.SCHEDULED and not value:
+            raise RowError('scheduled post without publish_at')
+        return parse_moment(value) if value else None
+
+    def build(self, row):
+        pub_date = parse_moment(row.get('pub_date'))
+        status = self.status(row)
+        post = Post(
+            pk=row_id(row),
+            text=self.text(row),
+            author_id=self.author_id(row),
+            group_id=self.group_id(row),
+            image=row.get('image') or '',
+            pub_date=pub_date,
+            updated=parse_moment(row.get('updated'), pub_date),
+            status=status,
+            publish_at=self.publish_at(row, status),
+        )
+        # bulk_create skips the pre_save signal that renders the text.
+        return render_text(post)
+
+    def existing_ids(self, ids):
+        if not is_sharded():
+            return super().existing_ids(ids)
+        return set(
+            PostKey.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+
+    def validate_batch(self, objects):
+        valid, rejected = super().validate_batch(objects)
+        # bulk_create skips the signal that takes a global post id.
+        if is_sharded():
+            register_posts(valid)
+        return valid, rejected
+
+    def shards(self, objects):
+        by_author = {}
+        for post in objects:
+            by_author.setdefault(post.author_id, []).append(post)
+        return {
+            alias: [post for pk in author_ids for post in by_author[pk]]
+            for alias, author_ids in shards_for_authors(by_author).items()
+        }
+
+    def saved(self, objects):
+        index_posts(objects)
+
+
+class CommentImporter(Importer):
+    model = Comment
+    date_fields = ('created',)
+
+    def build(self, row):
+        try:
+            post_id = int(row.get('post'))
+        except (TypeError, ValueError):
+            raise RowError(f'invalid post {row.get("post")!r}')
+        comment = Comment(
+            pk=row_id(row),
+            post_id=post_id,
+            author_id=self.author_id(row),
+            text=self.text(row),
+            created=parse_moment(row.get('created')),
+        )
+        return render_text(comment)
+
+    def existing_ids(self, ids):
+        # Comment ids are only unique inside a shard, an id taken
+        # in any of them is rejected.
+        taken = set()
+        for alias in shard_aliases():
+            taken.update(
+                on_shard(Comment, alias)
+                .filter(pk__in=ids)
+                .values_list('pk', flat=True)
+            )
+        return taken
+
+    def validate_batch(self, objects):
+        post_ids = {obj.post_id for _, obj in objects}
+        known = set()
+        for alias, ids in shards_for_posts(post_ids).items():
+            known.update(
+                posts_on(alias).filter(pk__in=ids).values_list('pk', flat=True)
+            )
+        rejected = [
+            (row, f'unknown post {obj.post_id}')
+            for row, obj in objects
+            if obj.post_id not in known
+        ]
+        valid, taken = super().validate_batch(
+            [(row, obj) for row, obj in objects if obj.post_id in known]
+        )
+        # bulk_create skips signals, imported comments start new threads.
+        assign_root_paths(valid)
+        return valid, rejected + taken
+
+    def shards(self, objects):
+        by_post = {}
+        for comment in objects:
+            by_post.setdefault(comment.post_id, []).append(comment)
+        return {
+            alias: [comment for pk in post_ids for comment in by_post[pk]]
+            for alias, post_ids in shards_for_posts(by_post).items()
+        }
+
+
+IMPORTERS = {
+    'posts': PostImporter,
+    'comments': CommentImporter,
+}
@@ -0,0 +1,51 @@
+from django.db import router, transaction
+from django.db.models import F
+
+from .models import Like, Post
+from .sharding import on_shard
+
+
+def set_like(user, post, liked=True):
+    """Like or unlike the post. Repeating the call changes nothing.
+
+    The like row and the counter of the post live in the same shard,
+    so both change in one transaction. Returns True if anything changed.
+    """
+    alias = router.db_for_write(Post, instance=post)
+    with transaction.atomic(using=alias):
+        if liked:
+            _, changed = Like.objects.using(alias).get_or_create(
+                user=user, post=post
+            )
+            delta = 1
+        else:
+            deleted, _ = (
+                Like.objects.using(alias).filter(user=user, post=post).delete()
+            )
+            changed = deleted > 0
+            delta = -1
+        if changed:
+            Post.objects.using(alias).filter(pk=post.pk).update(
+                likes_count=F('likes_count') + delta
+            )
+    return changed
+
+
+def mark_liked(posts, user):
+    """Set `liked` on every post of a page with one query per shard."""
+    posts = list(posts)
+    liked = set()
+    if user.is_authenticated:
+        shards = {}
+        for post in posts:
+            if isinstance(post, Post):
+                shards.setdefault(post._state.db, []).append(post.pk)
+        for alias, post_ids in shards.items():
+            liked.update(
+                on_shard(Like, alias)
+                .filter(user=user, post_id__in=post_ids)
+                .values_list('post_id', flat=True)
+            )
+    for post in posts:
+        post.liked = post.pk in liked and isinstance(post, Post)
+    return posts
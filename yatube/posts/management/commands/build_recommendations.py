@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db_router import pin_primary
+from posts.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute "who to follow" suggestions from the follow graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RECOMMENDATIONS_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        pin_primary()
+        users = build_recommendations(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Рекомендации построены для: {users}')
+        )
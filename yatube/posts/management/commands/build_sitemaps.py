@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Write sitemap index and sitemaps of posts, groups and profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default=settings.SITEMAP_BASE_URL)
+        parser.add_argument(
+            '--limit', type=int, default=settings.SITEMAP_URLS_PER_FILE
+        )
+
+    def handle(self, *args, **options):
+        counts = build_sitemaps(
+            base_url=options['base_url'], limit=options['limit']
+        )
+        for section, count in counts.items():
+            self.stdout.write(f'{section}: {count}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Карта сайта: {settings.SITEMAP_ROOT}')
+        )
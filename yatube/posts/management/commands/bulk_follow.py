@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.follows import follow_many, split_usernames, unfollow_many
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Follow or unfollow many authors on behalf of a user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('authors', nargs='*')
+        parser.add_argument(
+            '--file',
+            help='file with usernames of authors, one or more per line',
+        )
+        parser.add_argument('--unfollow', action='store_true')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        values = list(options['authors'])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as lines:
+                values.extend(lines)
+        usernames = split_usernames(values)
+        if options['unfollow']:
+            count = unfollow_many(user, usernames)
+            message = f'Отписок: {count}'
+        else:
+            count = follow_many(user, usernames)
+            message = f'Новых подписок: {count}'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import DATASETS, FORMATS, ExportError, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Stream posts, comments, follows or groups to NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument(
+            '--format', dest='fmt', choices=sorted(FORMATS), default='ndjson'
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--since', help='YYYY-MM-DD or ISO datetime')
+        parser.add_argument('--until', help='YYYY-MM-DD or ISO datetime')
+        parser.add_argument('--group', help='slug of the group')
+        parser.add_argument('--author', help='username of the author')
+        parser.add_argument(
+            '--output', default='-', help='file path, "-" for stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export_stream(
+                options['dataset'],
+                fmt=options['fmt'],
+                compress=options['gzip'],
+                since=options['since'],
+                until=options['until'],
+                group=options['group'],
+                author=options['author'],
+            )
+        except ExportError as error:
+            raise CommandError(error)
+        if options['output'] == '-':
+            self.write_chunks(sys.stdout.buffer, chunks)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write_chunks(output, chunks)
+
+    def write_chunks(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import BATCH_SIZE, IMPORTERS, open_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Import posts or comments from NDJSON/CSV (optionally .gz) '
+        'keeping their original dates. Authors and groups must exist.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', dest='fmt', choices=('ndjson', 'csv'), default=None
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--rejects', help='write rejected rows to this NDJSON file'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = open_rows(options['path'], options['fmt'])
+            result = IMPORTERS[options['dataset']]().run(
+                rows, batch_size=options['batch_size']
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        if options['rejects']:
+            with open(options['rejects'], 'w', encoding='utf-8') as rejects:
+                for row, reason in result.rejected:
+                    rejects.write(
+                        json.dumps(
+                            {'reason': reason, 'row': row}, ensure_ascii=False
+                        )
+                        + '\n'
+                    )
+        else:
+            for row, reason in result.rejected[:10]:
+                self.stderr.write(f'{reason}: {row}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Создано: {result.created}, '
+                f'отклонено: {len(result.rejected)}, '
+                f'{result.rows_per_second:.0f} строк/с'
+            )
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.deletion import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete queued users and groups with their content in small '
+        'batches. Safe to interrupt and run again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DELETION_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=settings.DELETION_PAUSE,
+            help='seconds to sleep between batches',
+        )
+        parser.add_argument(
+            '--loop',
+            type=float,
+            default=None,
+            help='keep polling for new tasks every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            finished = process_pending(
+                batch_size=options['batch_size'], pause=options['pause']
+            )
+            if finished:
+                self.stdout.write(f'Завершено задач: {finished}')
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
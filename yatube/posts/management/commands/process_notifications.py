@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.notifications import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Fan out queued comment and follow events into notifications '
+        'of their recipients, in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.NOTIFICATION_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--loop',
+            type=float,
+            default=None,
+            help='keep polling for new events every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending(batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано событий: {processed}')
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
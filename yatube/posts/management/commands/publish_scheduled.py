@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.publishing import publish_due
+
+
+class Command(BaseCommand):
+    help = 'Publish scheduled posts whose publication time has come.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PUBLISH_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--loop',
+            type=float,
+            default=None,
+            help='keep checking for due posts every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            published = publish_due(batch_size=options['batch_size'])
+            if published:
+                self.stdout.write(f'Опубликовано постов: {published}')
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import User
+from posts.rebalance import pin_authors, rebalance_author
+
+
+class Command(BaseCommand):
+    help = (
+        'Move posts and comments of an author to another shard, '
+        'or pin current placement of all authors with --pin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', nargs='?')
+        parser.add_argument('shard', nargs='?')
+        parser.add_argument(
+            '--pin',
+            action='store_true',
+            help='write the current placement into the shard map',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.REBALANCE_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--settle',
+            type=float,
+            default=settings.SHARD_MAP_CACHE_TIMEOUT,
+            help='seconds to wait for workers to reload the shard map',
+        )
+
+    def handle(self, *args, **options):
+        if options['pin']:
+            count = pin_authors(batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Закреплено авторов: {count}')
+            )
+            return
+        if not options['username'] or not options['shard']:
+            raise CommandError('Укажите пользователя и шард или --pin')
+        author = User.objects.filter(username=options['username']).first()
+        if author is None:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        try:
+            moved = rebalance_author(
+                author.pk,
+                options['shard'],
+                batch_size=options['batch_size'],
+                settle=options['settle'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f'Перенесено постов: {moved}'))
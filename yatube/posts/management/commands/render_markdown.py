@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db_router import pin_primary
+from posts.markup import rerender
+
+
+class Command(BaseCommand):
+    help = (
+        'Render posts and comments stored with another MARKDOWN_VERSION. '
+        'Run it after changing the renderer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MARKDOWN_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        pin_primary()
+        updated = rerender(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Перерисовано текстов: {updated}')
+        )
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db_router import pin_primary
+from posts.digest import send_digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Email every subscriber new posts of followed authors since '
+        'the previous digest. An interrupted run resumes from the last '
+        'finished batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DIGEST_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        pin_primary()
+        sent = send_digest(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Отправлено писем: {sent}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.db_router import pin_primary
+from posts.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Add activity since the previous run to trending scores. '
+        'Run it periodically, e.g. every few minutes from cron.'
+    )
+
+    def handle(self, *args, **options):
+        pin_primary()
+        changed = update_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлён рейтинг постов: {changed}')
+        )
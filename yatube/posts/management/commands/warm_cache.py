@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.warmup import warm_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Pre-render first pages of index, top groups and top profiles '
+        'into the page cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.CACHE_WARMUP_PAGES
+        )
+        parser.add_argument(
+            '--groups', type=int, default=settings.CACHE_WARMUP_TOP_GROUPS
+        )
+        parser.add_argument(
+            '--profiles',
+            type=int,
+            default=settings.CACHE_WARMUP_TOP_PROFILES,
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.CACHE_WARMUP_WORKERS
+        )
+        parser.add_argument('--host', default=settings.CACHE_WARMUP_HOST)
+        parser.add_argument('--secure', action='store_true')
+
+    def handle(self, *args, **options):
+        result = warm_cache(
+            pages=options['pages'],
+            top_groups=options['groups'],
+            top_profiles=options['profiles'],
+            workers=options['workers'],
+            host=options['host'],
+            secure=options['secure'],
+        )
+        for url, status_code in result.failed:
+            self.stderr.write(f'{url}: {status_code}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Записано в кэш: {result.entries}, '
+                f'время: {result.elapsed:.2f} с'
+            )
+        )
@@ -0,0 +1,179 @@
+import re
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import escape
+
+from .cache import invalidate_feeds
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .sharding import on_shard, shard_aliases
+from .tags import HASHTAG_RE
+
+FENCE = '```'
+HEADING_RE = re.compile(r'(#{1,4})\s+(.*)')
+BULLET_RE = re.compile(r'[-*]\s+(.*)')
+NUMBER_RE = re.compile(r'\d+[.)]\s+(.*)')
+CODE_RE = re.compile(r'`([^`]+)`')
+LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+STRONG_RE = re.compile(r'\*\*(.+?)\*\*')
+EMPHASIS_RE = re.compile(r'\*(.+?)\*')
+STRIKE_RE = re.compile(r'~~(.+?)~~')
+# Browsers read a backslash as a slash, so /\host is off-site too.
+SAFE_URL_RE = re.compile(r'(https?://|mailto:|/(?![/\\]))', re.IGNORECASE)
+# Placeholder of finished HTML, the text is escaped so it has no \x00.
+MARK = '\x00{}\x00'
+MARK_RE = re.compile('\x00(\\d+)\x00')
+
+
+def emphasis(text):
+    text = STRONG_RE.sub(r'<strong>\1</strong>', text)
+    text = EMPHASIS_RE.sub(r'<em>\1</em>', text)
+    return STRIKE_RE.sub(r'<del>\1</del>', text)
+
+
+def inline(text):
+    """Inline markup of escaped text.
+
+    Code spans, links and hashtags are replaced with placeholders
+    first, so nothing inside code or urls is formatted.
+    """
+    spans = []
+
+    def keep(html):
+        spans.append(html)
+        return MARK.format(len(spans) - 1)
+
+    def link(match):
+        label, url = match.groups()
+        if not SAFE_URL_RE.match(url):
+            return match.group(0)
+        return keep(
+            f'<a href="{url}" rel="nofollow noopener">{emphasis(label)}</a>'
+        )
+
+    def hashtag(match):
+        name = match.group(1).lower()
+        url = reverse('posts:tag_posts', kwargs={'name': name})
+        return keep(f'<a href="{url}">{match.group(0)}</a>')
+
+    def restore(text):
+        return MARK_RE.sub(
+            lambda match: restore(spans[int(match.group(1))]), text
+        )
+
+    text = CODE_RE.sub(
+        lambda match: keep(f'<code>{match.group(1)}</code>'), text
+    )
+    text = LINK_RE.sub(link, text)
+    text = HASHTAG_RE.sub(hashtag, text)
+    return restore(emphasis(text))
+
+
+def list_block(lines, pattern, tag):
+    items = ''.join(
+        f'<li>{inline(pattern.match(line).group(1))}</li>' for line in lines
+    )
+    return f'<{tag}>{items}</{tag}>'
+
+
+def block(lines):
+    """HTML of one block of consecutive non-empty lines."""
+    heading = HEADING_RE.match(lines[0])
+    if len(lines) == 1 and heading:
+        # Post titles are h1-h2 on the page, so # starts at h3.
+        level = len(heading.group(1)) + 2
+        return f'<h{level}>{inline(heading.group(2))}</h{level}>'
+    if all(line.startswith('&gt;') for line in lines):
+        quoted = [line[4:].lstrip() for line in lines]
+        return f'<blockquote>{blocks(quoted)}</blockquote>'
+    if all(BULLET_RE.match(line) for line in lines):
+        return list_block(lines, BULLET_RE, 'ul')
+    if all(NUMBER_RE.match(line) for line in lines):
+        return list_block(lines, NUMBER_RE, 'ol')
+    return '<p>' + '<br>'.join(inline(line) for line in lines) + '</p>'
+
+
+def blocks(lines):
+    html, current = [], []
+    lines = iter(lines)
+    for line in lines:
+        if line.strip().startswith(FENCE):
+            if current:
+                html.append(block(current))
+                current = []
+            code = []
+            for line in lines:
+                if line.strip().startswith(FENCE):
+                    break
+                code.append(line)
+            html.append('<pre><code>' + '\n'.join(code) + '</code></pre>')
+        elif line.strip():
+            current.append(line.rstrip())
+        elif current:
+            html.append(block(current))
+            current = []
+    if current:
+        html.append(block(current))
+    return ''.join(html)
+
+
+def render(text):
+    """Sanitized HTML of a Markdown subset.
+
+    The whole text is escaped first and only the tags produced here
+    get into the result, so any HTML in the text stays text. Links
+    are kept only for http(s), mailto and site-relative urls.
+    """
+    text = text.replace('\r\n', '\n').replace('\x00', '')
+    return blocks(escape(text).split('\n'))
+
+
+def render_text(obj):
+    """Store the HTML of obj.text with the current renderer version."""
+    obj.text_html = render(obj.text)
+    obj.html_version = settings.MARKDOWN_VERSION
+    return obj
+
+
+def rerender_batch(queryset, after, batch_size):
+    """Render the next batch of stale rows.
+
+    Returns number of rendered rows and the pk to continue after.
+    """
+    rows = list(
+        queryset.exclude(html_version=settings.MARKDOWN_VERSION)
+        .filter(pk__gt=after)
+        .order_by('pk')
+        .only('pk', 'text')[:batch_size]
+    )
+    if not rows:
+        return 0, after
+    queryset.bulk_update(
+        [render_text(row) for row in rows], ['text_html', 'html_version']
+    )
+    return len(rows), rows[-1].pk
+
+
+def rerender(batch_size=None):
+    """Render again every text stored with another MARKDOWN_VERSION.
+
+    Returns number of updated rows.
+    """
+    batch_size = batch_size or settings.MARKDOWN_BATCH_SIZE
+    querysets = [
+        on_shard(model, alias)
+        for alias in shard_aliases()
+        for model in (Post, Comment)
+    ]
+    querysets += [ArchivedPost.objects.all(), ArchivedComment.objects.all()]
+    updated = 0
+    for queryset in querysets:
+        after = 0
+        while True:
+            count, after = rerender_batch(queryset, after, batch_size)
+            updated += count
+            if count < batch_size:
+                break
+    if updated:
+        invalidate_feeds()
+    return updated
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0023_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_end', models.DateTimeField(verbose_name='Посты до')),
+                ('last_user_id', models.PositiveIntegerField(default=0, verbose_name='Обработано до')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершён')),
+            ],
+            options={
+                'verbose_name': 'Рассылка дайджеста',
+                'verbose_name_plural': 'Рассылки дайджеста',
+                'ordering': ['-pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DigestState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='digest_state', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('sent_until', models.DateTimeField(verbose_name='Отправлено до')),
+            ],
+            options={
+                'verbose_name': 'Дайджест пользователя',
+                'verbose_name_plural': 'Дайджесты пользователей',
+            },
+        ),
+    ]
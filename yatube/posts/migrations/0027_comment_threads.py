@@ -0,0 +1,71 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:00
+
+from django.db import migrations, models, router
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def encode(number):
+    segment = ''
+    for _ in range(4):
+        number, digit = divmod(number, len(DIGITS))
+        segment = DIGITS[digit] + segment
+    return segment
+
+
+def fill_paths(apps, schema_editor):
+    """Existing comments become threads, the newest sorts first.
+
+    Shards have comments but no archive, so each table is filled
+    only where the router migrates it.
+    """
+    alias = schema_editor.connection.alias
+    for name in ('Comment', 'ArchivedComment'):
+        model = apps.get_model('posts', name)
+        if not router.allow_migrate_model(alias, model):
+            continue
+        numbers = {}
+        comments = list(
+            model.objects.using(alias)
+            .order_by('post_id', 'created')
+            .values_list('pk', 'post_id')
+        )
+        for pk, post_id in comments:
+            number = numbers.get(post_id, len(DIGITS) ** 4) - 1
+            numbers[post_id] = number
+            model.objects.using(alias).filter(pk=pk).update(
+                path=encode(number)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_post_revisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='path',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Путь в ветке'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Путь в ветке'),
+        ),
+        migrations.RunPython(
+            fill_paths,
+            migrations.RunPython.noop,
+            hints={'model_name': 'comment'},
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'path'], name='posts_archi_post_id_54df62_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.UniqueConstraint(fields=('post', 'path'), name='comment_post_path_unique'),
+        ),
+    ]
@@ -1,10 +1,46 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.html import linebreaks
+from django.utils.safestring import mark_safe
 
 User = get_user_model()
 
 
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """Without an explicit .using() let the router pick the shard
+        from the new object, as it does for obj.save()."""
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True)
+        return obj
+
+    def published(self):
+        return self.filter(status=Post.PUBLISHED)
+
+
+class RenderedText(models.Model):
+    """HTML of `text` rendered once on save, see posts.markup."""
+
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    # 0 until the text is rendered, MARKDOWN_VERSION afterwards.
+    html_version = models.PositiveSmallIntegerField(
+        'Версия разметки', default=0, editable=False
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def html(self):
+        if self.html_version:
+            return mark_safe(self.text_html)
+        return mark_safe(linebreaks(self.text, autoescape=True))
+
+
 class Group(models.Model):
     title = models.CharField('Наименование группы', max_length=200)
     slug = models.SlugField('Уникальный адрес группы', unique=True)
@@ -20,14 +56,29 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
-class Post(models.Model):
+class Post(RenderedText):
+    DRAFT = 'draft'
+    SCHEDULED = 'scheduled'
+    PUBLISHED = 'published'
+    STATUS_CHOICES = (
+        (PUBLISHED, 'Опубликовать сейчас'),
+        (DRAFT, 'Черновик'),
+        (SCHEDULED, 'Запланировать'),
+    )
+
     text = models.TextField('Текст поста', help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True
+    )
+    # Posts may live in a shard database without users and groups,
+    # so these references are not enforced by the database.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
         verbose_name='Автор',
+        db_constraint=False,
     )
 
     group = models.ForeignKey(
@@ -37,6 +88,7 @@ class Post(models.Model):
         blank=True,
         null=True,
         verbose_name='Группа',
+        db_constraint=False,
         help_text='Группа, к которой будет относиться пост',
     )
 
@@ -47,9 +99,44 @@ class Post(models.Model):
         null=True,
         help_text='Загрузите картинку',
     )
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    likes_count = models.PositiveIntegerField('Отметки «нравится»', default=0)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PUBLISHED,
+    )
+    publish_at = models.DateTimeField(
+        'Опубликовать в',
+        blank=True,
+        null=True,
+        help_text='Для запланированных постов',
+    )
+
+    objects = ShardedQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            # Feeds read only published posts.
+            models.Index(
+                fields=['status', '-pub_date'],
+                name='post_status_pub_date_idx',
+            ),
+            models.Index(
+                fields=['status', 'publish_at'],
+                name='post_status_publish_at_idx',
+            ),
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -57,7 +144,38 @@ class Post(models.Model):
         return f'{self.text[:settings.MAX_POST_STR]}'
 
 
-class Comment(models.Model):
+class PostRevision(models.Model):
+    """Version of a post before an edit, see posts.history.
+
+    `data` is zlib-compressed: the whole text for snapshots, otherwise
+    a line diff against the previous revision.
+    """
+
+    # Posts may live in another shard, the id is not a foreign key.
+    post_id = models.IntegerField('ID поста')
+    number = models.PositiveIntegerField('Номер версии')
+    created = models.DateTimeField('Дата изменения')
+    group_id = models.IntegerField('ID группы', blank=True, null=True)
+    image = models.CharField('Картинка', max_length=100, blank=True)
+    is_snapshot = models.BooleanField('Полная копия', default=False)
+    data = models.BinaryField('Данные')
+
+    class Meta:
+        ordering = ['post_id', 'number']
+        constraints = [
+            models.UniqueConstraint(
+                name='revision_post_number_unique',
+                fields=['post_id', 'number'],
+            ),
+        ]
+        verbose_name = 'Версия поста'
+        verbose_name_plural = 'Версии постов'
+
+    def __str__(self) -> str:
+        return f'{self.post_id} v{self.number}'
+
+
+class Comment(RenderedText):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -69,14 +187,28 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Автор',
+        db_constraint=False,
     )
     text = models.TextField(
         'Текст комментария', help_text='Введите текст комментария'
     )
     created = models.DateTimeField('Дата публикации', auto_now_add=True)
+    # Materialized path of the thread, see posts.comments.
+    path = models.CharField(
+        'Путь в ветке', max_length=255, blank=True, editable=False
+    )
+
+    objects = ShardedQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        constraints = [
+            # Threads are read as ranges of this index in display order.
+            models.UniqueConstraint(
+                name='comment_post_path_unique',
+                fields=['post', 'path'],
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -84,6 +216,105 @@ class Comment(models.Model):
         return f'{self.text[:settings.MAX_POST_STR]}'
 
 
+class Tag(models.Model):
+    """Hashtag from post texts, see posts.tags."""
+
+    name = models.CharField('Тег', max_length=50, unique=True)
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self) -> str:
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Published post with a hashtag, the index of tag feeds."""
+
+    # Posts may live in another shard, the id is not a foreign key.
+    post_id = models.IntegerField('ID поста')
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='posts',
+        verbose_name='Тег',
+    )
+    # Copy of the post date, tag feeds are ordered without the posts.
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='post_tag_unique', fields=['post_id', 'tag']
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='post_tag_feed_idx',
+                fields=['tag', '-pub_date', '-post_id'],
+            ),
+        ]
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+
+
+class PostMention(models.Model):
+    """User mentioned in a published post."""
+
+    post_id = models.IntegerField('ID поста')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пользователь',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='post_mention_unique', fields=['post_id', 'user']
+            ),
+        ]
+        indexes = [models.Index(fields=['user', '-post_id'])]
+        verbose_name = 'Упоминание'
+        verbose_name_plural = 'Упоминания'
+
+
+class Like(models.Model):
+    """Like of a post, kept in the shard of the post."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пост',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь',
+        db_constraint=False,
+    )
+    created = models.DateTimeField('Дата отметки', auto_now_add=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='like_user_post_unique',
+                fields=['user', 'post'],
+            ),
+        ]
+        verbose_name = 'Отметка «нравится»'
+        verbose_name_plural = 'Отметки «нравится»'
+
+    def __str__(self) -> str:
+        return f'{self.user_id} -> {self.post_id}'
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -97,6 +328,9 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор',
     )
+    created = models.DateTimeField(
+        'Дата подписки', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         constraints = [
@@ -105,8 +339,377 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+        # Keyset pages of followers and followed authors.
+        indexes = [
+            models.Index(fields=['author', '-id']),
+            models.Index(fields=['user', '-id']),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
     def __str__(self) -> str:
         return f'{self.author}'
+
+
+class Recommendation(models.Model):
+    """Author suggested to a user, see posts.recommendations."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ['user', '-score']
+        indexes = [models.Index(fields=['user', '-score'])]
+        constraints = [
+            models.UniqueConstraint(
+                name='recommendation_user_author_unique',
+                fields=['user', 'author'],
+            ),
+        ]
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+    def __str__(self) -> str:
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class NotificationEvent(models.Model):
+    """Something happened, recipients are not known yet.
+
+    Events are queued by views and fanned out to Notification rows
+    by `manage.py process_notifications`.
+    """
+
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    MENTION = 'mention'
+    KIND_CHOICES = (
+        (COMMENT, 'Комментарий'),
+        (FOLLOW, 'Подписка'),
+        (MENTION, 'Упоминание'),
+    )
+
+    kind = models.CharField('Тип', max_length=10, choices=KIND_CHOICES)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    # Followed or mentioned user, for comments it's found at fan-out.
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Получатель',
+    )
+    post_id = models.IntegerField('ID поста', blank=True, null=True)
+    text = models.CharField('Текст', max_length=200, blank=True)
+    created = models.DateTimeField('Дата события', auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+
+    def __str__(self) -> str:
+        return f'{self.kind}: {self.actor_id}'
+
+
+class Notification(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    kind = models.CharField(
+        'Тип', max_length=10, choices=NotificationEvent.KIND_CHOICES
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    post_id = models.IntegerField('ID поста', blank=True, null=True)
+    text = models.CharField('Текст', max_length=200, blank=True)
+    created = models.DateTimeField('Дата события')
+
+    class Meta:
+        ordering = ['-pk']
+        indexes = [models.Index(fields=['user', '-id'])]
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+    def __str__(self) -> str:
+        return f'{self.user_id}: {self.kind}'
+
+
+class NotificationState(models.Model):
+    """Unread counter of a user. Notifications with id above
+    `last_read` are unread."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_state',
+        verbose_name='Пользователь',
+    )
+    unread = models.PositiveIntegerField('Непрочитанные', default=0)
+    last_read = models.PositiveIntegerField('Прочитано до', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик уведомлений'
+        verbose_name_plural = 'Счётчики уведомлений'
+
+    def __str__(self) -> str:
+        return f'{self.user_id}: {self.unread}'
+
+
+class DigestState(models.Model):
+    """Posts published before `sent_until` were already in a digest."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='digest_state',
+        verbose_name='Пользователь',
+    )
+    sent_until = models.DateTimeField('Отправлено до')
+
+    class Meta:
+        verbose_name = 'Дайджест пользователя'
+        verbose_name_plural = 'Дайджесты пользователей'
+
+    def __str__(self) -> str:
+        return f'{self.user_id}: {self.sent_until:%Y-%m-%d %H:%M}'
+
+
+class DigestRun(models.Model):
+    """Checkpoint of `manage.py send_digest`: users up to `last_user_id`
+    already got the digest of posts published before `period_end`."""
+
+    period_end = models.DateTimeField('Посты до')
+    last_user_id = models.PositiveIntegerField('Обработано до', default=0)
+    finished = models.DateTimeField('Завершён', blank=True, null=True)
+
+    class Meta:
+        ordering = ['-pk']
+        verbose_name = 'Рассылка дайджеста'
+        verbose_name_plural = 'Рассылки дайджеста'
+
+    def __str__(self) -> str:
+        return f'{self.period_end:%Y-%m-%d %H:%M}: {self.last_user_id}'
+
+
+class DeletionTask(models.Model):
+    """User or group queued for deletion in small batches."""
+
+    USER = 'user'
+    GROUP = 'group'
+    KIND_CHOICES = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField('Тип', max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField('ID объекта')
+    label = models.CharField('Объект', max_length=200)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    finished = models.DateTimeField(
+        'Дата завершения', blank=True, null=True, db_index=True
+    )
+    deleted_rows = models.PositiveIntegerField('Удалено строк', default=0)
+
+    class Meta:
+        ordering = ['created']
+        constraints = [
+            models.UniqueConstraint(
+                name='deletion_task_unique',
+                fields=['kind', 'object_id'],
+            ),
+        ]
+        verbose_name = 'Задача удаления'
+        verbose_name_plural = 'Задачи удаления'
+
+    def __str__(self) -> str:
+        return f'{self.get_kind_display()} {self.label}'
+
+
+class ArchivedPost(RenderedText):
+    """Old post moved out of the hot posts_post table."""
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации')
+    updated = models.DateTimeField('Дата изменения')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        Group,
+        models.SET_NULL,
+        related_name='archived_posts',
+        blank=True,
+        null=True,
+        verbose_name='Группа',
+    )
+    image = models.ImageField(
+        'Картинка', upload_to='posts/', blank=True, null=True
+    )
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    likes_count = models.PositiveIntegerField('Отметки «нравится»', default=0)
+    archived = models.DateTimeField('Дата архивации', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='archived_author_pub_date_idx',
+            ),
+        ]
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self) -> str:
+        return f'{self.text[:settings.MAX_POST_STR]}'
+
+
+class ArchivedComment(RenderedText):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор',
+    )
+    text = models.TextField('Текст комментария')
+    created = models.DateTimeField('Дата публикации')
+    path = models.CharField('Путь в ветке', max_length=255, blank=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [models.Index(fields=['post', 'path'])]
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self) -> str:
+        return f'{self.text[:settings.MAX_POST_STR]}'
+
+
+class AuthorShard(models.Model):
+    """Shard map entry: database that keeps posts of the author.
+
+    Authors without an entry are placed by their id, see posts.sharding.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='post_shard',
+        verbose_name='Автор',
+    )
+    shard = models.CharField('Шард', max_length=50)
+
+    class Meta:
+        verbose_name = 'Шард автора'
+        verbose_name_plural = 'Шарды авторов'
+
+    def __str__(self) -> str:
+        return f'{self.author_id}: {self.shard}'
+
+
+class PostKey(models.Model):
+    """Global post id, so ids stay unique across shards
+    and post pages can find the shard by post id."""
+
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='post_keys',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name = 'Ключ поста'
+        verbose_name_plural = 'Ключи постов'
+
+    def __str__(self) -> str:
+        return str(self.pk)
+
+
+class TrendingPost(models.Model):
+    """Time-decayed activity score of a post, see posts.trending."""
+
+    post_id = models.IntegerField('ID поста', primary_key=True)
+    group_id = models.IntegerField('ID группы', blank=True, null=True)
+    pub_date = models.DateTimeField('Дата публикации')
+    score = models.FloatField('Рейтинг', default=0, db_index=True)
+    views_seen = models.PositiveIntegerField('Учтено просмотров', default=0)
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+    def __str__(self) -> str:
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class TrendingGroup(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Группа',
+    )
+    score = models.FloatField('Рейтинг', default=0, db_index=True)
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Популярная группа'
+        verbose_name_plural = 'Популярные группы'
+
+    def __str__(self) -> str:
+        return f'{self.group_id}: {self.score:.2f}'
+
+
+class TrendingRun(models.Model):
+    """Moment up to which activity is already counted in the scores."""
+
+    finished = models.DateTimeField('Учтено до', db_index=True)
+
+    class Meta:
+        ordering = ['-finished']
+        verbose_name = 'Расчёт популярности'
+        verbose_name_plural = 'Расчёты популярности'
+
+    def __str__(self) -> str:
+        return f'{self.finished:%Y-%m-%d %H:%M:%S}'
@@ -0,0 +1,191 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils.text import Truncator
+
+from .models import (
+    Comment,
+    Notification,
+    NotificationEvent,
+    NotificationState,
+    Post,
+)
+from .sharding import on_shard, shards_for_posts
+from .utils import chunks
+
+EXCERPT_LENGTH = 100
+# Three SQL parameters per counter, SQLite allows 999 per statement.
+UPDATE_BATCH_SIZE = 300
+
+
+def unread_cache_key(user_id):
+    return f'notifications_unread:{user_id}'
+
+
+def notify_comment(comment):
+    NotificationEvent.objects.create(
+        kind=NotificationEvent.COMMENT,
+        actor_id=comment.author_id,
+        post_id=comment.post_id,
+        text=Truncator(comment.text).chars(EXCERPT_LENGTH),
+    )
+
+
+def notify_follows(user, author_ids):
+    NotificationEvent.objects.bulk_create(
+        NotificationEvent(
+            kind=NotificationEvent.FOLLOW, actor=user, recipient_id=author_id
+        )
+        for author_id in author_ids
+    )
+
+
+def thread_members(post_ids):
+    """Map post id -> ids of its author and of everyone who commented
+    on it, with two queries per shard."""
+    members = defaultdict(set)
+    for alias, ids in shards_for_posts(post_ids).items():
+        authors = (
+            on_shard(Post, alias)
+            .filter(pk__in=ids)
+            .values_list('pk', 'author_id')
+        )
+        commenters = (
+            on_shard(Comment, alias)
+            .filter(post_id__in=ids)
+            .order_by()
+            .values_list('post_id', 'author_id')
+            .distinct()
+        )
+        for post_id, user_id in (*authors, *commenters):
+            members[post_id].add(user_id)
+    return members
+
+
+def fan_out(events):
+    """Notification rows for the events, the actor is never notified."""
+    members = thread_members(
+        {
+            event.post_id
+            for event in events
+            if event.kind == NotificationEvent.COMMENT
+        }
+    )
+    notifications = []
+    for event in events:
+        if event.kind == NotificationEvent.COMMENT:
+            recipients = members.get(event.post_id, ())
+        else:
+            recipients = [event.recipient_id]
+        notifications.extend(
+            Notification(
+                user_id=user_id,
+                kind=event.kind,
+                actor_id=event.actor_id,
+                post_id=event.post_id,
+                text=event.text,
+                created=event.created,
+            )
+            for user_id in recipients
+            if user_id != event.actor_id
+        )
+    return notifications
+
+
+def add_unread(counts):
+    """Change unread counters by the given amounts with one
+    UPDATE ... CASE per batch."""
+    NotificationState.objects.bulk_create(
+        (NotificationState(user_id=user_id) for user_id in counts),
+        ignore_conflicts=True,
+    )
+    user_ids = sorted(counts)
+    for batch in chunks(user_ids, UPDATE_BATCH_SIZE):
+        increment = Case(
+            *(When(pk=pk, then=Value(counts[pk])) for pk in batch),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        NotificationState.objects.filter(pk__in=batch).update(
+            unread=F('unread') + increment
+        )
+
+
+def process_batch(batch_size=None):
+    """Fan out the oldest queued events in one transaction.
+
+    Returns number of processed events.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    with transaction.atomic():
+        events = list(NotificationEvent.objects.all()[:batch_size])
+        if not events:
+            return 0
+        notifications = Notification.objects.bulk_create(
+            fan_out(events), batch_size=batch_size
+        )
+        counts = Counter(item.user_id for item in notifications)
+        add_unread(counts)
+        NotificationEvent.objects.filter(
+            pk__in=[event.pk for event in events]
+        ).delete()
+        keys = [unread_cache_key(user_id) for user_id in counts]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    return len(events)
+
+
+def process_pending(batch_size=None):
+    """Process queued events until the queue is empty."""
+    processed = 0
+    while True:
+        count = process_batch(batch_size)
+        if not count:
+            return processed
+        processed += count
+
+
+def state_value(user, field):
+    return (
+        NotificationState.objects.filter(user=user)
+        .values_list(field, flat=True)
+        .first()
+        or 0
+    )
+
+
+def unread_count(user):
+    """Unread notifications of the user: a cached primary key lookup."""
+    return cache.get_or_set(
+        unread_cache_key(user.pk),
+        lambda: state_value(user, 'unread'),
+        settings.NOTIFICATIONS_CACHE_TIMEOUT,
+    )
+
+
+def last_read(user):
+    return state_value(user, 'last_read')
+
+
+def mark_all_read(user):
+    """Reset the counter and move the read mark to the newest
+    notification with a single UPDATE."""
+    newest = Notification.objects.filter(user=OuterRef('user')).order_by(
+        '-pk'
+    )
+    NotificationState.objects.filter(user=user).update(
+        unread=0,
+        last_read=Coalesce(Subquery(newest.values('pk')[:1]), F('last_read')),
+    )
+    cache.delete(unread_cache_key(user.pk))
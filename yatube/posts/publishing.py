@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_feeds
+from .models import Post
+from .sharding import shard_aliases
+from .tags import index_posts
+
+
+def publish_batch(alias, now, batch_size):
+    """Publish up to batch_size due posts of one shard.
+
+    Returns number of published posts.
+    """
+    with transaction.atomic(using=alias):
+        ids = list(
+            Post.objects.using(alias)
+            .filter(status=Post.SCHEDULED, publish_at__lte=now)
+            .order_by('publish_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        published = (
+            Post.objects.using(alias)
+            .filter(pk__in=ids, status=Post.SCHEDULED)
+            .update(status=Post.PUBLISHED, pub_date=now, updated=now)
+        )
+        # UPDATE sends no post_save, hashtags and mentions are indexed
+        # here for the whole batch.
+        index_posts(
+            Post.objects.using(alias)
+            .filter(pk__in=ids, status=Post.PUBLISHED)
+            .only('pk', 'text', 'status', 'pub_date', 'author_id')
+        )
+        return published
+
+
+def publish_due(now=None, batch_size=None):
+    """Publish scheduled posts whose time has come, in batches.
+
+    A published post gets the current pub_date like a post created
+    right now, and cached feeds are dropped as the post_save signal
+    does for a normal publish (UPDATE sends no signals).
+    Returns number of published posts.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.PUBLISH_BATCH_SIZE
+    published = 0
+    for alias in shard_aliases():
+        while True:
+            count = publish_batch(alias, now, batch_size)
+            if count:
+                published += count
+                invalidate_feeds()
+            if count < batch_size:
+                break
+    return published
@@ -0,0 +1,298 @@
+import time
+from dataclasses import dataclass, field
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+
+from .comments import STEP, depth, next_path
+from .importer import batches, preserved_dates
+from .models import AuthorShard, Comment, Like, Post, PostKey
+from .sharding import author_shard, move_author, shard_aliases
+
+POST_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'updated',
+    'author_id',
+    'group_id',
+    'image',
+    'views',
+    'likes_count',
+    'status',
+    'publish_at',
+    'text_html',
+    'html_version',
+)
+COMMENT_FIELDS = (
+    'post_id',
+    'author_id',
+    'text',
+    'created',
+    'path',
+    'text_html',
+    'html_version',
+)
+LIKE_FIELDS = ('post_id', 'user_id', 'created')
+# Post fields an author edit may change.
+EDITED_FIELDS = (
+    'text',
+    'pub_date',
+    'updated',
+    'group',
+    'image',
+    'status',
+    'publish_at',
+    'text_html',
+    'html_version',
+)
+
+
+@dataclass
+class Copied:
+    """Keys of the rows one move has copied so far."""
+
+    posts: set = field(default_factory=set)
+    comments: set = field(default_factory=set)
+    likes: set = field(default_factory=set)
+
+
+def merge_posts(target, posts, copied):
+    """Insert posts missing in the target and newer edits of the rest.
+
+    Counters are kept, likes written to the target after the move
+    are already counted there.
+    """
+    present = dict(
+        Post.objects.using(target)
+        .filter(pk__in=[post['id'] for post in posts])
+        .values_list('pk', 'updated')
+    )
+    fresh = [
+        Post(**post)
+        for post in posts
+        if post['id'] not in present and post['id'] not in copied.posts
+    ]
+    edited = [
+        Post(**post)
+        for post in posts
+        if post['id'] in present and post['updated'] > present[post['id']]
+    ]
+    with preserved_dates(Post, 'pub_date', 'updated'):
+        Post.objects.using(target).bulk_create(fresh)
+    if edited:
+        Post.objects.using(target).bulk_update(edited, EDITED_FIELDS)
+
+
+def ancestors(path):
+    """Paths of the parent, its parent and so on up to the root."""
+    return [path[:end] for end in range(len(path) - STEP, 0, -STEP)]
+
+
+def moved_path(moved, post_id, path):
+    """Path under the new place of the deepest moved ancestor."""
+    for parent in ancestors(path):
+        if (post_id, parent) in moved:
+            return moved[post_id, parent] + path[len(parent):]
+    return path
+
+
+def merge_comments(target, comments, copied):
+    """Insert comments missing in the target.
+
+    A comment is found by its place in the thread. A comment written
+    to the old shard after the move may take the place of one written
+    to the target, then it gets the next free place under the same
+    parent and its replies follow it.
+    """
+    rows = (
+        Comment.objects.using(target)
+        .filter(post_id__in={comment['post_id'] for comment in comments})
+        .values_list('post_id', 'path', 'author_id', 'created')
+    )
+    present = {row[:2]: row[2:] for row in rows}
+    fresh, clashes, clashed = [], [], set()
+    for comment in sorted(comments, key=itemgetter('post_id', 'path')):
+        post_id, path = key = comment['post_id'], comment['path']
+        if key in copied.comments:
+            continue
+        if any((post_id, parent) in clashed for parent in ancestors(path)):
+            clashes.append(comment)
+        elif key not in present:
+            fresh.append(Comment(**comment))
+        elif present[key] != (comment['author_id'], comment['created']):
+            clashes.append(comment)
+            clashed.add(key)
+    with preserved_dates(Comment, 'created'):
+        Comment.objects.using(target).bulk_create(fresh)
+        moved = {}
+        for comment in clashes:
+            post_id, path = comment['post_id'], comment['path']
+            new_path = moved_path(moved, post_id, path)
+            thread = Comment.objects.using(target).filter(post_id=post_id)
+            if thread.filter(path=new_path).exists():
+                parent = None
+                if depth(new_path):
+                    parent = Comment(path=new_path[:-STEP])
+                new_path = next_path(thread, parent)
+            moved[post_id, path] = new_path
+            comment = Comment(**comment)
+            comment.path = new_path
+            Comment.objects.using(target).bulk_create([comment])
+
+
+def merge_likes(target, likes, copied):
+    """Insert likes missing in the target and count likes of their
+    posts again."""
+    skipped = copied.likes.union(
+        Like.objects.using(target)
+        .filter(post_id__in={like['post_id'] for like in likes})
+        .values_list('post_id', 'user_id')
+    )
+    fresh = [
+        Like(**like)
+        for like in likes
+        if (like['post_id'], like['user_id']) not in skipped
+    ]
+    if not fresh:
+        return
+    with preserved_dates(Like, 'created'):
+        Like.objects.using(target).bulk_create(fresh, ignore_conflicts=True)
+    likes_count = (
+        Like.objects.using(target)
+        .filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    Post.objects.using(target).filter(
+        pk__in={like.post_id for like in fresh}
+    ).update(likes_count=Subquery(likes_count))
+
+
+def copy_batch(author_id, source, target, after, batch_size, copied):
+    """Copy the next batch of author posts with their comments and likes.
+
+    Only rows missing in the target are inserted and nothing there is
+    deleted: after the move the target takes new comments, likes and
+    edits while the old shard may still get late writes of workers
+    with a stale shard map. Rows in `copied` were copied before, if
+    they are missing now they were deleted in the target after the
+    move and are not brought back. Comments and likes get new ids
+    in the target shard.
+    Returns ids of the copied posts.
+    """
+    posts = list(
+        Post.objects.using(source)
+        .filter(author_id=author_id, pk__gt=after)
+        .order_by('pk')
+        .values(*POST_FIELDS)[:batch_size]
+    )
+    ids = [post['id'] for post in posts]
+    if not ids:
+        return ids
+    comments = list(
+        Comment.objects.using(source)
+        .filter(post_id__in=ids)
+        .values(*COMMENT_FIELDS)
+    )
+    likes = list(
+        Like.objects.using(source).filter(post_id__in=ids).values(*LIKE_FIELDS)
+    )
+    with transaction.atomic(using=target):
+        merge_posts(target, posts, copied)
+        merge_comments(target, comments, copied)
+        merge_likes(target, likes, copied)
+    copied.posts.update(ids)
+    copied.comments.update(
+        (comment['post_id'], comment['path']) for comment in comments
+    )
+    copied.likes.update((like['post_id'], like['user_id']) for like in likes)
+    return ids
+
+
+def copy_posts(author_id, source, target, batch_size, copied):
+    after = 0
+    while True:
+        ids = copy_batch(
+            author_id, source, target, after, batch_size, copied
+        )
+        if not ids:
+            return
+        after = ids[-1]
+
+
+def rebalance_author(author_id, target, batch_size=None, settle=None):
+    """Move posts and comments of an author to the target shard.
+
+    Posts are copied first, then the shard map is switched. Workers may
+    keep writing to the old shard until their cached map expires, so
+    after `settle` seconds the late posts, edits, comments and likes
+    are merged into the target, and only then the old copies
+    are deleted.
+    Returns number of moved posts.
+    """
+    if target not in shard_aliases():
+        raise ValueError(f'Unknown shard: {target}')
+    batch_size = batch_size or settings.REBALANCE_BATCH_SIZE
+    if settle is None:
+        settle = settings.SHARD_MAP_CACHE_TIMEOUT
+    source = author_shard(author_id)
+    if source == target:
+        return 0
+    copied = Copied()
+    copy_posts(author_id, source, target, batch_size, copied)
+    move_author(author_id, target)
+    time.sleep(settle)
+    copy_posts(author_id, source, target, batch_size, copied)
+    moved = 0
+    while True:
+        ids = list(
+            Post.objects.using(source)
+            .filter(author_id=author_id)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return moved
+        with transaction.atomic(using=source):
+            Comment.objects.using(source).filter(post_id__in=ids).delete()
+            Like.objects.using(source).filter(post_id__in=ids).delete()
+            Post.objects.using(source).filter(pk__in=ids).delete()
+        moved += len(ids)
+
+
+def pin_authors(batch_size=None):
+    """Write the current placement of every author into the shard map
+    and give existing posts global keys.
+
+    Run it before changing POST_SHARDS: authors are then found where
+    their posts are instead of being placed by id again.
+    Returns number of authors found in the shards.
+    """
+    batch_size = batch_size or settings.REBALANCE_BATCH_SIZE
+    seen = 0
+    for alias in shard_aliases():
+        posts = Post.objects.using(alias).order_by()
+        authors = posts.values_list('author_id', flat=True).distinct()
+        for batch in batches(authors.iterator(), batch_size):
+            AuthorShard.objects.bulk_create(
+                (
+                    AuthorShard(author_id=author_id, shard=alias)
+                    for author_id in batch
+                ),
+                ignore_conflicts=True,
+            )
+            seen += len(batch)
+        keys = posts.values_list('pk', 'author_id').iterator()
+        for batch in batches(keys, batch_size):
+            PostKey.objects.bulk_create(
+                (
+                    PostKey(pk=post_id, author_id=author_id)
+                    for post_id, author_id in batch
+                ),
+                ignore_conflicts=True,
+            )
+    return seen
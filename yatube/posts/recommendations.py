@@ -0,0 +1,188 @@
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Follow, Recommendation
+from .utils import chunks
+
+
+def recommendations_cache_key(user_id):
+    return f'recommendations:{user_id}'
+
+
+class FollowGraph:
+    """Follow graph in compressed sparse rows over dense user indices.
+
+    Users are numbered 0..n-1, `following(i)` and `followers(i)` are
+    slices of flat integer arrays, so the whole graph takes a few
+    machine words per edge instead of a Python object per follow.
+    """
+
+    def __init__(self, edges):
+        """edges: (user_id, author_id) pairs sorted by user_id."""
+        self.ids = array('q')
+        self.index = {}
+        sources = array('q')
+        targets = array('q')
+        for user_id, author_id in edges:
+            sources.append(self.add_user(user_id))
+            targets.append(self.add_user(author_id))
+        self.out_start, self.out_targets = self.compress(sources, targets)
+        self.in_start, self.in_sources = self.compress(targets, sources)
+
+    @classmethod
+    def load(cls):
+        edges = (
+            Follow.objects.order_by('user_id', 'author_id')
+            .values_list('user_id', 'author_id')
+            .iterator()
+        )
+        return cls(edges)
+
+    def add_user(self, user_id):
+        index = self.index.get(user_id)
+        if index is None:
+            index = self.index[user_id] = len(self.ids)
+            self.ids.append(user_id)
+        return index
+
+    def compress(self, rows, columns):
+        """Counting sort of edges by row into (start, columns) arrays."""
+        size = len(self.ids)
+        start = array('q', [0]) * (size + 1)
+        for row in rows:
+            start[row + 1] += 1
+        for row in range(size):
+            start[row + 1] += start[row]
+        position = array('q', start)
+        packed = array('q', [0]) * len(columns)
+        for row, column in zip(rows, columns):
+            packed[position[row]] = column
+            position[row] += 1
+        return start, packed
+
+    def following(self, user):
+        start, stop = self.out_start[user], self.out_start[user + 1]
+        return self.out_targets[start:stop]
+
+    def followers(self, user):
+        start, stop = self.in_start[user], self.in_start[user + 1]
+        return self.in_sources[start:stop]
+
+    def followers_count(self, user):
+        return self.in_start[user + 1] - self.in_start[user]
+
+    def following_count(self, user):
+        return self.out_start[user + 1] - self.out_start[user]
+
+    def active_users(self):
+        """Indices of users that follow somebody."""
+        return [
+            user
+            for user in range(len(self.ids))
+            if self.following_count(user)
+        ]
+
+    def recommend(self, user, limit):
+        """Best (author index, score) pairs for the user.
+
+        Friends of friends: every author followed by an author the user
+        follows gets RECOMMENDATION_WEIGHTS['friend_of_friend'].
+        Co-follow: users who follow the same authors are compared by
+        Jaccard similarity, their authors get the similarity times
+        RECOMMENDATION_WEIGHTS['co_follow']. Authors with more than
+        RECOMMENDATION_MAX_FOLLOWERS followers tell nothing about taste
+        and are skipped when similar users are searched.
+        """
+        weights = settings.RECOMMENDATION_WEIGHTS
+        followed = set(self.following(user))
+        scores = defaultdict(float)
+        common = Counter()
+        for author in followed:
+            for candidate in self.following(author):
+                scores[candidate] += weights['friend_of_friend']
+            if (
+                self.followers_count(author)
+                <= settings.RECOMMENDATION_MAX_FOLLOWERS
+            ):
+                common.update(self.followers(author))
+        common.pop(user, None)
+        similar = common.most_common(settings.RECOMMENDATION_SIMILAR_USERS)
+        for other, shared in similar:
+            similarity = shared / (
+                len(followed) + self.following_count(other) - shared
+            )
+            for candidate in self.following(other):
+                scores[candidate] += similarity * weights['co_follow']
+        scores.pop(user, None)
+        for author in followed:
+            scores.pop(author, None)
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+
+def build_recommendations(batch_size=None, limit=None):
+    """Recompute stored recommendations of every user who follows
+    somebody, one transaction per batch of users.
+
+    Returns number of users with recommendations.
+    """
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+    limit = limit or settings.RECOMMENDATIONS_PER_USER
+    graph = FollowGraph.load()
+    users = 0
+    for batch in chunks(graph.active_users(), batch_size):
+        user_ids = [graph.ids[user] for user in batch]
+        rows = [
+            Recommendation(
+                user_id=graph.ids[user],
+                author_id=graph.ids[author],
+                score=score,
+            )
+            for user in batch
+            for author, score in graph.recommend(user, limit)
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=user_ids).delete()
+            Recommendation.objects.bulk_create(rows)
+        cache.delete_many(
+            [recommendations_cache_key(user_id) for user_id in user_ids]
+        )
+        users += len({row.user_id for row in rows})
+    Recommendation.objects.exclude(
+        user_id__in=Follow.objects.values('user_id')
+    ).delete()
+    return users
+
+
+def recommended_authors(user):
+    """Authors suggested to the user, read through the cache.
+
+    Authors followed after the last build are left out.
+    """
+    if not user.is_authenticated:
+        return []
+    key = recommendations_cache_key(user.pk)
+    authors = cache.get(key)
+    if authors is None:
+        authors = list(
+            Recommendation.objects.filter(user=user)
+            .exclude(author__following__user=user)
+            .order_by('-score')
+            .values(
+                username=F('author__username'),
+                first_name=F('author__first_name'),
+                last_name=F('author__last_name'),
+            )[:settings.RECOMMENDATIONS_SHOWN]
+        )
+        cache.set(key, authors, settings.RECOMMENDATIONS_CACHE_TIMEOUT)
+    return authors
+
+
+def forget_recommendations(user_id):
+    cache.delete(recommendations_cache_key(user_id))
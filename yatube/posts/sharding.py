@@ -0,0 +1,343 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Count, Max, Sum, prefetch_related_objects
+
+from .models import AuthorShard, Comment, Like, Post, PostKey, User
+
+DEFAULT_SHARD = 'default'
+SHARDED_MODELS = (Post, Comment, Like)
+
+
+def shard_aliases():
+    """Databases holding posts, the primary database goes first."""
+    return settings.POST_SHARDS
+
+
+def is_sharded():
+    return len(shard_aliases()) > 1
+
+
+def shard_cache_key(author_id):
+    return f'post_shard:{author_id}'
+
+
+def placement(author_id):
+    """Shard of an author missing from the shard map."""
+    aliases = shard_aliases()
+    return aliases[author_id % len(aliases)]
+
+
+def shards_for_authors(author_ids):
+    """Map shard alias -> ids of the given authors stored there.
+
+    The shard map is read through the cache in one round trip,
+    misses are loaded with a single query.
+    """
+    author_ids = list(author_ids)
+    if not is_sharded():
+        return {DEFAULT_SHARD: author_ids} if author_ids else {}
+    keys = {shard_cache_key(pk): pk for pk in author_ids}
+    found = {
+        keys[key]: shard for key, shard in cache.get_many(keys).items()
+    }
+    missing = [pk for pk in keys.values() if pk not in found]
+    if missing:
+        mapped = dict(
+            AuthorShard.objects.filter(author_id__in=missing).values_list(
+                'author_id', 'shard'
+            )
+        )
+        loaded = {
+            author_id: mapped.get(author_id) or placement(author_id)
+            for author_id in missing
+        }
+        cache.set_many(
+            {
+                shard_cache_key(author_id): shard
+                for author_id, shard in loaded.items()
+            },
+            settings.SHARD_MAP_CACHE_TIMEOUT,
+        )
+        found.update(loaded)
+    shards = {}
+    for author_id in author_ids:
+        shards.setdefault(found[author_id], []).append(author_id)
+    return shards
+
+
+def author_shard(author_id):
+    if not is_sharded():
+        return DEFAULT_SHARD
+    return next(iter(shards_for_authors([author_id])))
+
+
+def post_shard(post_id):
+    """Shard of a post, found through its global key."""
+    if not is_sharded():
+        return DEFAULT_SHARD
+    author_id = (
+        PostKey.objects.filter(pk=post_id)
+        .values_list('author_id', flat=True)
+        .first()
+    )
+    if author_id is None:
+        return DEFAULT_SHARD
+    return author_shard(author_id)
+
+
+def shards_for_posts(post_ids):
+    """Map shard alias -> ids of the given posts stored there."""
+    post_ids = list(post_ids)
+    if not is_sharded():
+        return {DEFAULT_SHARD: post_ids} if post_ids else {}
+    authors = dict(
+        PostKey.objects.filter(pk__in=post_ids).values_list('pk', 'author_id')
+    )
+    shard_of_author = {
+        author_id: alias
+        for alias, author_ids in shards_for_authors(
+            set(authors.values())
+        ).items()
+        for author_id in author_ids
+    }
+    shards = {}
+    for post_id in post_ids:
+        alias = shard_of_author.get(authors.get(post_id), DEFAULT_SHARD)
+        shards.setdefault(alias, []).append(post_id)
+    return shards
+
+
+def move_author(author_id, shard):
+    """Point the shard map of an author to another shard."""
+    AuthorShard.objects.update_or_create(
+        author_id=author_id, defaults={'shard': shard}
+    )
+    cache.delete(shard_cache_key(author_id))
+
+
+def allocate_post_id(author_id):
+    return PostKey.objects.create(author_id=author_id).pk
+
+
+def register_posts(posts):
+    """Give posts saved with bulk_create their global keys.
+
+    Posts with an id keep it, the rest take the next ids of the
+    sequence in one insert where the database returns the new ids,
+    one insert per post elsewhere.
+    """
+    keys = [PostKey(pk=post.pk, author_id=post.author_id) for post in posts]
+    known = [key for key in keys if key.pk is not None]
+    new = [key for key in keys if key.pk is None]
+    PostKey.objects.bulk_create(known)
+    features = connections[router.db_for_write(PostKey)].features
+    if features.can_return_ids_from_bulk_insert:
+        PostKey.objects.bulk_create(new)
+    else:
+        for key in new:
+            key.save()
+    for post, key in zip(posts, keys):
+        post.pk = key.pk
+    return posts
+
+
+def on_shard(model, alias):
+    """Objects of one shard. The primary shard is left to the other
+    routers, so its reads may go to replicas."""
+    if alias == DEFAULT_SHARD:
+        return model.objects.all()
+    return model.objects.using(alias)
+
+
+def posts_on(alias):
+    return on_shard(Post, alias)
+
+
+def posts_by_ids(post_ids):
+    """Published posts with the ids in the given order, one query per
+    shard, with the author and group attached. Missing posts are
+    skipped."""
+    post_ids = list(post_ids)
+    found = {}
+    for alias, ids in shards_for_posts(post_ids).items():
+        posts = posts_on(alias).published().filter(pk__in=ids)
+        found.update((post.pk, post) for post in posts)
+    page = [found[pk] for pk in post_ids if pk in found]
+    prefetch_related_objects(page, 'author', 'group')
+    return page
+
+
+def author_posts(author):
+    """Published posts of the author with the author and group
+    attached."""
+    alias = author_shard(author.pk)
+    posts = posts_on(alias).published().filter(author=author)
+    if alias == DEFAULT_SHARD:
+        return posts.select_related('author', 'group')
+    return posts.prefetch_related('author', 'group')
+
+
+def post_queryset(post_id):
+    """Posts of the shard that keeps the post with this id."""
+    return posts_on(post_shard(post_id))
+
+
+def shard_querysets(author_ids=None, **filters):
+    """Per shard querysets of published posts with the filters applied.
+
+    With author_ids only the shards of these authors are queried,
+    otherwise the query is scattered to every shard.
+    """
+    if author_ids is None:
+        targets = {alias: None for alias in shard_aliases()}
+    else:
+        targets = shards_for_authors(author_ids)
+    querysets = []
+    for alias, ids in targets.items():
+        posts = posts_on(alias).published().filter(**filters)
+        if ids is not None:
+            posts = posts.filter(author_id__in=ids)
+        querysets.append(posts)
+    return querysets
+
+
+def feed(author_ids=None, **filters):
+    """Posts for a feed page, ready for Paginator."""
+    if not is_sharded():
+        posts = Post.objects.published().select_related('author', 'group')
+        if author_ids is not None:
+            posts = posts.filter(author_id__in=author_ids)
+        return posts.filter(**filters)
+    return ShardedFeed(shard_querysets(author_ids, **filters))
+
+
+def post_stats(author_ids=None, **filters):
+    """Latest change, number of posts and their likes over the shards.
+    Likes do not touch `updated`, their sum tells that counters moved."""
+    stats = [
+        posts.order_by().aggregate(
+            last_modified=Max('updated'),
+            count=Count('pk'),
+            likes_total=Sum('likes_count'),
+        )
+        for posts in shard_querysets(author_ids, **filters)
+    ]
+    return {
+        'last_modified': max(
+            (row['last_modified'] for row in stats if row['last_modified']),
+            default=None,
+        ),
+        'count': sum(row['count'] for row in stats),
+        'likes_total': sum(row['likes_total'] or 0 for row in stats),
+    }
+
+
+def feed_key(post):
+    return post.pub_date, post.pk
+
+
+def unique_posts(posts):
+    """Skip the second copy of a post that is being moved between shards.
+    Copies have the same sort key, so they come one after another."""
+    last = None
+    for post in posts:
+        if post.pk != last:
+            last = post.pk
+            yield post
+
+
+class ShardedFeed:
+    """Posts of several shards as one list for Paginator.
+
+    For a slice [start:stop] every shard returns its first `stop` posts
+    in feed order and the sorted streams are merged k-way.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets):
+        self.querysets = [
+            posts.order_by('-pub_date', '-pk') for posts in querysets
+        ]
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = sum(posts.count() for posts in self.querysets)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if stop <= start:
+            return []
+        merged = heapq.merge(
+            *(posts[:stop].iterator() for posts in self.querysets),
+            key=feed_key,
+            reverse=True,
+        )
+        page = list(islice(unique_posts(merged), start, stop))
+        prefetch_related_objects(page, 'author', 'group')
+        return page
+
+
+class ShardRouter:
+    """Keep posts, their comments and likes in the shard of the author.
+
+    Queries without a hint about the author are left to the next router,
+    callers pick the shard with `posts_on` instead.
+    """
+
+    def shard_for(self, model, instance):
+        if model not in SHARDED_MODELS or instance is None:
+            return None
+        # Unsaved objects get an alias from whatever was assigned
+        # to them first and saved ones may come from a replica,
+        # so only the shard alias of a saved object is trusted.
+        if (
+            isinstance(instance, SHARDED_MODELS)
+            and not instance._state.adding
+            and instance._state.db in shard_aliases()
+        ):
+            return instance._state.db
+        if isinstance(instance, Post):
+            return author_shard(instance.author_id)
+        if isinstance(instance, (Comment, Like)):
+            if instance._meta.get_field('post').is_cached(instance):
+                return self.shard_for(Post, instance.post)
+            return post_shard(instance.post_id)
+        if isinstance(instance, User) and model is Post:
+            return author_shard(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded():
+            return None
+        alias = self.shard_for(model, hints.get('instance'))
+        return None if alias == DEFAULT_SHARD else alias
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded():
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_SHARD or db not in shard_aliases():
+            return None
+        return app_label == 'posts' and model_name in (
+            'post',
+            'comment',
+            'like',
+        )
@@ -0,0 +1,66 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_feeds
+from .comments import root_path
+from .markup import render_text
+from .models import Comment, Follow, Group, Like, Post
+from .recommendations import forget_recommendations
+from .sharding import allocate_post_id, is_sharded
+from .tags import index_posts
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def feed_content_changed(sender, **kwargs):
+    """Drop cached feed pages when posts, groups, follows
+    or likes change."""
+    invalidate_feeds()
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follows_changed(sender, instance, **kwargs):
+    """Drop cached suggestions, a followed author must disappear."""
+    forget_recommendations(instance.user_id)
+
+
+@receiver(pre_save, sender=Post)
+def allocate_sharded_post_id(sender, instance, raw=False, **kwargs):
+    """Sharded posts take their id from the global sequence,
+    so ids never clash between shards."""
+    if instance.pk is None and not raw and is_sharded():
+        instance.pk = allocate_post_id(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_hashtags(sender, instance, raw=False, **kwargs):
+    """Hashtags and mentions follow every saved version of a post."""
+    if not raw:
+        index_posts([instance])
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def render_markdown(sender, instance, raw=False, **kwargs):
+    """Texts are rendered to HTML once here, not on every view."""
+    if not raw:
+        render_text(instance)
+
+
+@receiver(pre_save, sender=Comment)
+def assign_comment_path(sender, instance, raw=False, using=None, **kwargs):
+    """Comments saved without posts.comments.save_comment start
+    a new thread."""
+    if not instance.path and not raw:
+        instance.path = root_path(
+            Comment.objects.using(using).filter(post_id=instance.post_id)
+        )
@@ -0,0 +1,193 @@
+import heapq
+import os
+import shutil
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import iri_to_uri
+
+from .models import Group, User
+from .sharding import shard_querysets
+from .utils import chunks
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+CHUNK_SIZE = 2000
+
+
+def post_urls():
+    """Published posts of all shards, merged in the order of ids."""
+    shards = (
+        posts.order_by('pk')
+        .values_list('pk', 'updated')
+        .iterator(chunk_size=CHUNK_SIZE)
+        for posts in shard_querysets()
+    )
+    for pk, updated in heapq.merge(*shards):
+        yield reverse('posts:post_detail', kwargs={'post_id': pk}), updated
+
+
+def latest_updates(field):
+    """Map value of the post field -> latest update of published posts
+    with it, with one grouped query per shard."""
+    latest = {}
+    for posts in shard_querysets():
+        rows = (
+            posts.order_by()
+            .values_list(field)
+            .annotate(lastmod=Max('updated'))
+        )
+        for key, lastmod in rows:
+            if key is not None:
+                latest[key] = max(lastmod, latest.get(key, lastmod))
+    return latest
+
+
+def group_urls():
+    lastmods = latest_updates('group_id')
+    rows = (
+        Group.objects.order_by('pk')
+        .values_list('pk', 'slug')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for pk, slug in rows:
+        url = reverse('posts:group_list', kwargs={'slug': slug})
+        yield url, lastmods.get(pk)
+
+
+def profile_urls():
+    """Active authors of published posts. Shards have no users table,
+    so authors are found in the shards and loaded in batches."""
+    lastmods = latest_updates('author_id')
+    for batch in chunks(sorted(lastmods), CHUNK_SIZE):
+        rows = (
+            User.objects.filter(pk__in=batch, is_active=True)
+            .order_by('pk')
+            .values_list('pk', 'username')
+        )
+        for pk, username in rows:
+            url = reverse('posts:profile', kwargs={'username': username})
+            yield url, lastmods[pk]
+
+
+SECTIONS = {
+    'posts': post_urls,
+    'groups': group_urls,
+    'profiles': profile_urls,
+}
+
+
+def sitemap_filename(section=None, page=None):
+    if section is None:
+        return 'sitemap.xml'
+    return f'sitemap-{section}-{page}.xml'
+
+
+def w3c_date(value):
+    return timezone.localtime(value, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%S+00:00'
+    )
+
+
+def loc(base_url, url):
+    return escape(iri_to_uri(f'{base_url}{url}'))
+
+
+class SitemapWriter:
+    """Write <url> entries into numbered files of limited size."""
+
+    def __init__(self, directory, section, base_url, limit):
+        self.directory = directory
+        self.section = section
+        self.base_url = base_url
+        self.limit = limit
+        self.files = []
+        self.file = None
+
+    def open_next(self):
+        self.close()
+        page = len(self.files) + 1
+        name = sitemap_filename(self.section, page)
+        self.file = open(
+            os.path.join(self.directory, name), 'w', encoding='utf-8'
+        )
+        self.file.write(f'{XML_HEADER}<urlset xmlns="{XMLNS}">\n')
+        self.files.append([self.section, page, None])
+        self.count = 0
+
+    def write(self, url, lastmod):
+        if self.file is None or self.count >= self.limit:
+            self.open_next()
+        entry = f'<url><loc>{loc(self.base_url, url)}</loc>'
+        if lastmod is not None:
+            entry += f'<lastmod>{w3c_date(lastmod)}</lastmod>'
+            current = self.files[-1]
+            current[2] = max(filter(None, (current[2], lastmod)))
+        self.file.write(f'{entry}</url>\n')
+        self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.write('</urlset>\n')
+            self.file.close()
+            self.file = None
+
+
+def write_index(directory, base_url, files):
+    with open(
+        os.path.join(directory, sitemap_filename()), 'w', encoding='utf-8'
+    ) as index:
+        index.write(f'{XML_HEADER}<sitemapindex xmlns="{XMLNS}">\n')
+        for section, page, lastmod in files:
+            url = reverse(
+                'posts:sitemap_section',
+                kwargs={'section': section, 'page': page},
+            )
+            entry = f'<sitemap><loc>{loc(base_url, url)}</loc>'
+            if lastmod is not None:
+                entry += f'<lastmod>{w3c_date(lastmod)}</lastmod>'
+            index.write(f'{entry}</sitemap>\n')
+        index.write('</sitemapindex>\n')
+
+
+def build_sitemaps(base_url=None, root=None, limit=None):
+    """Stream all urls of the site into sitemap files.
+
+    Files are written to a temporary directory and swapped in at the
+    end, so requests never see a half-written sitemap.
+    Returns a dict with number of urls per section.
+    """
+    base_url = (base_url or settings.SITEMAP_BASE_URL).rstrip('/')
+    root = root or settings.SITEMAP_ROOT
+    limit = limit or settings.SITEMAP_URLS_PER_FILE
+    parent = os.path.dirname(os.path.abspath(root))
+    os.makedirs(parent, exist_ok=True)
+    directory = tempfile.mkdtemp(dir=parent)
+    files = []
+    counts = {}
+    try:
+        for section, urls in SECTIONS.items():
+            writer = SitemapWriter(directory, section, base_url, limit)
+            counts[section] = 0
+            try:
+                for url, lastmod in urls():
+                    writer.write(url, lastmod)
+                    counts[section] += 1
+            finally:
+                writer.close()
+            files.extend(writer.files)
+        write_index(directory, base_url, files)
+        os.chmod(directory, 0o755)
+        old = f'{root}.old'
+        if os.path.exists(root):
+            os.replace(root, old)
+        os.replace(directory, root)
+        shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return counts
@@ -0,0 +1,205 @@
+import re
+from collections import defaultdict
+
+from django.db.models import Q
+from django.utils.text import Truncator
+
+from .models import NotificationEvent, Post, PostMention, PostTag, Tag, User
+from .notifications import EXCERPT_LENGTH
+from .sharding import posts_by_ids
+
+# Not inside words, urls or HTML entities like &#39;.
+HASHTAG_RE = re.compile(r'(?<![\w&#/])#(\w{1,50})')
+MENTION_RE = re.compile(r'(?<![\w@./])@(\w[\w.+-]{0,149})')
+
+
+def hashtags(text):
+    return {name.lower() for name in HASHTAG_RE.findall(text)}
+
+
+def mentions(text):
+    return {name.rstrip('.') for name in MENTION_RE.findall(text)}
+
+
+def indexed_text(post):
+    """Drafts and scheduled posts are not indexed until published."""
+    return post.text if post.status == Post.PUBLISHED else ''
+
+
+def tag_ids(names):
+    """Map tag name -> id, missing tags are created with one INSERT."""
+    ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+    missing = set(names) - set(ids)
+    if missing:
+        Tag.objects.bulk_create(
+            (Tag(name=name) for name in missing), ignore_conflicts=True
+        )
+        ids.update(
+            Tag.objects.filter(name__in=missing).values_list('name', 'pk')
+        )
+    return ids
+
+
+def sync_tags(posts):
+    """Tag rows of the posts follow their texts and dates."""
+    by_post = {post.pk: hashtags(indexed_text(post)) for post in posts}
+    ids = tag_ids(set().union(*by_post.values()))
+    wanted = {
+        (post_id, ids[name])
+        for post_id, names in by_post.items()
+        for name in names
+    }
+    rows = PostTag.objects.filter(post_id__in=by_post).values_list(
+        'pk', 'post_id', 'tag_id', 'pub_date'
+    )
+    stale, moved, existing = [], set(), set()
+    pub_dates = {post.pk: post.pub_date for post in posts}
+    for pk, post_id, tag_id, pub_date in rows:
+        if (post_id, tag_id) not in wanted:
+            stale.append(pk)
+            continue
+        existing.add((post_id, tag_id))
+        if pub_date != pub_dates[post_id]:
+            moved.add(post_id)
+    if stale:
+        PostTag.objects.filter(pk__in=stale).delete()
+    PostTag.objects.bulk_create(
+        (
+            PostTag(
+                post_id=post_id, tag_id=tag_id, pub_date=pub_dates[post_id]
+            )
+            for post_id, tag_id in wanted - existing
+        ),
+        ignore_conflicts=True,
+    )
+    # Publishing a scheduled post or a draft moves it in tag feeds.
+    by_date = defaultdict(list)
+    for post_id in moved:
+        by_date[pub_dates[post_id]].append(post_id)
+    for pub_date, post_ids in by_date.items():
+        PostTag.objects.filter(post_id__in=post_ids).update(pub_date=pub_date)
+
+
+def sync_mentions(posts):
+    """Mention rows of the posts follow their texts.
+
+    Returns new (post id, user id) pairs.
+    """
+    by_post = {post.pk: mentions(indexed_text(post)) for post in posts}
+    users = dict(
+        User.objects.filter(
+            username__in=set().union(*by_post.values())
+        ).values_list('username', 'pk')
+    )
+    authors = {post.pk: post.author_id for post in posts}
+    wanted = {
+        (post_id, users[name])
+        for post_id, names in by_post.items()
+        for name in names
+        if name in users and users[name] != authors[post_id]
+    }
+    rows = PostMention.objects.filter(post_id__in=by_post).values_list(
+        'pk', 'post_id', 'user_id'
+    )
+    stale, existing = [], set()
+    for pk, post_id, user_id in rows:
+        if (post_id, user_id) in wanted:
+            existing.add((post_id, user_id))
+        else:
+            stale.append(pk)
+    if stale:
+        PostMention.objects.filter(pk__in=stale).delete()
+    added = wanted - existing
+    PostMention.objects.bulk_create(
+        (
+            PostMention(post_id=post_id, user_id=user_id)
+            for post_id, user_id in added
+        ),
+        ignore_conflicts=True,
+    )
+    return added
+
+
+def notify_mentions(posts, added):
+    texts = {post.pk: post.text for post in posts}
+    authors = {post.pk: post.author_id for post in posts}
+    NotificationEvent.objects.bulk_create(
+        NotificationEvent(
+            kind=NotificationEvent.MENTION,
+            actor_id=authors[post_id],
+            recipient_id=user_id,
+            post_id=post_id,
+            text=Truncator(texts[post_id]).chars(EXCERPT_LENGTH),
+        )
+        for post_id, user_id in added
+    )
+
+
+def index_posts(posts):
+    """Bring hashtags and mentions of the posts up to date.
+
+    Current rows of all the posts are read with one query per table
+    and compared with the texts as sets, so an edit only inserts the
+    added pairs and deletes the removed ones. Only published posts are
+    indexed. Newly mentioned users get a notification, repeated saves
+    do not notify again.
+    """
+    posts = list(posts)
+    if not posts:
+        return
+    sync_tags(posts)
+    added = sync_mentions(posts)
+    if added:
+        notify_mentions(posts, added)
+
+
+def forget_posts(post_ids):
+    """Drop index rows of posts that are archived or deleted.
+
+    Returns number of deleted rows.
+    """
+    tags, _ = PostTag.objects.filter(post_id__in=post_ids).delete()
+    users, _ = PostMention.objects.filter(post_id__in=post_ids).delete()
+    return tags + users
+
+
+class TagPage:
+    """One keyset page of a tag feed. The next page starts below the
+    last post instead of an OFFSET."""
+
+    def __init__(self, posts, next_cursor):
+        self.posts = posts
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.posts)
+
+    def __len__(self):
+        return len(self.posts)
+
+
+def tag_page(tag, cursor=None, limit=10):
+    """Posts with the tag, newest first, after the post `cursor`.
+
+    The page is a range of the (tag, -pub_date, -post_id) index,
+    no post text is searched.
+    """
+    rows = PostTag.objects.filter(tag=tag)
+    if cursor is not None:
+        anchor = (
+            rows.filter(post_id=cursor)
+            .values_list('pub_date', flat=True)
+            .first()
+        )
+        if anchor is not None:
+            rows = rows.filter(
+                Q(pub_date__lt=anchor)
+                | Q(pub_date=anchor, post_id__lt=cursor)
+            )
+    post_ids = list(
+        rows.order_by('-pub_date', '-post_id').values_list(
+            'post_id', flat=True
+        )[:limit + 1]
+    )
+    next_cursor = post_ids[limit - 1] if len(post_ids) > limit else None
+    return TagPage(posts_by_ids(post_ids[:limit]), next_cursor)
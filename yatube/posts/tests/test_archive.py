@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.likes import set_like
+from posts.models import ArchivedComment, ArchivedPost, Comment, Like, Post
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.old_posts = [
+            Post.objects.create(author=cls.auth_user, text=f'Старый {i}')
+            for i in range(3)
+        ]
+        Post.objects.filter(
+            pk__in=[post.pk for post in cls.old_posts]
+        ).update(pub_date=timezone.now() - timedelta(days=1000))
+        Comment.objects.create(
+            post=cls.old_posts[0], author=cls.auth_user, text='Комментарий'
+        )
+        set_like(cls.auth_user, cls.old_posts[1])
+        cls.new_post = Post.objects.create(
+            author=cls.auth_user, text='Свежий пост'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.auth_user)
+        call_command(
+            'archive_posts', days=365, batch_size=2, stdout=StringIO()
+        )
+        cache.clear()
+
+    def test_old_posts_moved_to_archive(self):
+        """Старые посты и их комментарии переносятся в архив."""
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 0)
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old_posts[0].pk)
+
+    def test_archive_keeps_likes_count(self):
+        """Архивный пост сохраняет число отметок, сами отметки
+        удаляются вместе с постом."""
+        self.assertEqual(
+            ArchivedPost.objects.get(pk=self.old_posts[1].pk).likes_count, 1
+        )
+        self.assertFalse(Like.objects.exists())
+
+    def test_archived_post_detail(self):
+        """Архивный пост открывается по старому адресу без формы
+        комментария."""
+        response = self.authorized_client.get(
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.old_posts[0].pk}
+            )
+        )
+        self.assertEqual(response.context['post'].text, 'Старый 0')
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(
+            response.context['comments'][0].text, 'Комментарий'
+        )
+        self.assertNotContains(response, 'Добавить комментарий')
+
+    def test_profile_shows_archived_posts_after_hot(self):
+        """В профиле архивные посты идут после актуальных."""
+        response = self.guest_client.get(
+            reverse(
+                'posts:profile', kwargs={'username': self.auth_user.username}
+            )
+        )
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.count, 4)
+        self.assertEqual(page[0].text, self.new_post.text)
+        self.assertIsInstance(page[1], ArchivedPost)
+        self.assertNotIn(
+            'Старый',
+            self.guest_client.get(reverse('posts:index')).content.decode(),
+        )
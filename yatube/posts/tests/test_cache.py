@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class WarmCacheCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}', group=cls.group)
+            for i in range(settings.POSTS_PER_PAGE + 1)
+        )
+
+    def setUp(self):
+        self.guest_client = Client(HTTP_HOST=settings.CACHE_WARMUP_HOST)
+        cache.clear()
+
+    def test_warm_cache_renders_feed_pages(self):
+        """Команда прогревает 2 страницы index, group и profile,
+        первая страница кэшируется по адресу без ?page=."""
+        out = StringIO()
+        call_command('warm_cache', workers=1, stdout=out)
+        self.assertIn('Записано в кэш: 6', out.getvalue())
+        addresses = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertIsNone(self.guest_client.get(address).context)
+                response = self.guest_client.get(address, {'page': 2})
+                self.assertIsNone(response.context)
+
+    def test_feed_page_cache_dropped_on_new_post(self):
+        """Новый пост сбрасывает кэш страницы группы."""
+        address = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.guest_client.get(address)
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        response = self.guest_client.get(address)
+        self.assertEqual(response.context['page_obj'][0].text, 'Новый пост')
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.comments import assign_root_paths, comment_page
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def comment(self, text, parent=None):
+        data = {'text': text}
+        if parent is not None:
+            data['parent'] = Comment.objects.get(text=parent).pk
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data,
+        )
+
+    def shown(self, **params):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            params,
+        )
+        return [
+            (comment.text, comment.depth)
+            for comment in response.context['comments']
+        ]
+
+    def test_replies_follow_their_parent(self):
+        """Ветки идут от новой к старой, ответы под своим комментарием."""
+        self.comment('первый')
+        self.comment('второй')
+        self.comment('ответ 1', parent='первый')
+        self.comment('ответ 2', parent='первый')
+        self.comment('ответ на ответ', parent='ответ 1')
+        self.assertEqual(
+            self.shown(),
+            [
+                ('второй', 0),
+                ('первый', 0),
+                ('ответ 1', 1),
+                ('ответ на ответ', 2),
+                ('ответ 2', 1),
+            ],
+        )
+        thread = Comment.objects.get(text='первый').path
+        self.assertEqual(
+            [text for text, _ in self.shown(thread=thread)],
+            ['первый', 'ответ 1', 'ответ на ответ', 'ответ 2'],
+        )
+
+    @override_settings(COMMENT_MAX_DEPTH=1)
+    def test_deep_replies_stay_on_last_level(self):
+        """Ответ глубже предела становится соседом родителя."""
+        self.comment('корень')
+        self.comment('ответ', parent='корень')
+        self.comment('ответ на ответ', parent='ответ')
+        self.assertEqual(
+            self.shown(),
+            [('корень', 0), ('ответ', 1), ('ответ на ответ', 1)],
+        )
+
+    def test_thread_page_is_one_range(self):
+        """Страница ветки читается по индексу, следующая после пути."""
+        self.comment('корень')
+        for number in range(4):
+            self.comment(f'ответ {number}', parent='корень')
+        self.comment('другая ветка')
+        comments = self.post.comments.all()
+        thread = Comment.objects.get(text='корень').path
+        with self.assertNumQueries(2):
+            page = comment_page(comments, thread=thread, limit=3)
+        self.assertEqual(
+            [comment.text for comment in page],
+            ['корень', 'ответ 0', 'ответ 1'],
+        )
+        page = comment_page(
+            comments, thread=thread, after=page.next_cursor, limit=3
+        )
+        self.assertEqual(
+            [comment.text for comment in page], ['ответ 2', 'ответ 3']
+        )
+        self.assertIsNone(page.next_cursor)
+
+    def test_bulk_comments_start_new_threads(self):
+        """Комментарии для bulk_create получают пути новых веток."""
+        self.comment('старый')
+        comments = [
+            Comment(post=self.post, author=self.author, text=text)
+            for text in ('первый', 'второй')
+        ]
+        for comment in comments:
+            comment.created = self.post.pub_date
+        Comment.objects.bulk_create(assign_root_paths(comments))
+        self.assertEqual(
+            [text for text, _ in self.shown()],
+            ['второй', 'первый', 'старый'],
+        )
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.counters import view_counter, write_views
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(
+    VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_MAX_PENDING=1000
+)
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        view_counter.take()
+        self.addCleanup(view_counter.take)
+        self.guest_client = Client()
+
+    def test_views_are_buffered_until_flush(self):
+        """Просмотры копятся в памяти и пишутся в базу при сбросе."""
+        post = self.posts[0]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        for _ in range(3):
+            self.guest_client.get(url)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 0)
+        self.assertEqual(view_counter.metrics()['pending_views'], 3)
+        self.assertEqual(view_counter.flush(), 3)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 3)
+        self.assertEqual(view_counter.metrics()['pending_views'], 0)
+
+    def test_views_are_written_in_batches(self):
+        """Счётчики пишутся одним UPDATE на пачку постов."""
+        counts = {post.pk: index + 1 for index, post in enumerate(self.posts)}
+        with self.assertNumQueries(3):
+            self.assertEqual(write_views(counts, batch_size=2), 3)
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertEqual(post.views, counts[post.pk])
+
+    @override_settings(VIEW_COUNTER_MAX_PENDING=2)
+    def test_full_buffer_is_flushed(self):
+        """Переполненный буфер сбрасывается сразу."""
+        post = self.posts[1]
+        view_counter.add(post.pk)
+        view_counter.add(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 2)
+
+    def test_failed_flush_keeps_views(self):
+        """При ошибке базы просмотры возвращаются в буфер."""
+        view_counter.add(self.posts[2].pk)
+        with mock.patch(
+            'posts.counters.write_views', side_effect=DatabaseError
+        ), self.assertLogs('posts.counters', 'ERROR'):
+            self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(view_counter.metrics()['pending_views'], 1)
+
+    def test_metrics_are_for_staff_only(self):
+        """Метрика буфера доступна только персоналу."""
+        url = reverse('posts:view_counter_metrics')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        view_counter.add(self.posts[0].pk)
+        response = client.get(url)
+        self.assertEqual(response.json()['pending_views'], 1)
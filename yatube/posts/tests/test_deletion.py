@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts.deletion import process_task, schedule_deletion
+from posts.likes import set_like
+from posts.models import (
+    Comment,
+    DeletionTask,
+    Follow,
+    Group,
+    Like,
+    NotificationState,
+    Post,
+)
+from posts.notifications import mark_all_read, notify_follows, process_pending
+
+User = get_user_model()
+
+
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        for i in range(5):
+            post = Post.objects.create(
+                author=cls.auth_user, text=f'Пост {i}', group=cls.group
+            )
+            Comment.objects.create(
+                post=post, author=cls.other_user, text='Комментарий'
+            )
+        cls.other_post = Post.objects.create(
+            author=cls.other_user, text='Чужой пост', group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.other_post, author=cls.auth_user, text='Ответ'
+        )
+        Follow.objects.create(user=cls.auth_user, author=cls.other_user)
+        Follow.objects.create(user=cls.other_user, author=cls.auth_user)
+
+    def test_user_deletion_resumes_after_interruption(self):
+        """Удаление пользователя идёт пачками и продолжается
+        после прерывания."""
+        task = schedule_deletion(self.auth_user)
+        self.assertFalse(User.objects.get(pk=self.auth_user.pk).is_active)
+        self.assertFalse(
+            process_task(task, batch_size=2, pause=0, max_batches=3)
+        )
+        self.assertTrue(User.objects.filter(pk=self.auth_user.pk).exists())
+        call_command(
+            'process_deletions', batch_size=2, pause=0, stdout=StringIO()
+        )
+        task.refresh_from_db()
+        self.assertIsNotNone(task.finished)
+        self.assertFalse(User.objects.filter(pk=self.auth_user.pk).exists())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(Follow.objects.count(), 0)
+        self.assertEqual(task.deleted_rows, 5 + 6 + 2 + 1)
+
+    def test_group_deletion_keeps_posts(self):
+        """При удалении группы посты остаются без группы."""
+        task = schedule_deletion(self.group)
+        self.assertTrue(process_task(task, batch_size=4, pause=0))
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 6)
+
+    def test_schedule_is_idempotent(self):
+        """Повторная постановка в очередь не создаёт новую задачу."""
+        schedule_deletion(self.group)
+        schedule_deletion(self.group)
+        self.assertEqual(DeletionTask.objects.count(), 1)
+
+    def test_user_deletion_takes_likes_off_counters(self):
+        """Отметки удалённого пользователя вычитаются из счётчиков
+        постов."""
+        set_like(self.auth_user, self.other_post)
+        set_like(self.other_user, self.other_post)
+        process_task(schedule_deletion(self.auth_user), pause=0)
+        self.other_post.refresh_from_db()
+        self.assertEqual(self.other_post.likes_count, 1)
+        self.assertEqual(
+            list(Like.objects.values_list('user', flat=True)),
+            [self.other_user.pk],
+        )
+
+    def test_user_deletion_takes_notifications_off_counters(self):
+        """Непрочитанные уведомления от удалённого пользователя
+        вычитаются из счётчиков получателей."""
+        third_user = User.objects.create_user(username='third')
+        notify_follows(self.auth_user, [self.other_user.pk])
+        process_pending()
+        mark_all_read(self.other_user)
+        notify_follows(self.auth_user, [self.other_user.pk, third_user.pk])
+        notify_follows(third_user, [self.other_user.pk])
+        process_pending()
+        process_task(
+            schedule_deletion(self.auth_user), batch_size=1, pause=0
+        )
+        self.assertEqual(
+            dict(NotificationState.objects.values_list('user', 'unread')),
+            {self.other_user.pk: 1, third_user.pk: 0},
+        )
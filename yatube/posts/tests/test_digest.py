@@ -0,0 +1,76 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from posts.digest import send_digest
+from posts.models import DigestRun, DigestState, Follow, Post
+
+User = get_user_model()
+
+
+class DigestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{i}', email=f'reader{i}@example.com'
+            )
+            for i in range(3)
+        ]
+        User.objects.create_user(username='silent')
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Новый пост')
+
+    def test_digest_is_sent_once_per_post(self):
+        """Дайджест содержит новые посты и не повторяет их."""
+        now = timezone.now() + timedelta(seconds=1)
+        with mock.patch(
+            'posts.digest.get_connection', wraps=get_connection
+        ) as connection:
+            self.assertEqual(send_digest(batch_size=2, now=now), 3)
+        self.assertEqual(connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('Новый пост', mail.outbox[0].body)
+        self.assertIn(f'/posts/{self.post.pk}/', mail.outbox[0].body)
+        self.assertEqual(
+            DigestState.objects.filter(sent_until=now).count(), 3
+        )
+        send_digest(now=now + timedelta(hours=1))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_interrupted_run_resumes_after_checkpoint(self):
+        """Прерванная рассылка продолжается со следующей пачки."""
+        now = timezone.now() + timedelta(seconds=1)
+        calls = []
+
+        def fail_second_batch(messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionError
+            mail.outbox.extend(messages)
+            return len(messages)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=fail_second_batch,
+        ), self.assertRaises(ConnectionError):
+            send_digest(batch_size=2, now=now)
+        run = DigestRun.objects.get()
+        self.assertEqual(run.last_user_id, self.readers[1].pk)
+        self.assertIsNone(run.finished)
+        out = StringIO()
+        call_command('send_digest', stdout=out)
+        self.assertIn('Отправлено писем: 1', out.getvalue())
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [reader.email for reader in self.readers],
+        )
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.staff_user = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.auth_user, text='Пост в группе', group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other_user, text='Пост без группы'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.other_user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.other_user, author=cls.auth_user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.auth_user)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff_user)
+
+    def get_export(self, dataset, **params):
+        response = self.staff_client.get(
+            reverse('posts:export_data', kwargs={'dataset': dataset}), params
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return b''.join(response.streaming_content)
+
+    def test_export_available_only_for_staff(self):
+        """Выгрузка недоступна обычному пользователю."""
+        response = self.authorized_client.get(
+            reverse('posts:export_data', kwargs={'dataset': 'posts'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_ndjson_export_with_filters(self):
+        """NDJSON выгрузка постов учитывает фильтры группы и автора."""
+        content = self.get_export('posts', group=self.group.slug)
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], self.post.text)
+        self.assertEqual(rows[0]['author'], 'auth')
+        content = self.get_export('follows', author='auth')
+        self.assertEqual(json.loads(content)['user'], 'other')
+        content = self.get_export('comments', since='2000-01-01')
+        self.assertEqual(json.loads(content)['post'], self.post.pk)
+        content = self.get_export('posts', until='2000-01-01')
+        self.assertEqual(content, b'')
+
+    def test_gzip_csv_export(self):
+        """CSV выгрузка сжимается gzip на лету."""
+        content = gzip.decompress(
+            self.get_export('groups', format='csv', gzip='1')
+        )
+        rows = list(csv.reader(content.decode().splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'slug', 'description'])
+        self.assertEqual(rows[1][2], self.group.slug)
+
+    def test_invalid_filters(self):
+        """Некорректные параметры выгрузки отдают 400."""
+        params = [
+            ('posts', {'format': 'xml'}),
+            ('posts', {'since': 'yesterday'}),
+            ('follows', {'since': '2000-01-01'}),
+            ('users', {}),
+        ]
+        for dataset, query in params:
+            with self.subTest(dataset=dataset, query=query):
+                response = self.staff_client.get(
+                    reverse('posts:export_data', kwargs={'dataset': dataset}),
+                    query,
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+
+    def test_export_command_writes_file(self):
+        """Команда export_data пишет выгрузку в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson.gz')
+            call_command('export_data', 'posts', gzip=True, output=path)
+            with gzip.open(path, 'rt') as export:
+                rows = [json.loads(line) for line in export]
+        self.assertEqual(
+            {row['id'] for row in rows}, {self.post.pk, self.other_post.pk}
+        )
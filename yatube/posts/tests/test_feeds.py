@@ -0,0 +1,82 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.auth_user,
+            text='Тестовый пост из группы Дневник',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_feeds_contain_posts(self):
+        """Ленты RSS и Atom содержат посты сайта, группы и автора."""
+        feeds = {
+            reverse('posts:feed'): 'application/rss+xml',
+            reverse('posts:feed_atom'): 'application/atom+xml',
+            reverse(
+                'posts:group_feed', kwargs={'slug': self.group.slug}
+            ): 'application/rss+xml',
+            reverse(
+                'posts:group_feed_atom', kwargs={'slug': self.group.slug}
+            ): 'application/atom+xml',
+            reverse(
+                'posts:profile_feed',
+                kwargs={'username': self.auth_user.username},
+            ): 'application/rss+xml',
+            reverse(
+                'posts:profile_feed_atom',
+                kwargs={'username': self.auth_user.username},
+            ): 'application/atom+xml',
+        }
+        for address, content_type in feeds.items():
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type
+                ))
+                self.assertIn(self.post.text, response.content.decode())
+
+    def test_unknown_group_feed_not_found(self):
+        """Лента несуществующей группы отдаёт 404."""
+        response = self.guest_client.get(
+            reverse('posts:group_feed', kwargs={'slug': 'unknown'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_feed_cache_dropped_on_new_post(self):
+        """Новый пост сразу попадает в закэшированную ленту."""
+        address = reverse('posts:feed')
+        self.guest_client.get(address)
+        Post.objects.create(author=self.auth_user, text='Свежий пост')
+        response = self.guest_client.get(address)
+        self.assertIn('Свежий пост', response.content.decode())
+
+    def test_unchanged_feed_returns_not_modified(self):
+        """Неизменившаяся лента отдаёт 304."""
+        address = reverse('posts:feed_atom')
+        etag = self.guest_client.get(address)['ETag']
+        cache.clear()
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,165 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.cache import get_feed_version
+from posts.follows import unfollow_many
+from posts.models import Follow
+
+User = get_user_model()
+
+
+@override_settings(FOLLOWS_PER_PAGE=2)
+class FollowListTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.viewer = User.objects.create_user(username='viewer')
+        cls.fans = [
+            User.objects.create_user(username=f'fan{i}') for i in range(3)
+        ]
+        for fan in cls.fans:
+            Follow.objects.create(user=fan, author=cls.author)
+        Follow.objects.create(user=cls.viewer, author=cls.fans[2])
+        Follow.objects.create(user=cls.fans[1], author=cls.viewer)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.viewer)
+        self.url = reverse(
+            'posts:profile_followers', kwargs={'username': 'author'}
+        )
+
+    def test_followers_keyset_pages(self):
+        """Подписчики выводятся страницами от новых к старым."""
+        people = self.client.get(self.url).context['people']
+        self.assertEqual(
+            [person.username for person in people], ['fan2', 'fan1']
+        )
+        response = self.client.get(
+            self.url, {'cursor': people.next_cursor}
+        )
+        people = response.context['people']
+        self.assertEqual([person.username for person in people], ['fan0'])
+        self.assertIsNone(people.next_cursor)
+
+    def test_mutual_flags_use_one_query(self):
+        """Отметки взаимных подписок загружаются одним запросом."""
+        self.client.get(self.url)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        flags = {
+            person.username: (person.you_follow, person.follows_you)
+            for person in response.context['people']
+        }
+        self.assertEqual(
+            flags, {'fan2': (True, False), 'fan1': (False, True)}
+        )
+
+    def test_following_page(self):
+        """Страница подписок показывает авторов пользователя."""
+        response = self.client.get(
+            reverse('posts:profile_following', kwargs={'username': 'fan1'})
+        )
+        self.assertEqual(
+            [person.username for person in response.context['people']],
+            ['viewer', 'author'],
+        )
+
+    def test_bad_cursor_opens_first_page(self):
+        """Неверный курсор открывает первую страницу."""
+        response = self.client.get(self.url, {'cursor': 'abc'})
+        self.assertEqual(len(response.context['people']), 2)
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:follow_bulk')
+
+    def test_bulk_follow_and_unfollow(self):
+        """Подписка и отписка на многих авторов за один запрос."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        version = get_feed_version()
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                self.url,
+                {'username': ['author0, author1 author2', 'reader', 'nobody']},
+            )
+        self.assertEqual(response.json(), {'followed': 2})
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
+        self.assertNotEqual(get_feed_version(), version)
+        version = get_feed_version()
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                self.url,
+                {'username': 'author0,author1', 'action': 'unfollow'},
+            )
+        self.assertEqual(response.json(), {'unfollowed': 2})
+        self.assertNotEqual(get_feed_version(), version)
+        self.assertEqual(
+            list(
+                Follow.objects.filter(user=self.user).values_list(
+                    'author__username', flat=True
+                )
+            ),
+            ['author2'],
+        )
+
+    def test_unfollow_many_is_one_delete(self):
+        """Отписка от многих авторов выполняется одним DELETE
+        и сбрасывает кэш лент один раз."""
+        Follow.objects.bulk_create(
+            Follow(user=self.user, author=author) for author in self.authors
+        )
+        version = get_feed_version()
+        with self.assertNumQueries(1):
+            deleted = unfollow_many(
+                self.user, ['author0', 'author1', 'author2', 'nobody']
+            )
+        self.assertEqual(deleted, 3)
+        self.assertEqual(
+            list(
+                Follow.objects.filter(user=self.user).values_list(
+                    'author__username', flat=True
+                )
+            ),
+            ['author3'],
+        )
+        self.assertNotEqual(get_feed_version(), version)
+
+    @override_settings(FOLLOW_BULK_LIMIT=2)
+    def test_bulk_follow_limit(self):
+        """Слишком длинный список отклоняется."""
+        response = self.client.post(
+            self.url, {'username': 'author0 author1 author2'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_bulk_follow_command(self):
+        """Команда bulk_follow подписывает пользователя на авторов."""
+        out = StringIO()
+        call_command('bulk_follow', 'reader', 'author1', 'author3', stdout=out)
+        self.assertIn('Новых подписок: 2', out.getvalue())
+        call_command(
+            'bulk_follow', 'reader', 'author1', unfollow=True, stdout=out
+        )
+        self.assertEqual(
+            Follow.objects.get(user=self.user).author, self.authors[3]
+        )
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class GroupsDirectoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.quiet = Group.objects.create(
+            title='Архив', slug='quiet', description='Тихо'
+        )
+        cls.busy = Group.objects.create(
+            title='Бег', slug='busy', description='Шумно'
+        )
+        cls.empty = Group.objects.create(
+            title='Вязание', slug='empty', description='Пусто'
+        )
+        old = Post.objects.create(
+            author=cls.author, text='Старый', group=cls.quiet
+        )
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=10)
+        )
+        for author in (cls.author, cls.author, cls.other):
+            Post.objects.create(author=author, text='Пост', group=cls.busy)
+        Post.objects.create(
+            author=cls.other,
+            text='Черновик',
+            group=cls.busy,
+            status=Post.DRAFT,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def rows(self, url_name):
+        response = self.client.get(reverse(url_name))
+        return [
+            (group['slug'], group['posts'], group['authors'])
+            for group in response.context['page_obj']
+        ]
+
+    def test_counters_and_sorting(self):
+        """Группы с числом записей и авторов, по названию и активности."""
+        self.assertEqual(
+            self.rows('posts:groups'),
+            [('quiet', 1, 1), ('busy', 3, 2), ('empty', 0, 0)],
+        )
+        self.assertEqual(
+            self.rows('posts:groups_active'),
+            [('busy', 3, 2), ('quiet', 1, 1), ('empty', 0, 0)],
+        )
+
+    def test_directory_is_cached_until_feeds_change(self):
+        """Счётчики читаются из кэша, новый пост сбрасывает их."""
+        self.client.get(reverse('posts:groups'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('posts:groups'))
+        Post.objects.create(author=self.other, text='Ещё', group=self.quiet)
+        self.assertIn(('quiet', 2, 2), self.rows('posts:groups'))
+
+    def test_pagination(self):
+        """Каталог групп делится на страницы."""
+        with self.settings(GROUPS_PER_PAGE=2):
+            response = self.client.get(
+                reverse('posts:groups'), {'page': 2}
+            )
+        self.assertEqual(
+            [group['slug'] for group in response.context['page_obj']],
+            ['empty'],
+        )
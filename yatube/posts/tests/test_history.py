@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import history
+from posts.models import Group, Post, PostRevision
+
+User = get_user_model()
+
+
+class PostHistoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, text='первая строка\nвторая строка'
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def edit(self, **data):
+        return self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data,
+        )
+
+    def test_edit_records_previous_version(self):
+        """Правка сохраняет прежнюю версию, история видна автору."""
+        self.edit(text='первая строка\nновая строка', group=self.group.pk)
+        self.edit(text='первая строка\nновая строка', group=self.group.pk)
+        revisions = PostRevision.objects.filter(post_id=self.post.pk)
+        self.assertEqual(revisions.count(), 1)
+        response = self.author_client.get(
+            reverse('posts:post_history', kwargs={'post_id': self.post.pk})
+        )
+        shown = response.context['revisions']
+        self.assertEqual(len(shown), 1)
+        self.assertEqual(shown[0]['text'], 'первая строка\nвторая строка')
+        self.assertIsNone(shown[0]['group'])
+
+    def test_history_is_hidden_from_others(self):
+        """Чужую историю не показывают."""
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:post_history', kwargs={'post_id': self.post.pk})
+        self.assertRedirects(
+            client.get(url),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_diff_round_trip(self):
+        """Diff восстанавливает новый текст из старого."""
+        old = 'a\nb\nc\n'
+        for new in ('a\nc\n', 'x\na\nb\nc\ny', '', 'a\nB\nc\n'):
+            ops = history.make_diff(old, new)
+            self.assertEqual(history.apply_diff(old, ops), new)
+
+    @override_settings(POST_REVISION_SNAPSHOT_EVERY=3, POST_REVISIONS_MAX=50)
+    def test_snapshots_are_periodic(self):
+        """Полная копия хранится раз в несколько версий."""
+        texts = [f'версия {number}\nобщий хвост' for number in range(7)]
+        for text in texts:
+            history.record_revision(self.post.pk, text, None, '')
+        snapshots = PostRevision.objects.filter(
+            post_id=self.post.pk, is_snapshot=True
+        ).values_list('number', flat=True)
+        self.assertEqual(sorted(snapshots), [1, 4, 7])
+        self.assertEqual(history.revision_text(self.post.pk, 6), texts[5])
+        shown = [row['text'] for row in history.post_history(self.post.pk)]
+        self.assertEqual(shown, texts[::-1])
+
+    @override_settings(POST_REVISION_SNAPSHOT_EVERY=4, POST_REVISIONS_MAX=3)
+    def test_history_is_bounded(self):
+        """Старые версии удаляются, оставшиеся восстанавливаются."""
+        texts = [f'текст {number}' for number in range(6)]
+        for text in texts:
+            history.record_revision(self.post.pk, text, None, '')
+        revisions = PostRevision.objects.filter(post_id=self.post.pk)
+        numbers = revisions.order_by('number').values_list(
+            'number', flat=True
+        )
+        self.assertEqual(list(numbers), [4, 5, 6])
+        self.assertTrue(revisions.get(number=4).is_snapshot)
+        shown = [row['text'] for row in history.post_history(self.post.pk)]
+        self.assertEqual(shown, texts[:2:-1])
@@ -0,0 +1,122 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts.export import export_stream
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ImportCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        cls.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def write_ndjson(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with gzip.open(path, 'wt', encoding='utf-8') as source:
+            for row in rows:
+                source.write(json.dumps(row) + '\n')
+        return path
+
+    def test_import_posts_keeps_pub_date(self):
+        """Импорт сохраняет исходную дату публикации и отклоняет
+        строки с неизвестными авторами и группами."""
+        path = self.write_ndjson('posts.ndjson.gz', [
+            {
+                'id': 100,
+                'text': 'Старый пост',
+                'pub_date': '2010-05-01T10:00:00+00:00',
+                'author': 'auth',
+                'group': 'Diary',
+            },
+            {'text': 'Без группы', 'author': 'auth'},
+            {'text': 'Чужой', 'author': 'nobody'},
+            {'text': 'Не та группа', 'author': 'auth', 'group': 'none'},
+            {'id': 100, 'text': 'Повтор', 'author': 'auth'},
+        ])
+        out = StringIO()
+        call_command(
+            'import_data', 'posts', path, batch_size=2,
+            stdout=out, stderr=StringIO(),
+        )
+        self.assertIn('Создано: 2, отклонено: 3', out.getvalue())
+        post = Post.objects.get(pk=100)
+        self.assertEqual(
+            post.pub_date, datetime(2010, 5, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.updated, post.pub_date)
+
+    def test_import_comments_from_csv(self):
+        """Комментарии импортируются из CSV к существующим постам."""
+        post = Post.objects.create(author=self.auth_user, text='Пост')
+        path = os.path.join(self.directory, 'comments.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as source:
+            writer = csv.writer(source)
+            writer.writerow(['post', 'author', 'text', 'created'])
+            writer.writerow([post.pk, 'auth', 'Ответ', '2011-01-01 12:00'])
+            writer.writerow([post.pk + 1, 'auth', 'Потерянный', ''])
+        rejects = os.path.join(self.directory, 'rejects.ndjson')
+        call_command(
+            'import_data', 'comments', path, rejects=rejects,
+            stdout=StringIO(),
+        )
+        comment = Comment.objects.get(post=post)
+        self.assertEqual(comment.created.year, 2011)
+        with open(rejects, encoding='utf-8') as source:
+            reject = json.loads(source.readline())
+        self.assertEqual(reject['row']['text'], 'Потерянный')
+        self.assertTrue(
+            Post._meta.get_field('pub_date').auto_now_add
+        )
+
+    def test_export_import_round_trip_keeps_status(self):
+        """Экспорт и импорт постов сохраняют черновики
+        и запланированные посты."""
+        publish_at = datetime(2030, 1, 1, 9, tzinfo=timezone.utc)
+        Post.objects.create(author=self.auth_user, text='Опубликован')
+        Post.objects.create(
+            author=self.auth_user, text='Черновик', status=Post.DRAFT
+        )
+        Post.objects.create(
+            author=self.auth_user,
+            text='Запланирован',
+            status=Post.SCHEDULED,
+            publish_at=publish_at,
+        )
+        fields = ('pk', 'text', 'status', 'publish_at')
+        exported = list(Post.objects.order_by('pk').values_list(*fields))
+        for fmt in ('ndjson', 'csv'):
+            with self.subTest(fmt=fmt):
+                path = os.path.join(self.directory, f'posts.{fmt}')
+                with open(path, 'wb') as target:
+                    target.writelines(export_stream('posts', fmt))
+                Post.objects.all().delete()
+                call_command('import_data', 'posts', path, stdout=StringIO())
+                self.assertEqual(
+                    list(Post.objects.order_by('pk').values_list(*fields)),
+                    exported,
+                )
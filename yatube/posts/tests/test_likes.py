@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Like, Post
+
+User = get_user_model()
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.auth_user, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.auth_user)
+        self.like_url = reverse(
+            'posts:post_like', kwargs={'post_id': self.post.pk}
+        )
+        self.unlike_url = reverse(
+            'posts:post_unlike', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_like_and_unlike_are_idempotent(self):
+        """Повторная отметка не меняет счётчик."""
+        for _ in range(2):
+            self.authorized_client.post(self.like_url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(Like.objects.count(), 1)
+        for _ in range(2):
+            response = self.authorized_client.post(self.unlike_url)
+        self.assertRedirects(
+            response,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_needs_post_request_and_login(self):
+        """Отметку ставит только авторизованный пользователь POST-запросом."""
+        response = self.authorized_client.get(self.like_url)
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        response = self.guest_client.post(self.like_url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={self.like_url}'
+        )
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_changes_post_etag(self):
+        """Отметка меняет ETag страницы поста."""
+        address = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        etag = self.authorized_client.get(address)['ETag']
+        self.authorized_client.post(self.like_url)
+        response = self.authorized_client.get(
+            address, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['post'].liked)
+
+    def feed_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+        return response, len(queries)
+
+    def test_feed_marks_liked_posts_with_constant_queries(self):
+        """Отметки на странице ленты загружаются одним запросом."""
+        self.authorized_client.post(self.like_url)
+        _, few_posts_queries = self.feed_queries()
+        Post.objects.bulk_create(
+            Post(author=self.auth_user, text=f'Пост {i}') for i in range(5)
+        )
+        for post in Post.objects.exclude(pk=self.post.pk)[:2]:
+            Like.objects.create(user=self.auth_user, post=post)
+        response, many_posts_queries = self.feed_queries()
+        self.assertEqual(many_posts_queries, few_posts_queries)
+        liked = [post.liked for post in response.context['page_obj']]
+        self.assertEqual(liked.count(True), 3)
@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.markup import render
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class RenderTests(TestCase):
+    def test_inline_markup(self):
+        """Выделение, код и ссылки внутри абзаца."""
+        self.assertEqual(
+            render('**жирный** *курсив* ~~нет~~ `a*b*`\nвторая строка'),
+            '<p><strong>жирный</strong> <em>курсив</em> <del>нет</del> '
+            '<code>a*b*</code><br>вторая строка</p>',
+        )
+        self.assertEqual(
+            render('[сайт](https://example.com/*x*)'),
+            '<p><a href="https://example.com/*x*" rel="nofollow noopener">'
+            'сайт</a></p>',
+        )
+
+    def test_blocks(self):
+        """Заголовки, списки, цитаты и блоки кода."""
+        text = (
+            '# Заголовок\n\n- раз\n- два\n\n1. один\n\n'
+            '> цитата\n\n```\n**код**\n```'
+        )
+        self.assertEqual(
+            render(text),
+            '<h3>Заголовок</h3><ul><li>раз</li><li>два</li></ul>'
+            '<ol><li>один</li></ol><blockquote><p>цитата</p></blockquote>'
+            '<pre><code>**код**</code></pre>',
+        )
+
+    def test_html_is_escaped(self):
+        """HTML из текста и опасные ссылки не попадают в разметку."""
+        html = render('<script>alert(1)</script> [x](javascript:alert(1))')
+        self.assertNotIn('<script>', html)
+        self.assertNotIn('href', html)
+        self.assertIn('&lt;script&gt;', html)
+        html = render('[x](https://e.com/" onclick="alert(1))')
+        self.assertNotIn('" onclick', html)
+        for url in ('//evil.com', '/\\evil.com', '/\\/evil.com'):
+            with self.subTest(url=url):
+                self.assertNotIn('href', render(f'[x]({url})'))
+        self.assertIn('href="/about/"', render('[x](/about/)'))
+
+
+class RenderedTextTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_html_is_stored_on_save(self):
+        """HTML сохраняется при записи и выводится на странице."""
+        post = Post.objects.create(author=self.author, text='**пост**')
+        Comment.objects.create(
+            post=post, author=self.author, text='*комментарий*'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p><strong>пост</strong></p>')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, '<strong>пост</strong>')
+        self.assertContains(response, '<em>комментарий</em>')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<strong>пост</strong>')
+
+    def test_command_renders_stale_texts(self):
+        """Команда перерисовывает тексты другой версии рендера."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'**{number}**')
+            for number in range(3)
+        ]
+        Comment.objects.create(post=posts[0], author=self.author, text='к')
+        Post.objects.update(text_html='', html_version=0)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': posts[0].pk})
+        )
+        self.assertContains(response, '**0**')
+        call_command('render_markdown', batch_size=2, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(html_version=0).exists())
+        self.assertEqual(
+            Post.objects.get(pk=posts[0].pk).text_html,
+            '<p><strong>0</strong></p>',
+        )
+        next_version = settings.MARKDOWN_VERSION + 1
+        with override_settings(MARKDOWN_VERSION=next_version):
+            out = StringIO()
+            call_command('render_markdown', stdout=out)
+        self.assertIn('4', out.getvalue())
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import (
+    Comment,
+    Notification,
+    NotificationEvent,
+    NotificationState,
+    Post,
+)
+from posts.notifications import (
+    mark_all_read,
+    process_pending,
+    unread_count,
+)
+
+User = get_user_model()
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.commenter = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.commenter, text='Первый'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_events_are_fanned_out_later(self):
+        """События копятся в очереди и рассылаются пачками."""
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'},
+        )
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(NotificationEvent.objects.count(), 2)
+        self.assertFalse(Notification.objects.exists())
+        call_command('process_notifications', batch_size=1, stdout=StringIO())
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertEqual(
+            sorted(
+                Notification.objects.values_list('user__username', 'kind')
+            ),
+            [
+                ('author', 'comment'),
+                ('author', 'follow'),
+                ('commenter', 'comment'),
+            ],
+        )
+        self.assertEqual(unread_count(self.author), 2)
+        self.assertEqual(unread_count(self.reader), 0)
+
+    def test_unread_count_is_cached(self):
+        """Счётчик в шапке читается из кэша без запросов."""
+        NotificationEvent.objects.create(
+            kind=NotificationEvent.FOLLOW,
+            actor=self.reader,
+            recipient=self.author,
+        )
+        process_pending()
+        url = reverse('posts:notifications')
+        response = self.author_client.get(url)
+        self.assertEqual(response.context['unread_notifications'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.author), 1)
+
+    def test_mark_all_read(self):
+        """Все уведомления отмечаются прочитанными одним запросом."""
+        for user in (self.reader, self.commenter):
+            NotificationEvent.objects.create(
+                kind=NotificationEvent.FOLLOW,
+                actor=user,
+                recipient=self.author,
+            )
+        process_pending()
+        newest = Notification.objects.filter(user=self.author).first()
+        with self.assertNumQueries(1):
+            mark_all_read(self.author)
+        state = NotificationState.objects.get(user=self.author)
+        self.assertEqual((state.unread, state.last_read), (0, newest.pk))
+        response = self.author_client.post(
+            reverse('posts:notifications_read')
+        )
+        self.assertRedirects(response, reverse('posts:notifications'))
+        self.assertEqual(unread_count(self.author), 0)
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.cache import get_feed_version
+from posts.models import Post
+from posts.publishing import publish_due
+
+User = get_user_model()
+
+
+class PublishingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def create(self, **data):
+        return self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Пост', **data}
+        )
+
+    def index_posts(self):
+        cache.clear()
+        response = self.reader_client.get(reverse('posts:index'))
+        return list(response.context['page_obj'])
+
+    def test_draft_is_hidden_from_feeds(self):
+        """Черновик виден только автору."""
+        response = self.create(status=Post.DRAFT)
+        self.assertRedirects(response, reverse('posts:drafts'))
+        draft = Post.objects.get()
+        self.assertEqual(self.index_posts(), [])
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        url = reverse('posts:post_detail', kwargs={'post_id': draft.pk})
+        self.assertEqual(self.reader_client.get(url).status_code, 404)
+        self.assertEqual(self.author_client.get(url).status_code, 200)
+        response = self.author_client.get(reverse('posts:drafts'))
+        self.assertEqual(list(response.context['page_obj']), [draft])
+        response = self.reader_client.get(reverse('api:post_list'))
+        self.assertEqual(response.json()['results'], [])
+
+    def test_draft_takes_no_comments_or_likes_of_others(self):
+        """Чужой черновик нельзя прокомментировать или отметить."""
+        self.create(status=Post.DRAFT)
+        draft = Post.objects.get()
+        kwargs = {'post_id': draft.pk}
+        for name in ('posts:add_comment', 'posts:post_like'):
+            with self.subTest(name=name):
+                response = self.reader_client.post(
+                    reverse(name, kwargs=kwargs), {'text': 'Комментарий'}
+                )
+                self.assertEqual(response.status_code, 404)
+        self.assertFalse(draft.comments.exists())
+        self.assertFalse(draft.likes.exists())
+        self.author_client.post(reverse('posts:post_like', kwargs=kwargs))
+        draft.refresh_from_db()
+        self.assertEqual(draft.likes_count, 1)
+
+    def test_publishing_draft_on_edit_sets_date(self):
+        """Публикация черновика ставит текущую дату."""
+        self.create(status=Post.DRAFT)
+        draft = Post.objects.get()
+        Post.objects.filter(pk=draft.pk).update(
+            pub_date=timezone.now() - timedelta(days=1)
+        )
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': draft.pk}),
+            {'text': 'Готово', 'status': Post.PUBLISHED},
+        )
+        draft.refresh_from_db()
+        self.assertEqual(draft.status, Post.PUBLISHED)
+        self.assertGreater(
+            draft.pub_date, timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(self.index_posts(), [draft])
+
+    def test_schedule_needs_future_time(self):
+        """Запланировать можно только на будущее время."""
+        response = self.create(status=Post.SCHEDULED)
+        self.assertFormError(
+            response, 'publish_form', 'publish_at', 'Укажите время публикации'
+        )
+        past = timezone.localtime() - timedelta(hours=1)
+        response = self.create(
+            status=Post.SCHEDULED, publish_at=past.strftime('%Y-%m-%dT%H:%M')
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_scheduled_posts_are_published_in_batches(self):
+        """Команда публикует наступившие посты и сбрасывает кэш лент."""
+        publish_at = timezone.now() + timedelta(hours=1)
+        for i in range(3):
+            Post.objects.create(
+                author=self.author,
+                text=f'Пост {i}',
+                status=Post.SCHEDULED,
+                publish_at=publish_at + timedelta(minutes=i),
+            )
+        self.assertEqual(publish_due(), 0)
+        version = get_feed_version()
+        later = publish_at + timedelta(minutes=1)
+        self.assertEqual(publish_due(now=later, batch_size=1), 2)
+        self.assertNotEqual(get_feed_version(), version)
+        published = Post.objects.filter(status=Post.PUBLISHED)
+        self.assertEqual(
+            sorted(published.values_list('text', flat=True)),
+            ['Пост 0', 'Пост 1'],
+        )
+        self.assertEqual(published.first().pub_date, later)
+        out = StringIO()
+        call_command('publish_scheduled', stdout=out)
+        self.assertEqual(out.getvalue(), '')
@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Follow, Recommendation
+from posts.recommendations import FollowGraph, build_recommendations
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'twin', 'writer', 'star', 'hidden')
+        }
+        # reader -> writer -> star: star is a friend of a friend,
+        # twin follows writer too, so hidden comes from co-follow.
+        for user, author in (
+            ('reader', 'writer'),
+            ('writer', 'star'),
+            ('twin', 'writer'),
+            ('twin', 'hidden'),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.reader = self.users['reader']
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_graph_arrays(self):
+        """Граф хранит подписки и подписчиков в массивах смещений."""
+        graph = FollowGraph([(1, 2), (1, 3), (2, 3)])
+        self.assertEqual(len(graph.out_targets), 3)
+        user, author = graph.index[1], graph.index[3]
+        self.assertEqual(
+            sorted(graph.ids[i] for i in graph.following(user)), [2, 3]
+        )
+        self.assertEqual(
+            sorted(graph.ids[i] for i in graph.followers(author)), [1, 2]
+        )
+
+    def test_friends_of_friends_and_co_follow(self):
+        """Рекомендуются авторы друзей и авторы похожих читателей."""
+        build_recommendations()
+        recommended = list(
+            Recommendation.objects.filter(user=self.reader).values_list(
+                'author__username', flat=True
+            )
+        )
+        self.assertCountEqual(recommended, ['hidden', 'star'])
+
+    def test_pages_show_cached_recommendations(self):
+        """Лента подписок и свой профиль показывают рекомендации из кэша."""
+        call_command('build_recommendations', stdout=StringIO())
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        self.assertCountEqual(
+            [a['username'] for a in response.context['recommended']],
+            ['hidden', 'star'],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(
+            [q for q in queries if 'posts_recommendation' in q['sql']]
+        )
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'reader'})
+        )
+        self.assertEqual(len(response.context['recommended']), 2)
+
+    def test_followed_author_leaves_recommendations(self):
+        """После подписки автор пропадает из рекомендаций."""
+        build_recommendations()
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'hidden'})
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [a['username'] for a in response.context['recommended']],
+            ['star'],
+        )
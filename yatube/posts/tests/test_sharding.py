@@ -0,0 +1,412 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.archive import archive_posts
+from posts.deletion import process_task, schedule_deletion
+from posts.digest import send_digest
+from posts.export import export_rows
+from posts.importer import CommentImporter, PostImporter
+from posts.likes import set_like
+from posts.models import (
+    ArchivedComment,
+    ArchivedPost,
+    AuthorShard,
+    Comment,
+    Follow,
+    Group,
+    Like,
+    Post,
+    PostKey,
+)
+from posts.sharding import move_author
+from posts.sitemaps import post_urls, profile_urls
+
+User = get_user_model()
+
+SHARD = 'shard_test'
+
+
+class ShardingTests(TransactionTestCase):
+    databases = {'default', SHARD}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.databases_patch = mock.patch.dict(
+            settings.DATABASES,
+            {
+                SHARD: {
+                    'ENGINE': 'django.db.backends.sqlite3',
+                    'NAME': os.path.join(cls.tmp_dir.name, 'shard.sqlite3'),
+                }
+            },
+        )
+        cls.databases_patch.start()
+        cls.shards = override_settings(POST_SHARDS=['default', SHARD])
+        cls.shards.enable()
+        call_command('migrate', database=SHARD, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.shards.disable()
+        connections[SHARD].close()
+        del connections[SHARD]
+        cls.databases_patch.stop()
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.local = User.objects.create_user(username='local')
+        self.remote = User.objects.create_user(username='remote')
+        move_author(self.local.pk, 'default')
+        move_author(self.remote.pk, SHARD)
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.remote if i % 2 else self.local,
+                group=self.group,
+                text=f'Пост {i}',
+            )
+            for i in range(4)
+        ]
+        self.remote_post = self.posts[-1]
+        self.client = Client()
+        self.client.force_login(self.local)
+
+    def test_posts_are_stored_in_author_shard(self):
+        """Посты пишутся в шард автора и получают глобальный id."""
+        self.assertTrue(
+            Post.objects.using(SHARD).filter(pk=self.remote_post.pk).exists()
+        )
+        self.assertFalse(
+            Post.objects.using('default')
+            .filter(author=self.remote)
+            .exists()
+        )
+        self.assertEqual(
+            PostKey.objects.filter(author=self.remote).count(), 2
+        )
+        self.assertEqual(
+            len({post.pk for post in self.posts}), len(self.posts)
+        )
+
+    def test_feeds_merge_posts_of_all_shards(self):
+        """Главная и группа собирают посты всех шардов в порядке даты."""
+        expected = [post.pk for post in reversed(self.posts)]
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        ):
+            with self.subTest(url=url):
+                page_obj = self.client.get(url).context['page_obj']
+                self.assertEqual([post.pk for post in page_obj], expected)
+                self.assertEqual(page_obj.paginator.count, len(self.posts))
+
+    def test_follow_index_reads_shard_of_author(self):
+        """Лента подписок показывает посты автора из его шарда."""
+        Follow.objects.create(user=self.local, author=self.remote)
+        page_obj = self.client.get(reverse('posts:follow_index')).context[
+            'page_obj'
+        ]
+        self.assertEqual(
+            [post.author for post in page_obj], [self.remote, self.remote]
+        )
+
+    def test_profile_and_post_detail_are_routed(self):
+        """Профиль и страница поста читают шард автора."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'remote'})
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.remote_post.pk}
+        )
+        self.assertEqual(self.client.get(url).context['post'].text, 'Пост 3')
+
+    def test_comment_is_stored_next_to_post(self):
+        """Комментарий сохраняется в шард поста."""
+        self.client.post(
+            reverse(
+                'posts:add_comment', kwargs={'post_id': self.remote_post.pk}
+            ),
+            {'text': 'Комментарий'},
+        )
+        self.assertTrue(
+            Comment.objects.using(SHARD)
+            .filter(post_id=self.remote_post.pk, author=self.local)
+            .exists()
+        )
+
+    def test_rebalance_moves_author_content(self):
+        """Команда rebalance_shards переносит посты и комментарии автора."""
+        Comment.objects.create(
+            post=self.remote_post, author=self.local, text='Комментарий'
+        )
+        set_like(self.local, self.remote_post)
+        call_command(
+            'rebalance_shards',
+            'remote',
+            'default',
+            settle=0,
+            batch_size=1,
+            stdout=StringIO(),
+        )
+        self.assertFalse(Post.objects.using(SHARD).exists())
+        self.assertFalse(Comment.objects.using(SHARD).exists())
+        self.assertEqual(
+            AuthorShard.objects.get(author=self.remote).shard, 'default'
+        )
+        moved = Post.objects.using('default').get(pk=self.remote_post.pk)
+        self.assertEqual(moved.pub_date, self.remote_post.pub_date)
+        self.assertEqual(moved.comments.count(), 1)
+        self.assertEqual(moved.likes_count, 1)
+        self.assertTrue(moved.likes.filter(user=self.local).exists())
+        self.assertFalse(Like.objects.using(SHARD).exists())
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.remote_post.pk}
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_rebalance_keeps_writes_made_while_settling(self):
+        """Записи в оба шарда во время ожидания не теряются при переносе."""
+        Comment.objects.create(
+            post=self.remote_post, author=self.remote, text='До переноса'
+        )
+        stale = Post.objects.using(SHARD).get(pk=self.remote_post.pk)
+        comment_url = reverse(
+            'posts:add_comment', kwargs={'post_id': self.remote_post.pk}
+        )
+
+        def settle(seconds):
+            # New workers already write to the target shard.
+            self.client.post(comment_url, {'text': 'В новом шарде'})
+            set_like(
+                self.local,
+                Post.objects.using('default').get(pk=self.remote_post.pk),
+            )
+            Comment.objects.using('default').filter(
+                text='До переноса'
+            ).delete()
+            # Workers with the old shard map still write to the source.
+            late = Comment.objects.using(SHARD).create(
+                post=stale, author=self.remote, text='В старом шарде'
+            )
+            Comment.objects.using(SHARD).create(
+                post=stale,
+                author=self.local,
+                text='Ответ',
+                path=late.path + '0000',
+            )
+            set_like(self.remote, stale)
+            stale.text = 'Правка'
+            stale.save()
+            Post.objects.using(SHARD).create(
+                author=self.remote, text='Поздний пост'
+            )
+
+        with mock.patch('posts.rebalance.time.sleep', settle):
+            call_command(
+                'rebalance_shards',
+                'remote',
+                'default',
+                batch_size=1,
+                stdout=StringIO(),
+            )
+        moved = Post.objects.using('default').get(pk=self.remote_post.pk)
+        self.assertEqual(moved.text, 'Правка')
+        self.assertEqual(moved.likes_count, 2)
+        self.assertEqual(moved.likes.count(), 2)
+        comments = {
+            comment.text: comment.path
+            for comment in moved.comments.order_by('path')
+        }
+        self.assertEqual(
+            set(comments), {'В новом шарде', 'В старом шарде', 'Ответ'}
+        )
+        self.assertNotEqual(
+            comments['В новом шарде'], comments['В старом шарде']
+        )
+        self.assertEqual(
+            comments['Ответ'], comments['В старом шарде'] + '0000'
+        )
+        self.assertTrue(
+            Post.objects.using('default')
+            .filter(author=self.remote, text='Поздний пост')
+            .exists()
+        )
+        self.assertFalse(Post.objects.using(SHARD).exists())
+
+    def test_import_writes_to_author_shard(self):
+        """Импорт кладёт посты в шард автора с глобальными id,
+        а комментарии рядом с их постом."""
+        result = PostImporter().run([
+            {'text': 'Импорт удалённого', 'author': 'remote'},
+            {'id': 500, 'text': 'Импорт с id', 'author': 'remote'},
+            {'text': 'Импорт местного', 'author': 'local'},
+            {'id': self.posts[0].pk, 'text': 'Повтор', 'author': 'remote'},
+        ])
+        self.assertEqual(result.created, 3)
+        self.assertEqual(len(result.rejected), 1)
+        imported = Post.objects.using(SHARD).filter(text__startswith='Импорт')
+        self.assertEqual(imported.count(), 2)
+        self.assertTrue(imported.filter(pk=500).exists())
+        local = Post.objects.using('default').get(text='Импорт местного')
+        self.assertEqual(
+            set(
+                PostKey.objects.filter(
+                    pk__in=[local.pk, *imported.values_list('pk', flat=True)]
+                ).values_list('author_id', flat=True)
+            ),
+            {self.local.pk, self.remote.pk},
+        )
+        self.assertEqual(PostKey.objects.count(), len(self.posts) + 3)
+        result = CommentImporter().run([
+            {'post': self.remote_post.pk, 'author': 'local', 'text': 'Ответ'},
+            {'post': self.posts[0].pk, 'author': 'remote', 'text': 'Привет'},
+        ])
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            Comment.objects.using(SHARD).get().post_id, self.remote_post.pk
+        )
+        self.assertEqual(
+            Comment.objects.using('default').get().post_id, self.posts[0].pk
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 500})
+        )
+        self.assertContains(response, 'Импорт с id')
+
+    def test_export_reads_every_shard(self):
+        """Выгрузка собирает посты и комментарии всех шардов
+        с именами авторов и групп."""
+        Comment.objects.create(
+            post=self.remote_post, author=self.local, text='Ответ'
+        )
+        names, rows = export_rows('posts')
+        rows = [dict(zip(names, row)) for row in rows]
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[-1]['author'], 'remote')
+        self.assertEqual(rows[-1]['group'], 'test-slug')
+        _, rows = export_rows('posts', author='remote', group='test-slug')
+        self.assertEqual(
+            [row[0] for row in rows],
+            [post.pk for post in self.posts if post.author == self.remote],
+        )
+        names, rows = export_rows('comments', group='test-slug')
+        self.assertEqual(
+            [dict(zip(names, row))['author'] for row in rows], ['local']
+        )
+
+    def test_api_reads_every_shard(self):
+        """API листает посты всех шардов и открывает пост из шарда."""
+        Comment.objects.create(
+            post=self.remote_post, author=self.local, text='Ответ'
+        )
+        address = reverse('api:post_list')
+        first = self.client.get(address, {'limit': 3}).json()
+        second = self.client.get(
+            address, {'limit': 3, 'cursor': first['next']}
+        ).json()
+        self.assertEqual(
+            [item['id'] for item in first['results'] + second['results']],
+            [post.pk for post in reversed(self.posts)],
+        )
+        self.assertEqual(first['results'][0]['author'], 'remote')
+        self.assertEqual(first['results'][0]['group'], 'test-slug')
+        self.assertIsNone(second['next'])
+        response = self.client.get(
+            reverse('api:profile_post_list', kwargs={'username': 'remote'})
+        )
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(
+            reverse(
+                'api:post_detail', kwargs={'post_id': self.remote_post.pk}
+            )
+        )
+        self.assertEqual(response.json()['comments'][0]['author'], 'local')
+
+    def test_archive_moves_posts_of_every_shard(self):
+        """Архивация переносит старые посты всех шардов."""
+        Comment.objects.create(
+            post=self.remote_post, author=self.local, text='Ответ'
+        )
+        old = timezone.now() - timedelta(days=1000)
+        for alias in ('default', SHARD):
+            Post.objects.using(alias).update(pub_date=old)
+        self.assertEqual(archive_posts(days=365, batch_size=1), 4)
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Post.objects.using(SHARD).exists())
+        self.assertFalse(Comment.objects.using(SHARD).exists())
+        self.assertEqual(ArchivedPost.objects.count(), 4)
+        self.assertEqual(
+            ArchivedComment.objects.get().post_id, self.remote_post.pk
+        )
+
+    def test_user_deletion_reaches_every_shard(self):
+        """Удаление пользователя убирает его посты и комментарии
+        из всех шардов."""
+        Comment.objects.create(
+            post=self.posts[0], author=self.remote, text='Комментарий'
+        )
+        Comment.objects.create(
+            post=self.remote_post, author=self.local, text='Ответ'
+        )
+        process_task(schedule_deletion(self.remote), pause=0)
+        self.assertFalse(Post.objects.using(SHARD).exists())
+        self.assertFalse(Comment.objects.using(SHARD).exists())
+        self.assertFalse(Comment.objects.using('default').exists())
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_digest_names_authors_of_any_shard(self):
+        """Дайджест подписывает посты авторов из любого шарда."""
+        User.objects.filter(pk=self.local.pk).update(email='local@example.com')
+        Follow.objects.create(user=self.local, author=self.remote)
+        self.assertEqual(send_digest(), 1)
+        self.assertIn('remote, ', mail.outbox[0].body)
+
+    def test_drafts_of_shard_author(self):
+        """Черновики автора из другого шарда открываются без ошибок."""
+        draft = Post.objects.create(
+            author=self.remote, text='Черновик', status=Post.DRAFT
+        )
+        self.client.force_login(self.remote)
+        response = self.client.get(reverse('posts:drafts'))
+        self.assertEqual(list(response.context['page_obj']), [draft])
+        self.assertContains(response, 'Черновик')
+
+    def test_sitemaps_list_posts_of_every_shard(self):
+        """Карта сайта собирает посты и профили всех шардов."""
+        self.assertEqual(
+            [url for url, _ in post_urls()],
+            [
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+                for post in self.posts
+            ],
+        )
+        self.assertEqual(
+            [url for url, _ in profile_urls()],
+            [
+                reverse('posts:profile', kwargs={'username': username})
+                for username in ('local', 'remote')
+            ],
+        )
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+from posts.sitemaps import group_urls, profile_urls
+
+User = get_user_model()
+
+TEMP_SITEMAP_ROOT = os.path.join(
+    tempfile.mkdtemp(dir=settings.BASE_DIR), 'sitemaps'
+)
+
+
+@override_settings(SITEMAP_ROOT=TEMP_SITEMAP_ROOT, SITEMAP_URLS_PER_FILE=2)
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.auth_user, text=f'Пост {i}', group=cls.group
+            )
+            for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(os.path.dirname(TEMP_SITEMAP_ROOT), ignore_errors=True)
+
+    def setUp(self):
+        self.guest_client = Client()
+        call_command(
+            'build_sitemaps', base_url='https://yatube.test', stdout=StringIO()
+        )
+
+    def test_sitemap_index_lists_paginated_sitemaps(self):
+        """Индекс ссылается на все файлы, посты разбиты по 2 ссылки."""
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:sitemap'))
+        content = b''.join(response.streaming_content).decode()
+        for section, page in [
+            ('posts', 1), ('posts', 2), ('groups', 1), ('profiles', 1)
+        ]:
+            with self.subTest(section=section, page=page):
+                self.assertIn(
+                    f'https://yatube.test/sitemap-{section}-{page}.xml',
+                    content,
+                )
+
+    def test_sitemap_section_contains_urls(self):
+        """Файлы карты сайта содержат ссылки с датой изменения."""
+        response = self.guest_client.get(
+            reverse(
+                'posts:sitemap_section',
+                kwargs={'section': 'posts', 'page': 2},
+            )
+        )
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(
+            f'https://yatube.test/posts/{self.posts[2].pk}/</loc><lastmod>',
+            content,
+        )
+        response = self.guest_client.get(
+            reverse(
+                'posts:sitemap_section',
+                kwargs={'section': 'profiles', 'page': 1},
+            )
+        )
+        self.assertIn(
+            'https://yatube.test/profile/auth/',
+            b''.join(response.streaming_content).decode(),
+        )
+
+    def test_unknown_sitemap_not_found(self):
+        """Несуществующий файл карты сайта отдаёт 404."""
+        addresses = [
+            reverse(
+                'posts:sitemap_section',
+                kwargs={'section': 'posts', 'page': 3},
+            ),
+            reverse(
+                'posts:sitemap_section',
+                kwargs={'section': 'unknown', 'page': 1},
+            ),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_drafts_do_not_reach_sitemaps(self):
+        """Черновики не добавляют профили и не меняют даты групп."""
+        drafter = User.objects.create_user(username='drafter')
+        Post.objects.create(
+            author=drafter,
+            text='Черновик',
+            group=self.group,
+            status=Post.DRAFT,
+        )
+        self.assertEqual(
+            [url for url, _ in profile_urls()],
+            [reverse('posts:profile', kwargs={'username': 'auth'})],
+        )
+        self.assertEqual(
+            list(group_urls()),
+            [
+                (
+                    reverse('posts:group_list', kwargs={'slug': 'Diary'}),
+                    max(post.updated for post in self.posts),
+                )
+            ],
+        )
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import NotificationEvent, Post, PostMention, PostTag, Tag
+from posts.publishing import publish_due
+from posts.tags import hashtags, mentions
+
+User = get_user_model()
+
+
+class TagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def tags_of(self, post):
+        return set(
+            PostTag.objects.filter(post_id=post.pk).values_list(
+                'tag__name', flat=True
+            )
+        )
+
+    def test_extraction(self):
+        """Теги и упоминания не берутся из слов, адресов и сущностей."""
+        text = 'Про #Django и #питон, x#no &#39; /a/#b @reader. mail@x.ru'
+        self.assertEqual(hashtags(text), {'django', 'питон'})
+        self.assertEqual(mentions(text), {'reader'})
+
+    def test_edit_updates_index_with_diff(self):
+        """Правка добавляет новые теги и удаляет пропавшие."""
+        post = Post.objects.create(author=self.author, text='#один #два')
+        kept = PostTag.objects.get(post_id=post.pk, tag__name='один')
+        post.text = '#один #три'
+        post.save()
+        self.assertEqual(self.tags_of(post), {'один', 'три'})
+        self.assertTrue(PostTag.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_mentions_notify_once(self):
+        """Упомянутый пользователь получает одно уведомление."""
+        post = Post.objects.create(author=self.author, text='@reader привет')
+        post.save()
+        events = NotificationEvent.objects.filter(
+            kind=NotificationEvent.MENTION
+        )
+        self.assertEqual(events.count(), 1)
+        self.assertEqual(events.get().recipient, self.reader)
+        post.text = 'без упоминаний @author'
+        post.save()
+        self.assertFalse(PostMention.objects.exists())
+
+    def test_drafts_are_indexed_when_published(self):
+        """Отложенный пост попадает в ленту тега после публикации."""
+        post = Post.objects.create(
+            author=self.author,
+            text='#план',
+            status=Post.SCHEDULED,
+            publish_at=timezone.now() + timedelta(hours=1),
+        )
+        self.assertEqual(self.tags_of(post), set())
+        publish_due(now=timezone.now() + timedelta(hours=2))
+        post.refresh_from_db()
+        self.assertEqual(
+            PostTag.objects.get(post_id=post.pk).pub_date, post.pub_date
+        )
+
+    def test_tag_feed_keyset_pages(self):
+        """Лента тега листается по курсору от новых к старым."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'#тема {number}')
+            for number in range(3)
+        ]
+        Post.objects.create(author=self.author, text='#другое')
+        url = reverse('posts:tag_posts', kwargs={'name': 'Тема'})
+        with self.settings(POSTS_PER_PAGE=2):
+            response = self.client.get(url)
+            page = response.context['posts']
+            self.assertEqual(list(page), posts[:0:-1])
+            response = self.client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(list(response.context['posts']), posts[:1])
+        self.assertIsNone(response.context['posts'].next_cursor)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:tag_posts', kwargs={'name': 'нет'})
+            ).status_code,
+            404,
+        )
+
+    def test_hashtags_link_to_feed(self):
+        """Хэштеги в тексте ведут на ленту тега."""
+        post = Post.objects.create(author=self.author, text='Про #Django')
+        self.assertIn(
+            reverse('posts:tag_posts', kwargs={'name': 'django'}),
+            post.text_html,
+        )
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.likes import set_like
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TrendingGroup,
+    TrendingPost,
+    TrendingRun,
+)
+from posts.trending import update_trending
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий пост')
+        cls.popular = Post.objects.create(
+            author=cls.author, group=cls.group, text='Популярный пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def score(self, post):
+        return TrendingPost.objects.get(post_id=post.pk).score
+
+    def test_activity_ranks_posts_and_groups(self):
+        """Комментарии и отметки поднимают пост и его группу."""
+        Comment.objects.create(
+            post=self.popular, author=self.reader, text='Комментарий'
+        )
+        set_like(self.reader, self.popular)
+        update_trending(timezone.now() + timedelta(seconds=1))
+        self.assertGreater(self.score(self.popular), self.score(self.quiet))
+        self.assertEqual(
+            TrendingGroup.objects.get().group, self.group
+        )
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.popular.pk, self.quiet.pk],
+        )
+        self.assertEqual(
+            [item.group for item in response.context['groups']], [self.group]
+        )
+
+    def test_scores_decay_and_count_only_new_activity(self):
+        """Следующий запуск уменьшает рейтинг и учитывает лишь новое."""
+        now = timezone.now() + timedelta(seconds=1)
+        update_trending(now)
+        score = self.score(self.popular)
+        update_trending(now + timedelta(hours=12))
+        self.assertAlmostEqual(self.score(self.popular), score / 2)
+        Post.objects.filter(pk=self.popular.pk).update(views=10)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.filter(pk=follow.pk).update(
+            created=now + timedelta(hours=12)
+        )
+        update_trending(now + timedelta(hours=12, seconds=1))
+        self.assertGreater(self.score(self.popular), score * 5)
+        self.assertEqual(
+            TrendingPost.objects.get(post_id=self.popular.pk).views_seen, 10
+        )
+        self.assertEqual(TrendingRun.objects.count(), 1)
+
+    def test_old_quiet_posts_are_pruned(self):
+        """Старые посты без активности выпадают из рейтинга."""
+        now = timezone.now() + timedelta(seconds=1)
+        update_trending(now)
+        update_trending(now + timedelta(days=30))
+        self.assertFalse(TrendingPost.objects.exists())
+        self.assertFalse(TrendingGroup.objects.exists())
+
+    def test_command_updates_scores(self):
+        """Команда update_trending пересчитывает рейтинг."""
+        out = StringIO()
+        call_command('update_trending', stdout=out)
+        self.assertIn('Обновлён рейтинг постов', out.getvalue())
+        self.assertTrue(TrendingRun.objects.exists())
+
+    def test_cached_page_is_not_shared_between_users(self):
+        """Кэш рейтинга не отдаёт одному пользователю страницу другого."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        url = reverse('posts:trending')
+        self.assertContains(
+            author_client.get(url), 'Пользователь: author'
+        )
+        response = reader_client.get(url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'Пользователь: author')
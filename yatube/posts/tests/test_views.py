@@ -6,8 +6,13 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from posts.conditional import post_state
 from posts.models import Comment, Follow, Group, Post, User
 
 User = get_user_model()
@@ -388,3 +393,102 @@ class FollowViewsTests(TestCase):
         )
         self.assertEqual(response.context['page_obj'][0].text, new_post.text)
         self.assertNotIn(response.context['page_obj'][0].text, self.post.text)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Diary',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.auth_user, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.auth_user)
+        cache.clear()
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Неизменившаяся страница отдаёт 304 по ETag."""
+        addresses = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile', kwargs={'username': self.auth_user.username}
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertIn('Cookie', response['Vary'])
+                cache.clear()
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_deleted_post_is_not_hidden_by_if_modified_since(self):
+        """После удаления поста лента не отдаёт 304 по дате."""
+        address = reverse('posts:index')
+        extra_post = Post.objects.create(
+            author=self.auth_user, text='Лишний пост'
+        )
+        response = self.guest_client.get(address)
+        self.assertFalse(response.has_header('Last-Modified'))
+        extra_post.delete()
+        cache.clear()
+        response = self.guest_client.get(
+            address,
+            HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp()),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Лишний пост')
+
+    def test_new_comment_changes_post_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        address = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        etag = self.guest_client.get(address)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.auth_user, text='Комментарий'
+        )
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_state_counts_without_joining_author_posts(self):
+        """Состояние поста считает комментарии и посты автора
+        разными запросами."""
+        for i in range(2):
+            Post.objects.create(author=self.auth_user, text=f'Ещё {i}')
+            Comment.objects.create(
+                post=self.post, author=self.auth_user, text=f'Ответ {i}'
+            )
+        request = RequestFactory().get('/')
+        request.user = self.auth_user
+        with CaptureQueriesContext(connection) as queries:
+            state = post_state(request, self.post.pk)
+        self.assertEqual(state['comments_count'], 2)
+        self.assertEqual(state['author_posts'], 3)
+        self.assertEqual(state['group__title'], self.group.title)
+        self.assertFalse(
+            any('DISTINCT' in query['sql'] for query in queries)
+        )
+
+    def test_etag_differs_for_authorized_user(self):
+        """Анонимный и авторизованный пользователь получают разные ETag."""
+        address = reverse('posts:index')
+        guest_etag = self.guest_client.get(address)['ETag']
+        cache.clear()
+        response = self.authorized_client.get(
+            address, HTTP_IF_NONE_MATCH=guest_etag
+        )
+        self.assertEqual(response.status_code, 200)
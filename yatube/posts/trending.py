@@ -0,0 +1,238 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import (
+    Comment,
+    Follow,
+    Group,
+    Like,
+    TrendingGroup,
+    TrendingPost,
+    TrendingRun,
+)
+from .sharding import (
+    on_shard,
+    posts_by_ids,
+    posts_on,
+    shard_aliases,
+    shard_querysets,
+    shards_for_posts,
+)
+from .utils import chunks
+
+BATCH_SIZE = 500
+
+
+def decay_factor(elapsed):
+    """Share of a score left after `elapsed` time."""
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    return 0.5 ** (elapsed / half_life)
+
+
+def activity(since, now):
+    """Weighted activity per post id between two moments.
+
+    Comments and likes are counted in the shard of their post,
+    a new follower is credited to the latest post of the author.
+    """
+    weights = settings.TRENDING_WEIGHTS
+    scores = Counter()
+    for alias in shard_aliases():
+        for model, weight in ((Comment, 'comment'), (Like, 'like')):
+            rows = (
+                on_shard(model, alias)
+                .filter(created__gte=since, created__lt=now)
+                .order_by()
+                .values('post_id')
+                .annotate(events=Count('pk'))
+            )
+            for row in rows:
+                scores[row['post_id']] += row['events'] * weights[weight]
+    followers = dict(
+        Follow.objects.filter(created__gte=since, created__lt=now)
+        .order_by()
+        .values('author_id')
+        .annotate(events=Count('pk'))
+        .values_list('author_id', 'events')
+    )
+    if followers:
+        for posts in shard_querysets(list(followers)):
+            latest = (
+                posts.order_by()
+                .values('author_id')
+                .annotate(latest=Max('pk'))
+                .values_list('author_id', 'latest')
+            )
+            for author_id, post_id in latest:
+                scores[post_id] += followers[author_id] * weights['follow']
+    return scores
+
+
+def post_rows(post_ids, window_start):
+    """Group, date and views of the given posts and of every post
+    published inside the window, one dict per post id."""
+    rows = {}
+    fields = ('pk', 'group_id', 'pub_date', 'views')
+    for alias in shard_aliases():
+        recent = posts_on(alias).published().filter(
+            pub_date__gte=window_start
+        )
+        for row in recent.values(*fields):
+            rows[row['pk']] = row
+    for alias, ids in shards_for_posts(post_ids).items():
+        for batch in chunks(ids, BATCH_SIZE):
+            posts = posts_on(alias).filter(pk__in=batch)
+            for row in posts.values(*fields):
+                rows[row['pk']] = row
+    return rows
+
+
+def update_trending(now=None):
+    """Bring trending scores of posts and groups up to `now`.
+
+    Scores are kept between runs: they decay by half every
+    TRENDING_HALF_LIFE_HOURS and receive only the activity since the
+    previous run, so a run reads recent rows instead of whole tables.
+    Returns the number of posts whose score changed.
+    """
+    now = now or timezone.now()
+    window_start = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    last_run = TrendingRun.objects.first()
+    since = max(last_run.finished, window_start) if last_run else window_start
+    weights = settings.TRENDING_WEIGHTS
+    scores = activity(since, now)
+    tracked = set(TrendingPost.objects.values_list('post_id', flat=True))
+    posts = post_rows(set(scores) | tracked, window_start)
+    seen = dict(TrendingPost.objects.values_list('post_id', 'views_seen'))
+    views_seen = {}
+    for post_id, row in posts.items():
+        if post_id in seen:
+            new_views = row['views'] - seen[post_id]
+        elif row['pub_date'] >= since:
+            new_views = row['views']
+            scores[post_id] += weights['post']
+        else:
+            new_views = 0
+        if new_views > 0:
+            scores[post_id] += new_views * weights['view']
+        if post_id not in seen or new_views > 0:
+            views_seen[post_id] = row['views']
+    group_scores = Counter()
+    for post_id, score in scores.items():
+        if post_id in posts and posts[post_id]['group_id']:
+            group_scores[posts[post_id]['group_id']] += score
+    with transaction.atomic():
+        if last_run:
+            factor = decay_factor(now - last_run.finished)
+            TrendingPost.objects.update(score=F('score') * factor)
+            TrendingGroup.objects.update(score=F('score') * factor)
+        changed = upsert_posts(scores, views_seen, posts)
+        upsert_groups(group_scores)
+        TrendingPost.objects.filter(
+            score__lt=settings.TRENDING_MIN_SCORE, pub_date__lt=window_start
+        ).delete()
+        TrendingGroup.objects.filter(
+            score__lt=settings.TRENDING_MIN_SCORE
+        ).delete()
+        TrendingRun.objects.create(finished=now)
+        TrendingRun.objects.filter(finished__lt=now).delete()
+    return changed
+
+
+def upsert_posts(scores, views_seen, posts):
+    touched = [
+        post_id
+        for post_id in set(scores) | set(views_seen)
+        if post_id in posts
+    ]
+    existing = TrendingPost.objects.in_bulk(touched)
+    created = []
+    for post_id in touched:
+        row = existing.get(post_id)
+        if row is None:
+            row = TrendingPost(
+                post_id=post_id,
+                group_id=posts[post_id]['group_id'],
+                pub_date=posts[post_id]['pub_date'],
+            )
+            created.append(row)
+        row.score += scores.get(post_id, 0)
+        row.views_seen = views_seen.get(post_id, row.views_seen)
+        row.group_id = posts[post_id]['group_id']
+    TrendingPost.objects.bulk_update(
+        existing.values(),
+        ['score', 'views_seen', 'group_id'],
+        batch_size=BATCH_SIZE,
+    )
+    TrendingPost.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    return sum(1 for post_id in touched if scores.get(post_id))
+
+
+def upsert_groups(group_scores):
+    group_ids = set(
+        Group.objects.filter(pk__in=list(group_scores)).values_list(
+            'pk', flat=True
+        )
+    )
+    existing = TrendingGroup.objects.in_bulk(list(group_ids))
+    for group_id, row in existing.items():
+        row.score += group_scores[group_id]
+    TrendingGroup.objects.bulk_update(
+        existing.values(), ['score'], batch_size=BATCH_SIZE
+    )
+    TrendingGroup.objects.bulk_create(
+        (
+            TrendingGroup(group_id=group_id, score=score)
+            for group_id, score in group_scores.items()
+            if group_id in group_ids and group_id not in existing
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def trending_groups():
+    return TrendingGroup.objects.select_related('group')[
+        :settings.TRENDING_GROUPS
+    ]
+
+
+class TrendingFeed:
+    """Top TRENDING_POSTS posts by score as one list for Paginator.
+
+    The ranking is read from TrendingPost, posts of a page are loaded
+    from their shards. Posts deleted or archived since the last run
+    are skipped.
+    """
+
+    ordered = True
+
+    def __init__(self):
+        self.ranking = TrendingPost.objects.order_by('-score', '-post_id')
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = min(
+                self.ranking.count(), settings.TRENDING_POSTS
+            )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        stop = min(stop, self.count())
+        if stop <= start:
+            return []
+        return posts_by_ids(
+            self.ranking.values_list('post_id', flat=True)[start:stop]
+        )
@@ -1,20 +1,46 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('trending/', views.trending, name='trending'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('tags/<str:name>/', views.tag_posts, name='tag_posts'),
+    path('groups/', views.groups, name='groups'),
+    path(
+        'groups/active/',
+        views.groups,
+        {'sort': 'activity'},
+        name='groups_active',
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
+    path('drafts/', views.drafts, name='drafts'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/history/',
+        views.post_history,
+        name='post_history',
+    ),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path(
+        'posts/<int:post_id>/unlike/', views.post_unlike, name='post_unlike'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
+    path('notifications/', views.notifications, name='notifications'),
+    path(
+        'notifications/read/',
+        views.notifications_read,
+        name='notifications_read',
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -25,4 +51,44 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow',
     ),
+    path(
+        'profile/<str:username>/followers/',
+        views.profile_followers,
+        name='profile_followers',
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.profile_following,
+        name='profile_following',
+    ),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    path(
+        'sitemap-<slug:section>-<int:page>.xml',
+        views.sitemap,
+        name='sitemap_section',
+    ),
+    path('export/<slug:dataset>/', views.export_data, name='export_data'),
+    path(
+        'metrics/views/',
+        views.view_counter_metrics,
+        name='view_counter_metrics',
+    ),
+    path('feed/', feeds.latest_rss, name='feed'),
+    path('feed/atom/', feeds.latest_atom, name='feed_atom'),
+    path('group/<slug:slug>/feed/', feeds.group_rss, name='group_feed'),
+    path(
+        'group/<slug:slug>/feed/atom/',
+        feeds.group_atom,
+        name='group_feed_atom',
+    ),
+    path(
+        'profile/<str:username>/feed/',
+        feeds.author_rss,
+        name='profile_feed',
+    ),
+    path(
+        'profile/<str:username>/feed/atom/',
+        feeds.author_atom,
+        name='profile_feed_atom',
+    ),
 ]
@@ -0,0 +1,4 @@
+def chunks(items, size):
+    """Consecutive slices of the sequence, `size` items each."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
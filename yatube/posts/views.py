@@ -1,79 +1,227 @@
+import os
+
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
+from django.views.decorators.vary import vary_on_cookie
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from . import history
+from .archive import ArchiveChain
+from .cache import cache_feed_page
+from .comments import comment_page, parse_path, save_comment
+from .conditional import (
+    conditional_page,
+    group_state,
+    index_state,
+    post_state,
+    profile_state,
+)
+from .counters import view_counter
+from .export import FORMATS, ExportError, export_filename, export_stream
+from .follows import (
+    follow_many,
+    follow_page,
+    parse_cursor,
+    split_usernames,
+    unfollow_many,
+)
+from .forms import CommentForm, PostForm, PublishForm
+from .groups import groups_directory, sorted_groups
+from .likes import mark_liked, set_like
+from .models import ArchivedPost, Follow, Group, Post, Tag, User
+from .notifications import (
+    last_read,
+    mark_all_read,
+    notify_comment,
+    notify_follows,
+)
+from .recommendations import recommended_authors
+from .sharding import (
+    author_posts,
+    author_shard,
+    feed,
+    post_queryset,
+    posts_on,
+)
+from .sitemaps import SECTIONS, sitemap_filename
+from .tags import tag_page
+from .trending import TrendingFeed, trending_groups
 
 
-def my_paginator(request, list_name, num_on_page):
+def my_paginator(request, list_name, num_on_page, liked=False):
+    """Page of the list; post feeds pass liked=True to mark the posts
+    the user likes."""
     paginator = Paginator(list_name, num_on_page)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page_obj = paginator.get_page(page_number)
+    if liked:
+        page_obj.object_list = mark_liked(
+            page_obj.object_list, request.user
+        )
+    return page_obj
+
+
+def is_visible(post, user):
+    """Drafts and scheduled posts are shown only to their author."""
+    return post.status == Post.PUBLISHED or post.author_id == user.pk
+
 
+def visible_post_or_404(request, post_id):
+    post = get_object_or_404(post_queryset(post_id), pk=post_id)
+    if not is_visible(post, request.user):
+        raise Http404('Post is not published')
+    return post
 
-@cache_page(20, key_prefix='index_page')
+
+@cache_page(settings.FEED_CACHE_TIMEOUT, key_prefix='index_page')
+@conditional_page(index_state)
 def index(request):
     """Function index make selection of 10 posts,
     create content and return home page (index.html) with context
     """
-    post_list = Post.objects.select_related("author", "group")
+    post_list = feed()
     context = {
-        'page_obj': my_paginator(request, post_list, settings.POSTS_PER_PAGE),
+        'page_obj': my_paginator(
+            request, post_list, settings.POSTS_PER_PAGE, liked=True
+        ),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_page(settings.TRENDING_CACHE_TIMEOUT, key_prefix='trending_page')
+@vary_on_cookie
+def trending(request):
+    """Function trending displays posts with the highest activity
+    score and the most active groups (see posts.trending).
+    """
+    context = {
+        'page_obj': my_paginator(
+            request, TrendingFeed(), settings.POSTS_PER_PAGE, liked=True
+        ),
+        'groups': trending_groups(),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@cache_feed_page('group_page')
+@conditional_page(group_state)
 def group_posts(request, slug):
     """
     Function group_posts collect content and create page (group_list.html)
     where display posts in group <slug>. Else, return 404 page.
     """
     group_post = get_object_or_404(Group, slug=slug)
-    posts = group_post.posts.select_related('author', 'group')
+    posts = feed(group=group_post)
     context = {
         'group': group_post,
-        'page_obj': my_paginator(request, posts, settings.POSTS_PER_GROUP),
+        'page_obj': my_paginator(
+            request, posts, settings.POSTS_PER_GROUP, liked=True
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def groups(request, sort='title'):
+    """Function groups displays all groups with their number of posts,
+    authors and the latest publication, by title or by activity.
+    """
+    paginator = Paginator(
+        sorted_groups(groups_directory(), sort), settings.GROUPS_PER_PAGE
+    )
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'sort': sort,
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+def tag_posts(request, name):
+    """Function tag_posts displays posts with the hashtag #<name>,
+    page by page after the `cursor` post id.
+    """
+    tag = get_object_or_404(Tag, name=name.lower())
+    posts = tag_page(
+        tag,
+        cursor=parse_cursor(request.GET.get('cursor')),
+        limit=settings.POSTS_PER_PAGE,
+    )
+    mark_liked(posts.posts, request.user)
+    context = {
+        'tag': tag,
+        'posts': posts,
+    }
+    return render(request, 'posts/tag_posts.html', context)
+
+
+@cache_feed_page('profile_page')
+@conditional_page(profile_state)
 def profile(request, username):
     """Function profile collect content and create page (profile.html)
     where display posts by author <username>. Else, return 404 page.
     """
     auth = get_object_or_404(User, username=username)
-    auth_post_list = auth.posts.select_related('author', 'group')
+    auth_post_list = ArchiveChain(
+        author_posts(auth),
+        auth.archived_posts.select_related('author', 'group'),
+    )
     is_following = (
         request.user.is_authenticated
         and Follow.objects.filter(user=request.user, author=auth).exists()
     )
     context = {
         'page_obj': my_paginator(
-            request, auth_post_list, settings.POSTS_PER_PAGE
+            request, auth_post_list, settings.POSTS_PER_PAGE, liked=True
         ),
         'author': auth,
         'following': is_following,
         'user': request.user,
     }
+    if request.user == auth:
+        context['recommended'] = recommended_authors(request.user)
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_state)
 def post_detail(request, post_id):
     """
     Function post_detail collect content and create
     page (post_detail.html) where display detail
     information of post with num of post_id.
+    Archived posts are shown read-only.
     """
-    post_id_detail = get_object_or_404(Post, pk=post_id)
+    post_id_detail = post_queryset(post_id).filter(pk=post_id).first()
+    if post_id_detail is None:
+        post_id_detail = get_object_or_404(ArchivedPost, pk=post_id)
+    elif not is_visible(post_id_detail, request.user):
+        raise Http404('Post is not published')
+    else:
+        view_counter.add(post_id_detail.pk)
+        mark_liked([post_id_detail], request.user)
     form = CommentForm()
-    comments_list = post_id_detail.comments.all()
+    thread = parse_path(request.GET.get('thread'))
+    comments_list = comment_page(
+        post_id_detail.comments.all(),
+        thread=thread,
+        after=parse_path(request.GET.get('after')),
+    )
     context = {
         'post': post_id_detail,
         'form': form,
         'comments': comments_list,
+        'thread': thread,
+        'archived': isinstance(post_id_detail, ArchivedPost),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -84,14 +232,40 @@ def post_create(request):
     Function create new post. It's available only
     for autenficated users.
     """
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    post = Post(author=request.user)
+    form = PostForm(
+        request.POST or None, files=request.FILES or None, instance=post
+    )
+    publish_form = PublishForm(request.POST or None, instance=post)
     if request.method == 'POST':
-        if form.is_valid():
-            post = form.save(commit=False)
-            post.author = request.user
+        if form.is_valid() and publish_form.is_valid():
             post.save()
+            if post.status != Post.PUBLISHED:
+                return redirect('posts:drafts')
             return redirect('posts:profile', post.author)
-    return render(request, 'posts/create_post.html', {'form': form})
+    context = {
+        'form': form,
+        'publish_form': publish_form,
+    }
+    return render(request, 'posts/create_post.html', context)
+
+
+@login_required
+def drafts(request):
+    """Function displays drafts and scheduled posts of the user."""
+    post_list = (
+        posts_on(author_shard(request.user.pk))
+        .filter(author=request.user)
+        .exclude(status=Post.PUBLISHED)
+        .prefetch_related('author', 'group')
+        .order_by('status', 'publish_at', '-pk')
+    )
+    context = {
+        'page_obj': my_paginator(
+            request, post_list, settings.POSTS_PER_PAGE, liked=True
+        ),
+    }
+    return render(request, 'posts/drafts.html', context)
 
 
 @login_required
@@ -100,36 +274,85 @@ def post_edit(request, post_id):
     Function edit post. It's available only
     for author of post.
     """
-    unique_post = get_object_or_404(Post, pk=post_id)
+    unique_post = get_object_or_404(post_queryset(post_id), pk=post_id)
     if unique_post.author != request.user:
         return redirect('posts:post_detail', post_id)
+    was_published = unique_post.status == Post.PUBLISHED
+    previous = history.version(unique_post)
     form = PostForm(
         request.POST or None, files=request.FILES or None, instance=unique_post
     )
-    if form.is_valid():
-        form.save()
+    publish_form = PublishForm(request.POST or None, instance=unique_post)
+    if form.is_valid() and publish_form.is_valid():
+        if unique_post.status == Post.PUBLISHED and not was_published:
+            unique_post.pub_date = timezone.now()
+        if history.version(unique_post) != previous:
+            history.record_revision(unique_post.pk, *previous)
+        unique_post.save()
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
+        'publish_form': publish_form,
         'is_edit': True,
         'post': unique_post,
     }
     return render(request, 'posts/create_post.html', context)
 
 
+@login_required
+def post_history(request, post_id):
+    """Function displays previous versions of the post.
+    It's available only for author of post.
+    """
+    post = get_object_or_404(post_queryset(post_id), pk=post_id)
+    if post.author != request.user:
+        return redirect('posts:post_detail', post_id)
+    context = {
+        'post': post,
+        'revisions': history.post_history(post.pk),
+    }
+    return render(request, 'posts/post_history.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
     """
-    Function create new comment for post.
+    Function create new comment for post or reply to a comment.
     It's available only for autenficated users.
     """
-    post = get_object_or_404(Post, pk=post_id)
+    post = visible_post_or_404(request, post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
+        # Comment the new one answers, none for a new thread.
+        parent_id = request.POST.get('parent', '')
+        parent = None
+        if parent_id.isdigit():
+            parent = post.comments.filter(pk=parent_id).first()
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        save_comment(comment, parent)
+        notify_comment(comment)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+def post_like(request, post_id):
+    """Function marks post as liked by the user.
+    Repeated requests change nothing."""
+    post = visible_post_or_404(request, post_id)
+    set_like(request.user, post, True)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+def post_unlike(request, post_id):
+    """Function removes like of the user from post.
+    Repeated requests change nothing."""
+    post = visible_post_or_404(request, post_id)
+    set_like(request.user, post, False)
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -137,13 +360,46 @@ def add_comment(request, post_id):
 def follow_index(request):
     """Function displays the posts of authors
     to which the current user is subscribed."""
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = feed(
+        author_ids=request.user.follower.values_list('author_id', flat=True)
+    )
     context = {
-        'page_obj': my_paginator(request, post_list, settings.POSTS_PER_PAGE),
+        'page_obj': my_paginator(
+            request, post_list, settings.POSTS_PER_PAGE, liked=True
+        ),
+        'recommended': recommended_authors(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
+def follow_list(request, username, direction):
+    """Function follow_list displays followers of the author or authors
+    followed by them, page by page after the `cursor` follow id.
+    """
+    auth = get_object_or_404(User, username=username)
+    people = follow_page(
+        auth,
+        direction,
+        request.user,
+        cursor=parse_cursor(request.GET.get('cursor')),
+        limit=settings.FOLLOWS_PER_PAGE,
+    )
+    context = {
+        'author': auth,
+        'direction': direction,
+        'people': people,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def profile_followers(request, username):
+    return follow_list(request, username, 'followers')
+
+
+def profile_following(request, username):
+    return follow_list(request, username, 'following')
+
+
 @login_required
 def profile_follow(request, username):
     """Function help to subscribe the user to author."""
@@ -153,6 +409,7 @@ def profile_follow(request, username):
         and auth != request.user
     ):
         Follow.objects.create(user=request.user, author=auth)
+        notify_follows(request.user, [auth.pk])
     return redirect('posts:profile', auth)
 
 
@@ -163,3 +420,94 @@ def profile_unfollow(request, username):
     if Follow.objects.filter(user=request.user, author=author).exists():
         Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Function follows or unfollows (action=unfollow) many authors
+    at once, `username` values may hold several names separated
+    by commas or spaces. Answers with JSON.
+    """
+    usernames = split_usernames(request.POST.getlist('username'))
+    if len(usernames) > settings.FOLLOW_BULK_LIMIT:
+        return JsonResponse(
+            {'detail': f'At most {settings.FOLLOW_BULK_LIMIT} authors'},
+            status=400,
+        )
+    if request.POST.get('action') == 'unfollow':
+        return JsonResponse(
+            {'unfollowed': unfollow_many(request.user, usernames)}
+        )
+    return JsonResponse({'followed': follow_many(request.user, usernames)})
+
+
+@login_required
+def notifications(request):
+    """Function displays notifications of the user, newest first."""
+    context = {
+        'page_obj': my_paginator(
+            request,
+            request.user.notifications.select_related('actor'),
+            settings.NOTIFICATIONS_PER_PAGE,
+        ),
+        'last_read': last_read(request.user),
+    }
+    return render(request, 'posts/notifications.html', context)
+
+
+@login_required
+@require_POST
+def notifications_read(request):
+    """Function marks all notifications of the user as read."""
+    mark_all_read(request.user)
+    return redirect('posts:notifications')
+
+
+def sitemap(request, section=None, page=None):
+    """Function serves sitemap files prepared by
+    `manage.py build_sitemaps`, without queries to the database."""
+    if section is not None and section not in SECTIONS:
+        raise Http404('Unknown sitemap section')
+    path = os.path.join(
+        settings.SITEMAP_ROOT, sitemap_filename(section, page)
+    )
+    try:
+        return FileResponse(open(path, 'rb'), content_type='application/xml')
+    except FileNotFoundError:
+        raise Http404('Sitemap is not built')
+
+
+@staff_member_required
+def export_data(request, dataset):
+    """Function streams dataset as NDJSON or CSV for analytics.
+    It's available only for staff."""
+    fmt = request.GET.get('format', 'ndjson')
+    compress = request.GET.get('gzip') == '1'
+    try:
+        chunks = export_stream(
+            dataset,
+            fmt=fmt,
+            compress=compress,
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            group=request.GET.get('group'),
+            author=request.GET.get('author'),
+        )
+    except ExportError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        chunks,
+        content_type='application/gzip' if compress else FORMATS[fmt],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export_filename(dataset, fmt, compress)}"'
+    )
+    return response
+
+
+@staff_member_required
+def view_counter_metrics(request):
+    """Function shows views buffered by this process
+    and not yet written to the database."""
+    return JsonResponse(view_counter.metrics())
@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.db.models import Count
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .models import Group, Post, User
+
+
+@dataclass
+class WarmupResult:
+    entries: int = 0
+    failed: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def num_pages(count, per_page, limit):
+    return max(1, min(limit, -(-count // per_page)))
+
+
+def page_url(url, page):
+    """Visitors open the first page without ?page=, so it is cached
+    under the bare url."""
+    return url if page == 1 else f'{url}?page={page}'
+
+
+def feed_urls(pages, top_groups, top_profiles):
+    """Collect first pages of index, the biggest groups and
+    the most followed profiles."""
+    urls = []
+    index_pages = num_pages(
+        Post.objects.published().count(), settings.POSTS_PER_PAGE, pages
+    )
+    urls.extend(
+        (reverse('posts:index'), page) for page in range(1, index_pages + 1)
+    )
+    groups = (
+        Group.objects.annotate(posts_count=Count('posts'))
+        .filter(posts_count__gt=0)
+        .order_by('-posts_count')
+        .values_list('slug', 'posts_count')[:top_groups]
+    )
+    for slug, posts_count in groups:
+        url = reverse('posts:group_list', kwargs={'slug': slug})
+        group_pages = num_pages(posts_count, settings.POSTS_PER_GROUP, pages)
+        urls.extend((url, page) for page in range(1, group_pages + 1))
+    authors = (
+        User.objects.annotate(
+            followers_count=Count('following', distinct=True),
+            posts_count=Count('posts', distinct=True),
+        )
+        .filter(posts_count__gt=0)
+        .order_by('-followers_count', '-posts_count')
+        .values_list('username', 'posts_count')[:top_profiles]
+    )
+    for username, posts_count in authors:
+        url = reverse('posts:profile', kwargs={'username': username})
+        profile_pages = num_pages(posts_count, settings.POSTS_PER_PAGE, pages)
+        urls.extend((url, page) for page in range(1, profile_pages + 1))
+    return urls
+
+
+def warm_cache(
+    pages=settings.CACHE_WARMUP_PAGES,
+    top_groups=settings.CACHE_WARMUP_TOP_GROUPS,
+    top_profiles=settings.CACHE_WARMUP_TOP_PROFILES,
+    workers=settings.CACHE_WARMUP_WORKERS,
+    host=settings.CACHE_WARMUP_HOST,
+    secure=False,
+):
+    """Render feed pages as an anonymous visitor, so cache_page
+    stores them under the same keys as for real requests.
+
+    Requests go through the middleware and URL resolver of the project
+    like the ones of the WSGI server, without a socket.
+    """
+    started = time.monotonic()
+    result = WarmupResult()
+    handler = BaseHandler()
+    handler.load_middleware()
+    factory = RequestFactory(HTTP_HOST=host)
+
+    def fetch(url_page):
+        url, page = url_page
+        request = factory.get(page_url(url, page), secure=secure)
+        try:
+            response = handler.get_response(request)
+        finally:
+            if threading.current_thread() is not main_thread:
+                connections.close_all()
+        return url, page, response.status_code
+
+    main_thread = threading.current_thread()
+    urls = feed_urls(pages, top_groups, top_profiles)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = list(executor.map(fetch, urls))
+    else:
+        fetched = [fetch(url_page) for url_page in urls]
+    for url, page, status_code in fetched:
+        if status_code == 200:
+            result.entries += 1
+        else:
+            result.failed.append((page_url(url, page), status_code))
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def start_background_warmup():
+    """Post-deploy hook: warm the cache of this process without
+    delaying the first request."""
+    thread = threading.Thread(target=warm_cache, daemon=True)
+    thread.start()
+    return thread
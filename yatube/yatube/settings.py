@@ -48,12 +48,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,6 +82,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.notifications',
             ],
         },
     },
@@ -98,6 +101,45 @@ DATABASES = {
     }
 }
 
+# Read-only replicas, e.g. YATUBE_DB_REPLICAS=replica1,replica2.
+# Locally they are SQLite copies refreshed by `manage.py replicate_db`.
+DATABASE_REPLICAS = [
+    alias
+    for alias in os.environ.get('YATUBE_DB_REPLICAS', '').split(',')
+    if alias
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Databases for posts and comments, e.g. YATUBE_DB_SHARDS=shard1,shard2.
+# Authors are spread over `default` and these shards, see posts.sharding.
+POST_SHARDS = ['default'] + [
+    alias
+    for alias in os.environ.get('YATUBE_DB_SHARDS', '').split(',')
+    if alias
+]
+for alias in POST_SHARDS[1:]:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+    }
+
+# Seconds a worker trusts its cached copy of the shard map.
+SHARD_MAP_CACHE_TIMEOUT = 300
+REBALANCE_BATCH_SIZE = 500
+
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.db_router.PrimaryReplicaRouter',
+]
+
+# How long a client reads from the primary after its own write.
+REPLICA_LAG_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -151,7 +193,108 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_PER_PAGE = 10
 POSTS_PER_GROUP = 10
+FOLLOWS_PER_PAGE = 20
+# Authors in one request of the bulk follow endpoint.
+FOLLOW_BULK_LIMIT = 500
 MAX_POST_STR = 15
+FEED_CACHE_TIMEOUT = 20
+
+SYNDICATION_ITEMS = 20
+SYNDICATION_TITLE_WORDS = 10
+SYNDICATION_CACHE_TIMEOUT = 60 * 15
+
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_BASE_URL = 'https://nikitalukyanchuk.pythonanywhere.com'
+SITEMAP_URLS_PER_FILE = 50000
+
+API_MAX_LIMIT = 100
+API_CACHE_TIMEOUT = 60
+
+# Deletion of users and groups in batches (see `manage.py process_deletions`).
+DELETION_BATCH_SIZE = 500
+DELETION_PAUSE = 0.1
+
+# Posts older than this move to archive tables (`manage.py archive_posts`).
+ARCHIVE_AFTER_DAYS = 365 * 2
+ARCHIVE_BATCH_SIZE = 500
+
+# Post views are buffered in memory and written in batches (posts.counters).
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+VIEW_COUNTER_MAX_PENDING = 1000
+# Three SQL parameters per post, SQLite allows 999 per statement.
+VIEW_COUNTER_BATCH_SIZE = 300
+
+# Trending posts and groups (see `manage.py update_trending`).
+TRENDING_HALF_LIFE_HOURS = 12
+TRENDING_WINDOW_DAYS = 3
+TRENDING_WEIGHTS = {
+    'comment': 3,
+    'like': 2,
+    'view': 0.1,
+    'follow': 5,
+    'post': 1,
+}
+TRENDING_MIN_SCORE = 0.01
+TRENDING_POSTS = 100
+TRENDING_GROUPS = 10
+TRENDING_CACHE_TIMEOUT = 60
+
+# Who to follow (see `manage.py build_recommendations`).
+RECOMMENDATION_WEIGHTS = {
+    'friend_of_friend': 1,
+    'co_follow': 2,
+}
+# Users compared with each user for co-follow similarity.
+RECOMMENDATION_SIMILAR_USERS = 50
+# Authors followed by more users are skipped when similar users are found.
+RECOMMENDATION_MAX_FOLLOWERS = 1000
+RECOMMENDATIONS_PER_USER = 20
+RECOMMENDATIONS_BATCH_SIZE = 500
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_CACHE_TIMEOUT = 60 * 60
+
+# Notification events are fanned out by `manage.py process_notifications`.
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATIONS_PER_PAGE = 20
+NOTIFICATIONS_CACHE_TIMEOUT = 60 * 5
+
+# Email digest of new posts (see `manage.py send_digest`).
+DIGEST_BATCH_SIZE = 200
+# The first digest of a user covers this many days.
+DIGEST_PERIOD_DAYS = 1
+DIGEST_MAX_POSTS = 20
+DIGEST_BASE_URL = SITEMAP_BASE_URL
+
+# Scheduled posts are published by `manage.py publish_scheduled`.
+PUBLISH_BATCH_SIZE = 500
+
+# Post edit history (posts.history): revisions kept per post and how often
+# a revision stores the whole text instead of a diff.
+POST_REVISIONS_MAX = 50
+POST_REVISION_SNAPSHOT_EVERY = 10
+
+# Comment threads (posts.comments): deepest reply level and comments
+# shown on one page of a post.
+COMMENT_MAX_DEPTH = 5
+COMMENTS_PER_PAGE = 50
+
+# Markdown of posts and comments (posts.markup) is rendered on save.
+# Bump the version after changing the renderer and run
+# `manage.py render_markdown` to render stored texts again.
+MARKDOWN_VERSION = 3
+MARKDOWN_BATCH_SIZE = 500
+
+# Groups directory (posts.groups), counters are cached until feeds change.
+GROUPS_PER_PAGE = 20
+GROUPS_CACHE_TIMEOUT = 60 * 10
+
+# Cache warming after deploy (see `manage.py warm_cache`).
+CACHE_WARMUP_ON_START = False
+CACHE_WARMUP_HOST = 'nikitalukyanchuk.pythonanywhere.com'
+CACHE_WARMUP_PAGES = 3
+CACHE_WARMUP_TOP_GROUPS = 10
+CACHE_WARMUP_TOP_PROFILES = 10
+CACHE_WARMUP_WORKERS = 4
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 